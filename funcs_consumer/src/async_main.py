@@ -0,0 +1,465 @@
+import asyncio
+import json
+import os
+import signal
+import struct
+import sys
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from time import time
+
+from dotenv import load_dotenv
+
+from src.main import (
+    aggregate_evaluated,
+    binary_results_enabled,
+    create_aggregator,
+    create_flow_controller,
+    create_services,
+    evaluate_batch,
+    evaluated_results,
+    fetch_initial_function,
+    last_scenario,
+    parse_scenario,
+    result_batches,
+)
+from src.rabbitmq.async_connection import AsyncConnection
+from src.rabbitmq.connection import decode_scenario, resolve_worker_id
+from src.services.exact_expectation import ExactExpectation
+from src.services.flow_controller import FlowController
+from src.services.function_compiler import FunctionCompiler
+from src.services.function_registry import FunctionRegistry
+from src.services.running_stats import ResultAggregator
+
+
+class AckTracker:
+    # con varios lotes en vuelo terminan en desorden: se confirma con
+    # multiple=True solo hasta el ultimo delivery_tag tal que todos los
+    # anteriores ya terminaron
+    def __init__(self):
+        self._order = deque()
+        # delivery_tag -> mensaje a confirmar (None si se rechazo con nack)
+        self._finished = {}
+
+    def received(self, message):
+        self._order.append(message.delivery_tag)
+
+    def complete(self, messages, acked: bool = True):
+        for message in messages:
+            self._finished[message.delivery_tag] = message if acked else None
+
+        target = None
+        while self._order and self._order[0] in self._finished:
+            message = self._finished.pop(self._order.popleft())
+            if message is not None:
+                target = message
+        return target
+
+
+async def publish_exact(
+    msg: dict,
+    connection: AsyncConnection,
+    compiler: FunctionCompiler,
+    executor: ThreadPoolExecutor,
+):
+    loop = asyncio.get_running_loop()
+    compiled_function = await loop.run_in_executor(
+        executor, compiler.get, msg.get("function")
+    )
+    if not compiled_function:
+        return
+
+    try:
+        expectation = await loop.run_in_executor(
+            executor,
+            ExactExpectation.compute,
+            compiled_function,
+            msg.get("distribution"),
+            msg.get("params", {}),
+        )
+    except Exception as e:
+        # un error no debe terminar la recepcion de funciones
+        print(f"ERROR, No se pudo calcular el valor exacto: {e}")
+        expectation = None
+    if expectation is None:
+        print(f"No se pudo calcular el valor exacto de {msg.get('function')}")
+        return
+
+    print(f"[EXACTO] Función: {msg.get('function')} ({msg.get('distribution')})")
+    print(f"  Esperanza: {expectation['mean']:.6f}")
+    print(f"  Varianza: {expectation['variance']:.6f}")
+    await connection.publish_exact(msg.get("function"), expectation)
+
+
+async def consume_functions(
+    connection: AsyncConnection,
+    function_container: dict,
+    compiler: FunctionCompiler,
+    registry: FunctionRegistry,
+    executor: ThreadPoolExecutor,
+):
+    loop = asyncio.get_running_loop()
+    async with connection.models.iterator() as messages:
+        async for message in messages:
+            async with message.process():
+                msg = json.loads(message.body.decode())
+                if not msg:
+                    continue
+
+                if isinstance(msg, dict):
+                    if msg.get("id") and msg.get("function"):
+                        registry.register(msg["id"], msg["function"])
+                    if msg.get("mode") == "exact":
+                        function_container["function"] = None
+                        await publish_exact(msg, connection, compiler, executor)
+                        continue
+                    msg = msg.get("function")
+
+                # la compilacion tambien va al executor: no bloquea la recepcion
+                await loop.run_in_executor(executor, compiler.get, msg)
+                if msg != function_container["function"]:
+                    print(f"Nueva funcion consumida: {msg}")
+                    function_container["function"] = msg
+
+
+async def flush_partials(
+    connection: AsyncConnection, aggregator: ResultAggregator, tracker: AckTracker
+):
+    partials, pending = aggregator.flush()
+    acked = True
+    try:
+        for function, stats in partials:
+            print(
+                f"[PARCIAL] {function}: n={stats['count']} "
+                f"media={stats['mean']:.6f}"
+            )
+            await connection.publish_aggregate(function, stats)
+    except Exception as e:
+        print(f"ERROR, No se pudo publicar parcial: {e}")
+        acked = False
+        for messages in pending:
+            for message in messages:
+                await message.nack(requeue=True)
+
+    # confirmamos los lotes incluidos en el parcial
+    target = None
+    for messages in pending:
+        target = tracker.complete(messages, acked) or target
+    if target is not None:
+        await target.ack(multiple=True)
+
+
+async def flush_aggregates(
+    stop: asyncio.Event,
+    connection: AsyncConnection,
+    aggregator: ResultAggregator,
+    tracker: AckTracker,
+):
+    # publica el parcial pendiente cuando se cumple su plazo
+    while not stop.is_set():
+        time_left = aggregator.time_left()
+        await asyncio.sleep(
+            aggregator.flush_seconds if time_left is None else time_left
+        )
+        if aggregator.due():
+            await flush_partials(connection, aggregator, tracker)
+
+
+async def process_batch(
+    messages: list,
+    connection: AsyncConnection,
+    tracker: AckTracker,
+    function_container: dict,
+    status: dict,
+    compiler: FunctionCompiler,
+    registry: FunctionRegistry,
+    executor: ThreadPoolExecutor,
+    publish_sensitivities: bool,
+    aggregator: ResultAggregator | None,
+    binary_results: bool,
+    controller: FlowController | None,
+):
+    loop = asyncio.get_running_loop()
+    batch = []
+    for message in messages:
+        try:
+            batch.append(
+                parse_scenario(decode_scenario(message.content_type, message.body))
+            )
+        except (ValueError, struct.error) as e:
+            # mensaje malformado: se confirma y se descarta
+            print(f"Mensaje de escenarios descartado: {e}")
+            batch.append((None, None))
+
+    # si no se pudo consultar la funcion de un id (servidor caido), sus
+    # escenarios vuelven a la cola en vez de descartarse
+    unavailable = await loop.run_in_executor(
+        executor,
+        registry.unavailable,
+        {func_id for func_id, _ in batch if func_id is not None},
+    )
+    if unavailable:
+        failed, kept = [], []
+        for message, parsed in zip(messages, batch):
+            if parsed[0] in unavailable:
+                failed.append(message)
+            else:
+                kept.append((message, parsed))
+        for message in failed:
+            await message.nack(requeue=True)
+        print(f"Escenarios devueltos a la cola: {len(failed)}")
+        target = tracker.complete(failed, acked=False)
+        if target is not None:
+            await target.ack(multiple=True)
+        if not kept:
+            return
+        messages = [message for message, _ in kept]
+        batch = [parsed for _, parsed in kept]
+
+    try:
+        # la evaluacion corre en el executor; el loop sigue recibiendo
+        started = loop.time()
+        evaluated = await loop.run_in_executor(
+            executor,
+            evaluate_batch,
+            batch,
+            function_container["function"],
+            compiler,
+            registry,
+            publish_sensitivities,
+        )
+        if controller is not None:
+            controller.record_evaluation(len(messages), loop.time() - started)
+        started = loop.time()
+        # las publicaciones del lote esperan sus confirmaciones en paralelo
+        if aggregator is None and binary_results:
+            await asyncio.gather(
+                *(
+                    connection.publish_result_batch(func_id, results)
+                    for func_id, results in result_batches(evaluated)
+                )
+            )
+        elif aggregator is None:
+            await asyncio.gather(
+                *(
+                    connection.publish_result(result, gradient)
+                    for result, gradient in evaluated_results(evaluated)
+                )
+            )
+        if aggregator is None and controller is not None:
+            controller.record_round_trip(loop.time() - started)
+    except Exception as e:
+        print(f"ERROR, No se pudo procesar el lote: {e}")
+        # el broker lo vuelve a entregar (a este u otro consumidor)
+        for message in messages:
+            await message.nack(requeue=True)
+        target = tracker.complete(messages, acked=False)
+    else:
+        if evaluated:
+            status["scenario"] = last_scenario(evaluated)
+        status["processed"] += len(messages)
+        if aggregator is not None:
+            # el lote se confirma cuando se publique el parcial que lo incluye
+            aggregate_evaluated(aggregator, evaluated)
+            aggregator.defer(messages)
+            if aggregator.due():
+                await flush_partials(connection, aggregator, tracker)
+            return
+        # solo ahora el lote cuenta como procesado
+        target = tracker.complete(messages)
+
+    if target is not None:
+        await target.ack(multiple=True)
+
+
+async def consume_scenarios(
+    connection: AsyncConnection,
+    stop: asyncio.Event,
+    max_batch: int,
+    max_wait: float,
+    max_inflight: int,
+    drain_timeout: float,
+    **context,
+):
+    # los mensajes llegan por callback a una cola local (acotada por el
+    # prefetch) y se juntan en lotes de hasta max_batch o max_wait segundos
+    incoming = asyncio.Queue()
+    consumer_tag = await connection.scenarios.consume(incoming.put)
+    tracker = AckTracker()
+    inflight = asyncio.Semaphore(max_inflight)
+    tasks = set()
+    aggregator = context["aggregator"]
+    controller = context["controller"]
+    prefetch = controller.prefetch() if controller else None
+    if aggregator is not None:
+        flusher = asyncio.create_task(
+            flush_aggregates(stop, connection, aggregator, tracker)
+        )
+
+    while not stop.is_set():
+        try:
+            first = await asyncio.wait_for(incoming.get(), 1.0)
+        except asyncio.TimeoutError:
+            continue
+
+        messages = [first]
+        deadline = asyncio.get_running_loop().time() + max_wait
+        batch_size = controller.batch_size() if controller else max_batch
+        while len(messages) < batch_size:
+            remaining = deadline - asyncio.get_running_loop().time()
+            if remaining <= 0:
+                break
+            try:
+                messages.append(await asyncio.wait_for(incoming.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        for message in messages:
+            tracker.received(message)
+
+        # prefetch ajustado segun la latencia medida
+        if controller is not None and controller.prefetch() != prefetch:
+            prefetch = controller.prefetch()
+            await connection.scenario_channel.set_qos(prefetch_count=prefetch)
+
+        # varios lotes en vuelo; la recepcion solo espera si se llega al limite
+        await inflight.acquire()
+        task = asyncio.create_task(
+            process_batch(messages, connection, tracker, **context)
+        )
+        task.add_done_callback(lambda _: inflight.release())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+
+    # drenado: se deja de recibir, lo no despachado vuelve al broker y se
+    # espera a que los lotes en vuelo publiquen y confirmen
+    await connection.scenarios.cancel(consumer_tag)
+    while not incoming.empty():
+        await incoming.get_nowait().nack(requeue=True)
+    if tasks:
+        await asyncio.wait(tasks, timeout=drain_timeout)
+    if aggregator is not None:
+        flusher.cancel()
+        # el ultimo parcial se publica aunque no se haya cumplido su plazo
+        await flush_partials(connection, aggregator, tracker)
+
+
+async def report(
+    stop: asyncio.Event,
+    heartbeat,
+    functions_task: asyncio.Task,
+    function_container: dict,
+    status: dict,
+    compiler: FunctionCompiler,
+    controller: FlowController | None,
+):
+    ticks = 0
+    while not stop.is_set():
+        await asyncio.sleep(1)
+        # latido para el supervisor
+        if heartbeat is not None:
+            heartbeat.value = time()
+        if functions_task.done():
+            print("ERROR, la recepcion de funciones termino")
+            status["failed"] = True
+            stop.set()
+            return
+
+        ticks += 1
+        if ticks % 10:
+            continue
+        print(f"[ESTADO] Funcion: {function_container['function'] or 'Esperando...'}")
+        print(f"[ESTADO] Escenario: {status['scenario'] or 'Esperando...'}")
+        print(f"[ESTADO] Escenarios procesados: {status['processed']}")
+        print(f"[ESTADO] Cache de funciones: {compiler.stats()}")
+        if controller is not None:
+            print(f"[ESTADO] Flujo: {controller.metrics()}")
+
+
+async def run(instance: int, heartbeat):
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    # SIGTERM (del supervisor o del contenedor) drena antes de terminar
+    loop.add_signal_handler(signal.SIGTERM, stop.set)
+    if heartbeat is not None:
+        # Ctrl+C lo recibe el supervisor, que pide el drenado con SIGTERM
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    else:
+        loop.add_signal_handler(signal.SIGINT, stop.set)
+
+    server_address = f"{os.getenv('SERVER_HOST')}:{os.getenv('SERVER_PORT')}"
+    worker_id = resolve_worker_id(instance, pooled=heartbeat is not None)
+    compiler, registry = create_services(server_address)
+
+    # hilos que evaluan los lotes; el loop solo atiende al broker
+    eval_threads = int(os.getenv("EVAL_THREADS", 4))
+    executor = ThreadPoolExecutor(max_workers=eval_threads)
+    prefetch = int(os.getenv("SCENARIO_PREFETCH", 64))
+    max_batch = max(1, int(os.getenv("SCENARIO_BATCH_SIZE", 1)))
+    publish_sensitivities = os.getenv("PUBLISH_SENSITIVITIES", "0").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+    controller = create_flow_controller(prefetch, max_batch)
+
+    function_container = {
+        "function": await loop.run_in_executor(
+            executor, fetch_initial_function, server_address, registry
+        )
+    }
+    status = {"scenario": None, "processed": 0, "failed": False}
+
+    connection = AsyncConnection(
+        worker_id,
+        window=int(os.getenv("PUBLISH_CONFIRM_WINDOW", 256)),
+        max_retries=int(os.getenv("PUBLISH_MAX_RETRIES", 3)),
+    )
+    await connection.connect(prefetch_count=max(prefetch, max_batch))
+    functions_task = asyncio.create_task(
+        consume_functions(
+            connection, function_container, compiler, registry, executor
+        )
+    )
+    reporter = asyncio.create_task(
+        report(
+            stop,
+            heartbeat,
+            functions_task,
+            function_container,
+            status,
+            compiler,
+            controller,
+        )
+    )
+    print(f"Cliente consumidor {worker_id} iniciado (asyncio)")
+
+    await consume_scenarios(
+        connection,
+        stop,
+        max_batch=max_batch,
+        max_wait=float(os.getenv("SCENARIO_BATCH_WINDOW_MS", 50)) / 1000,
+        max_inflight=int(os.getenv("CONSUMER_MAX_INFLIGHT", 2 * eval_threads)),
+        drain_timeout=float(os.getenv("CONSUMER_DRAIN_TIMEOUT", 30)),
+        function_container=function_container,
+        status=status,
+        compiler=compiler,
+        registry=registry,
+        executor=executor,
+        publish_sensitivities=publish_sensitivities,
+        aggregator=create_aggregator(),
+        binary_results=binary_results_enabled(publish_sensitivities),
+        controller=controller,
+    )
+
+    functions_task.cancel()
+    reporter.cancel()
+    await connection.close_connection()
+    executor.shutdown(wait=False)
+    print(f"Cliente consumidor {worker_id} detenido")
+    return status["failed"]
+
+
+def run_async_consumer(instance: int = 0, heartbeat=None):
+    load_dotenv()
+    if asyncio.run(run(instance, heartbeat)):
+        sys.exit(1)
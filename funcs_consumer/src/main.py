@@ -1,142 +1,759 @@
 import os
+import queue
+import signal
+import sys
 import threading
-from time import sleep
+from time import monotonic, time
+from typing import Dict, List, Tuple
 
 from dotenv import load_dotenv
 import grpc
+import numpy as np
+from funcs_shared.confirmed_publisher import ConfirmedPublisher
 from google.protobuf import empty_pb2
 
 from src.protos import function_service_pb2_grpc
-from src.rabbitmq.connection import Connection
+from src.rabbitmq.batch_settler import BatchSettler
+from src.rabbitmq.connection import (
+    RESULT_BATCH_PROPERTIES,
+    RESULT_PROPERTIES,
+    Connection,
+    aggregate_message,
+    connection_parameters,
+    resolve_worker_id,
+    result_batch_message,
+    result_message,
+)
+from src.services.evaluation_budget import EvaluationBudget
+from src.services.exact_expectation import ExactExpectation
+from src.services.function_catalog import FunctionCatalog
+from src.services.function_compiler import CompiledFunction, FunctionCompiler
 from src.services.function_executer import FunctionExecuter
-from src.services.str_function_parser import StrFunctionParser
+from src.services.flow_controller import FlowController
+from src.services.function_registry import FunctionRegistry
+from src.services.running_stats import ResultAggregator
+from src.services.scenario_recipe import message_matrix
+from src.services.shared_evaluation import SharedEvaluation
+from src.services.worker_supervisor import WorkerSupervisor
+
+
+def publish_exact(msg: dict, compiler: FunctionCompiler, connection: Connection):
+    compiled_function = compiler.get(msg.get("function"))
+    if not compiled_function:
+        return
+
+    try:
+        expectation = ExactExpectation.compute(
+            compiled_function, msg.get("distribution"), msg.get("params", {})
+        )
+    except Exception as e:
+        # corre en el hilo que recibe funciones: un error no debe terminarlo
+        print(f"ERROR, No se pudo calcular el valor exacto: {e}")
+        expectation = None
+    if expectation is None:
+        print(f"No se pudo calcular el valor exacto de {msg.get('function')}")
+        return
+
+    print(f"[EXACTO] Función: {msg.get('function')} ({msg.get('distribution')})")
+    print(f"  Esperanza: {expectation['mean']:.6f}")
+    print(f"  Varianza: {expectation['variance']:.6f}")
+    connection.publish_exact(msg.get("function"), expectation)
 
 
 def consume_function(
-    function_container: dict, lock: threading.Lock, new_data_event: threading.Event
+    worker_id: str,
+    function_container: dict,
+    lock: threading.Lock,
+    compiler: FunctionCompiler,
+    registry: FunctionRegistry,
 ):
-    connection = Connection()
+    connection = Connection(worker_id)
     for msg in connection.consume_function():
         if not msg:
             continue
 
+        if isinstance(msg, dict):
+            # registramos la funcion por id para resolver sus escenarios
+            # aunque lleguen despues de que cambie la funcion actual
+            if msg.get("id") and msg.get("function"):
+                registry.register(msg["id"], msg["function"])
+
+            # Modo exacto: el servidor no publica escenarios para esta funcion,
+            # se enumera el soporte discreto y se publica esperanza/varianza
+            if msg.get("mode") == "exact":
+                with lock:
+                    function_container["function"] = None
+                publish_exact(msg, compiler, connection)
+                continue
+            msg = msg.get("function")
+
+        # compilamos al recibirla para no hacerlo al llegar el primer escenario
+        compiler.get(msg)
+
         with lock:
             old_func = function_container.get("function")
             if msg != old_func:
                 print(f"Nueva funcion consumida: {msg}")
                 function_container["function"] = msg
-                # Señalar que hay nueva funcion
-                new_data_event.set()
+
+
+def parse_scenario(msg) -> Tuple[str | None, list | dict]:
+    # {"function_id": ..., "scenario": [...]}; una lista sola es el formato
+    # anterior y se evalua con la funcion actual. Los bloques y las recetas
+    # ({"type": "block" | "recipe", ...}) se devuelven completos y se
+    # convierten en matriz al evaluarlos
+    if isinstance(msg, dict):
+        if msg.get("type") in ("block", "recipe"):
+            return msg.get("function_id"), msg
+        return msg.get("function_id"), msg.get("scenario")
+    return None, msg
+
 
 def consume_scenario(
-    buffer_scenario: list, lock: threading.Lock, new_data_event: threading.Event
+    worker_id: str,
+    scenario_queue: queue.Queue,
+    prefetch: int,
+    max_batch: int,
+    max_wait: float,
+    stop_event=None,
+    drain_timeout: float = 30.0,
+    controller: FlowController | None = None,
+    submit=None,
+    registry: FunctionRegistry | None = None,
 ):
-    connection = Connection()
-    for msg in connection.consume_scenario():
-        if not msg:
+    # el broker no entrega mas de `prefetch` escenarios sin confirmar y la cola
+    # tiene ese mismo tamaño (en lotes): si la evaluacion va lenta, la entrega
+    # se frena en el broker (backpressure) en vez de descartar escenarios
+    prefetch = max(prefetch, max_batch)
+    connection = Connection(worker_id, prefetch_count=prefetch)
+    for messages in connection.consume_scenario(
+        controller.batch_size if controller else max_batch, max_wait, stop_event
+    ):
+        batch = [parse_scenario(msg) for _, msg in messages]
+        if registry is not None:
+            messages, batch = requeue_unavailable(connection, registry, messages, batch)
+            if not messages:
+                continue
+        # modo compartido: el lote se envia ya a los procesos evaluadores
+        if submit is not None:
+            batch = submit(batch)
+
+        # cada escenario se evalua una vez aunque sea igual al anterior; el
+        # lote se confirma (ack) despues de publicar sus resultados
+        scenario_queue.put((connection, messages[-1][0], batch))
+
+        # prefetch ajustado segun la latencia medida
+        if controller is not None and controller.prefetch() != prefetch:
+            prefetch = controller.prefetch()
+            connection.set_prefetch(prefetch)
+
+    # drenado: ya no se reciben escenarios; se sigue atendiendo la conexion
+    # hasta que se evaluen y confirmen los que estan en la cola
+    connection.drain(lambda: scenario_queue.unfinished_tasks > 0, drain_timeout)
+    connection.close_connection()
+
+
+# resultados de un grupo de escenarios de la misma funcion, como arreglos:
+# (funcion, escenarios (n, n_vars) o None, resultados (n,), gradientes
+# (n, n_vars) o None). Solo se arman filas de Python para los mensajes JSON
+EvaluatedGroup = Tuple[
+    CompiledFunction, np.ndarray | None, np.ndarray, np.ndarray | None
+]
+
+
+def requeue_unavailable(
+    connection: Connection, registry: FunctionRegistry, messages: list, batch: list
+) -> Tuple[list, list]:
+    # si no se pudo consultar la funcion de un id (servidor caido), sus
+    # escenarios vuelven a la cola uno por uno (sin multiple, que tambien
+    # alcanzaria a lotes anteriores aun sin confirmar) en vez de descartarse
+    unavailable = registry.unavailable(
+        {func_id for func_id, _ in batch if func_id is not None}
+    )
+    if not unavailable:
+        return messages, batch
+    kept_messages, kept_batch = [], []
+    for message, parsed in zip(messages, batch):
+        if parsed[0] in unavailable:
+            connection.nack_scenario(message[0])
+        else:
+            kept_messages.append(message)
+            kept_batch.append(parsed)
+    print(f"Escenarios devueltos a la cola: {len(messages) - len(kept_messages)}")
+    return kept_messages, kept_batch
+
+
+def evaluate_scenarios(
+    compiled_function: CompiledFunction,
+    scenarios: List[list],
+    publish_sensitivities: bool,
+) -> EvaluatedGroup | None:
+    # devuelve los escenarios que se pudieron evaluar con sus resultados
+    if len(scenarios) == 1:
+        result = FunctionExecuter.execute(compiled_function, scenarios[0])
+        if result is None:
+            return None
+        try:
+            values = np.array([result], dtype=np.float64)
+        except (TypeError, ValueError):
+            print(f"Resultado no numerico descartado: {result}")
+            return None
+        matrix = np.array(scenarios, dtype=np.float64)
+        gradients = None
+        # Sensibilidades opcionales (diferenciacion automatica hacia adelante)
+        if publish_sensitivities:
+            evaluated = FunctionExecuter.execute_gradient(compiled_function, matrix)
+            if evaluated is not None:
+                gradients = evaluated[1]
+        return finite_group(compiled_function, matrix, values, gradients)
+
+    # lote: una sola pasada vectorizada para todos los escenarios
+    n_vars = len(compiled_function.vars)
+    valid = [s for s in scenarios if len(s) == n_vars]
+    if not valid:
+        return None
+    return evaluate_matrix(
+        compiled_function, np.array(valid, dtype=np.float64), publish_sensitivities
+    )
+
+
+def finite_group(
+    compiled_function: CompiledFunction,
+    matrix: np.ndarray | None,
+    values: np.ndarray,
+    gradients: np.ndarray | None,
+) -> EvaluatedGroup:
+    # en lote la division por cero da inf/nan en vez de excepcion: se
+    # descarta igual que en la evaluacion escalar
+    finite = np.isfinite(values)
+    if not finite.all():
+        values = values[finite]
+        matrix = matrix[finite] if matrix is not None else None
+        gradients = gradients[finite] if gradients is not None else None
+    return compiled_function, matrix, values, gradients
+
+
+def evaluate_matrix(
+    compiled_function: CompiledFunction,
+    matrix: np.ndarray,
+    publish_sensitivities: bool,
+) -> EvaluatedGroup | None:
+    gradients = None
+    if publish_sensitivities:
+        evaluated = FunctionExecuter.execute_gradient(compiled_function, matrix)
+        if evaluated is None:
+            return None
+        results, gradients = evaluated
+    else:
+        results = FunctionExecuter.execute_batch(compiled_function, matrix)
+        if results is None:
+            return None
+    return finite_group(compiled_function, matrix, results, gradients)
+
+
+def evaluate_message(
+    compiled_function: CompiledFunction, message: dict, publish_sensitivities: bool
+) -> EvaluatedGroup | None:
+    # bloque o receta: matriz (n, n_vars) evaluada en una pasada
+    try:
+        matrix = message_matrix(message, len(compiled_function.vars))
+    except (ValueError, TypeError) as e:
+        print(f"Mensaje de escenarios invalido: {e}")
+        return None
+    return evaluate_matrix(compiled_function, matrix, publish_sensitivities)
+
+
+def evaluated_count(evaluated: List[EvaluatedGroup]) -> int:
+    return sum(len(values) for _, _, values, _ in evaluated)
+
+
+def last_scenario(evaluated: List[EvaluatedGroup]) -> list | None:
+    # ultimo escenario evaluado, para el estado
+    for _, matrix, values, _ in reversed(evaluated):
+        if matrix is not None and len(values):
+            return matrix[-1].tolist()
+    return None
+
+
+def evaluated_results(evaluated: List[EvaluatedGroup]):
+    # (resultado, gradiente) de cada escenario, solo para los mensajes JSON
+    for compiled_function, _, values, gradients in evaluated:
+        if gradients is None:
+            for result in values.tolist():
+                yield result, None
             continue
+        for result, gradient in zip(values.tolist(), gradients.tolist()):
+            yield result, dict(zip(compiled_function.vars, gradient))
 
-        with lock:
-            # Comparar si es diferente al anterior
-            if msg != buffer_scenario:
-                print(f"Nuevo escenario consumido: {msg}")
-                buffer_scenario.clear()
-                buffer_scenario.extend(msg)
-                # Señalar que hay nuevo escenario
-                new_data_event.set()
+
+def group_batch(
+    batch: List[Tuple[str | None, list | dict]],
+    current_function: str | None,
+    compiler: FunctionCompiler,
+    registry: FunctionRegistry,
+) -> List[Tuple[CompiledFunction, List[list | dict]]]:
+    # escenarios de distintas funciones pueden venir intercalados: se
+    # agrupan por funcion para evaluar cada grupo en una pasada
+    groups: Dict[str | None, List[list]] = {}
+    for func_id, scenario in batch:
+        if scenario:
+            groups.setdefault(func_id, []).append(scenario)
+
+    resolved = []
+    for func_id, scenarios in groups.items():
+        # Obtener la funcion compilada (solo se parsea la primera vez);
+        # sin id se usa la funcion actual
+        if func_id:
+            compiled_function = registry.resolve(func_id)
+        elif current_function is not None:
+            compiled_function = compiler.get(current_function)
+        else:
+            compiled_function = None
+
+        # funcion desconocida/invalida o error de evaluacion: reintentar
+        # los escenarios no cambiaria el resultado, se confirman y descartan
+        # (los de funciones que no se pudieron consultar ya volvieron a la
+        # cola al recibirlos)
+        if not compiled_function:
+            print(f"Escenarios descartados: {len(scenarios)}")
+            continue
+        resolved.append((compiled_function, scenarios))
+    return resolved
+
+
+def evaluate_batch(
+    batch: List[Tuple[str | None, list | dict]],
+    current_function: str | None,
+    compiler: FunctionCompiler,
+    registry: FunctionRegistry,
+    publish_sensitivities: bool,
+) -> List[EvaluatedGroup]:
+    evaluated = []
+    for compiled_function, scenarios in group_batch(
+        batch, current_function, compiler, registry
+    ):
+        plain = [s for s in scenarios if not isinstance(s, dict)]
+        if plain:
+            group = evaluate_scenarios(compiled_function, plain, publish_sensitivities)
+            kept = len(group[2]) if group is not None else 0
+            if kept < len(plain):
+                print(f"Escenarios descartados: {len(plain) - kept}")
+            if kept:
+                evaluated.append(group)
+        for message in scenarios:
+            if isinstance(message, dict):
+                group = evaluate_message(
+                    compiled_function, message, publish_sensitivities
+                )
+                if group is not None and len(group[2]):
+                    evaluated.append(group)
+
+    results = evaluated_count(evaluated)
+    if len(batch) == 1 and results == 1:
+        compiled_function, matrix, values, _ = evaluated[0]
+        print(f"[RESULTADO] Generado: {values[0]:.6f}")
+        print(f"  Función: {compiled_function.source}")
+        print(f"  Escenario: {[round(x, 3) for x in matrix[0].tolist()]}")
+    elif len(batch) > 1:
+        print(f"[RESULTADO] Lote: {results} resultados de {len(batch)} mensajes")
+    return evaluated
+
+
+def aggregate_evaluated(aggregator: ResultAggregator, evaluated: list):
+    # los resultados se acumulan por funcion en vez de publicarse uno a uno
+    for compiled_function, _, values, _ in evaluated:
+        aggregator.add(compiled_function.source, values)
+
+
+def result_batches(evaluated: list) -> List[Tuple[str, np.ndarray]]:
+    # resultados del lote agrupados por id de funcion, un mensaje binario
+    # por grupo; los arreglos float64 pasan tal cual al mensaje
+    groups: Dict[str, List[np.ndarray]] = {}
+    for compiled_function, _, values, _ in evaluated:
+        groups.setdefault(compiled_function.id, []).append(values)
+    return [
+        (func_id, values[0] if len(values) == 1 else np.concatenate(values))
+        for func_id, values in groups.items()
+    ]
+
+
+def binary_results_enabled(publish_sensitivities: bool) -> bool:
+    # RESULT_ENCODING=binary publica lotes binarios; las sensibilidades no
+    # caben en un buffer de float64 y siguen viajando en JSON
+    return (
+        os.getenv("RESULT_ENCODING", "json").lower() == "binary"
+        and not publish_sensitivities
+    )
+
+
+def result_bodies(worker_id: str, evaluated: list, binary_results: bool) -> list:
+    # cuerpos y propiedades de los mensajes de resultados de un lote
+    if binary_results:
+        return [
+            (result_batch_message(worker_id, func_id, results), RESULT_BATCH_PROPERTIES)
+            for func_id, results in result_batches(evaluated)
+        ]
+    return [
+        (result_message(worker_id, result, gradient), RESULT_PROPERTIES)
+        for result, gradient in evaluated_results(evaluated)
+    ]
+
+
+def create_publisher() -> ConfirmedPublisher | None:
+    # PUBLISH_CONFIRMS=1 (por defecto): los resultados se publican con
+    # confirmaciones del broker y los escenarios se confirman recien cuando
+    # sus resultados estan confirmados; hasta PUBLISH_CONFIRM_WINDOW mensajes
+    # pueden estar esperando confirmacion a la vez
+    if os.getenv("PUBLISH_CONFIRMS", "1").lower() not in ("1", "true", "yes"):
+        return None
+    return ConfirmedPublisher(
+        connection_parameters(),
+        window=int(os.getenv("PUBLISH_CONFIRM_WINDOW", 256)),
+        max_retries=int(os.getenv("PUBLISH_MAX_RETRIES", 3)),
+    ).start()
+
+
+def timed_settle(on_done, controller: FlowController | None):
+    # mide la ida y vuelta al broker: de la publicacion a la confirmacion
+    if controller is None:
+        return on_done
+    started = monotonic()
+
+    def settle(ok: bool):
+        controller.record_round_trip(monotonic() - started)
+        on_done(ok)
+
+    return settle
+
+
+def create_flow_controller(prefetch: int, max_batch: int) -> FlowController | None:
+    # ADAPTIVE_FLOW=1: lote y prefetch se ajustan para que cada lote tarde
+    # ~ADAPTIVE_TARGET_MS en evaluarse; SCENARIO_BATCH_SIZE y SCENARIO_PREFETCH
+    # son solo los valores iniciales
+    if os.getenv("ADAPTIVE_FLOW", "0").lower() not in ("1", "true", "yes"):
+        return None
+    return FlowController(
+        target_latency=float(os.getenv("ADAPTIVE_TARGET_MS", 100)) / 1000,
+        max_batch=int(os.getenv("ADAPTIVE_MAX_BATCH", 1024)),
+        max_prefetch=int(os.getenv("ADAPTIVE_MAX_PREFETCH", 4096)),
+        initial_batch=max_batch,
+        initial_prefetch=prefetch,
+    )
 
 
 def produce_result(
+    worker_id: str,
     function_container: dict,
-    buffer_scenario: list,
+    scenario_queue: queue.Queue,
+    status: dict,
     lock: threading.Lock,
-    new_data_event: threading.Event,
+    compiler: FunctionCompiler,
+    registry: FunctionRegistry,
+    publish_sensitivities: bool = False,
+    aggregator: ResultAggregator | None = None,
+    binary_results: bool = False,
+    controller: FlowController | None = None,
+    evaluate=evaluate_batch,
 ):
-    connection = Connection()
-    last_function = None
-    last_scenario = None
+    publisher = create_publisher()
+    connection = Connection(worker_id) if publisher is None else None
+    # con confirmaciones los elementos de la cola se liberan al confirmarse
+    # sus resultados, no al publicarlos
+    settler = BatchSettler(
+        lambda items: [scenario_queue.task_done() for _ in range(items)]
+    )
 
     while True:
-        # Esperar hasta que haya nueva funcion o nuevo escenario
-        new_data_event.wait()
-        new_data_event.clear()  # Resetear el evento
+        # bloquea hasta que haya un lote, sin esperas fijas; con agregacion
+        # solo hasta que toque publicar el parcial pendiente
+        try:
+            item = scenario_queue.get(
+                timeout=aggregator.time_left() if aggregator else None
+            )
+        except queue.Empty:
+            item = None
 
-        with lock:
-            current_function = function_container.get("function")
-            current_scenario = buffer_scenario.copy() if buffer_scenario else None
-            
-            if current_scenario is None or current_function is None:
-                continue
+        if item is not None:
+            intake, last_tag, batch = item
+            multiple = len(batch) > 1
 
-            # Verificar si son los mismos datos que ya procesamos
-            if current_function == last_function and current_scenario == last_scenario:
-                continue
+            with lock:
+                current_function = function_container.get("function")
 
-            # Parsear la funcion
-            parsed_function = StrFunctionParser.parse_function(function_container)
-            if not parsed_function:
-                continue
+            # Ejecutar la funcion fuera del lock: una funcion costosa no debe
+            # bloquear a los hilos que consumen funciones y escenarios
+            started = monotonic()
+            evaluated = evaluate(
+                batch, current_function, compiler, registry, publish_sensitivities
+            )
+            if controller is not None:
+                controller.record_evaluation(len(batch), monotonic() - started)
+            with lock:
+                if evaluated:
+                    status["scenario"] = last_scenario(evaluated)
+                status["processed"] += len(batch)
 
-            # Ejecutar la funcion
-            result = FunctionExecuter.execute(parsed_function, current_scenario)
+        if aggregator is not None:
+            if item is not None:
+                # el lote se confirma cuando se publique el parcial que lo incluye
+                aggregate_evaluated(aggregator, evaluated)
+                aggregator.defer((intake, last_tag, multiple))
+            if aggregator.due() and publisher is not None:
+                publish_partials_confirmed(worker_id, publisher, settler, aggregator)
+            elif aggregator.due():
+                connection, flushed = publish_partials(
+                    worker_id, connection, aggregator
+                )
+                for _ in range(flushed):
+                    scenario_queue.task_done()
+            continue
 
-        # Publicar resultado fuera del lock
-        if result is not None:
-            print(f"[RESULTADO] Generado: {result:.6f}")
-            print(f"  Función: {current_function}")
-            print(f"  Escenario: {[round(x, 3) for x in current_scenario]}")
+        if publisher is not None:
+            # no espera la confirmacion: el lote se confirma desde el
+            # callback y se sigue con el proximo
+            publisher.publish_batch(
+                "results",
+                result_bodies(worker_id, evaluated, binary_results),
+                timed_settle(settler.track(intake, last_tag, multiple), controller),
+            )
+            continue
 
-            try:
-                connection.publish_result(result)
-                # Actualizar lo ultimo procesado
-                last_function = current_function
-                last_scenario = current_scenario
-            except Exception as e:
-                print(f"ERROR, No se pudo publicar resultado: {e}")
-                # Intentar reconectar
-                try:
-                    connection = Connection()
-                except Exception as reconnect_error:
-                    print(f"ERROR, No se pudo reconectar: {reconnect_error}")
+        started = monotonic()
+        try:
+            if binary_results:
+                for func_id, results in result_batches(evaluated):
+                    connection.publish_result_batch(func_id, results)
+            else:
+                for result, gradient in evaluated_results(evaluated):
+                    connection.publish_result(result, gradient)
+            # solo ahora el lote cuenta como procesado: un ack para todos
+            intake.ack_scenario(last_tag, multiple=multiple)
+            if controller is not None:
+                controller.record_round_trip(monotonic() - started)
+        except Exception as e:
+            print(f"ERROR, No se pudo publicar resultado: {e}")
+            # el broker lo vuelve a entregar (a este u otro consumidor)
+            intake.nack_scenario(last_tag, multiple=multiple)
+            connection = reconnect(worker_id, connection)
 
-        sleep(0.1)
+        scenario_queue.task_done()
 
 
-def main():
-    load_dotenv()
-    server_address = f"{os.getenv('SERVER_HOST')}:{os.getenv('SERVER_PORT')}"
+def reconnect(worker_id: str, connection: Connection) -> Connection:
+    # Intentar reconectar
+    try:
+        return Connection(worker_id)
+    except Exception as reconnect_error:
+        print(f"ERROR, No se pudo reconectar: {reconnect_error}")
+        return connection
 
-    function = {"function": None}
-    scenario = []
-    lock = threading.Lock()
 
-    # Evento para señalar cuando hay nueva funcion o escenario
-    new_data_event = threading.Event()
+def publish_partials(
+    worker_id: str, connection: Connection, aggregator: ResultAggregator
+) -> Tuple[Connection, int]:
+    # devuelve la conexion (nueva si hubo que reconectar) y cuantos lotes
+    # quedaron resueltos
+    partials, pending = aggregator.flush()
+    try:
+        for function, stats in partials:
+            print(
+                f"[PARCIAL] {function}: n={stats['count']} "
+                f"media={stats['mean']:.6f}"
+            )
+            connection.publish_aggregate(function, stats)
+        # los lotes vienen en orden de entrega: un solo ack confirma todos
+        # los incluidos en el parcial
+        if pending:
+            intake, last_tag, _ = pending[-1]
+            intake.ack_scenario(last_tag, multiple=True)
+    except Exception as e:
+        print(f"ERROR, No se pudo publicar parcial: {e}")
+        if pending:
+            intake, last_tag, _ = pending[-1]
+            intake.nack_scenario(last_tag, multiple=True)
+        connection = reconnect(worker_id, connection)
+    return connection, len(pending)
+
+
+def publish_partials_confirmed(
+    worker_id: str,
+    publisher: ConfirmedPublisher,
+    settler: BatchSettler,
+    aggregator: ResultAggregator,
+):
+    # igual que publish_partials, pero los lotes incluidos se confirman cuando
+    # el broker confirma los parciales
+    partials, pending = aggregator.flush()
+    for function, stats in partials:
+        print(f"[PARCIAL] {function}: n={stats['count']} media={stats['mean']:.6f}")
+    if not pending:
+        return
+    intake, last_tag, _ = pending[-1]
+    publisher.publish_batch(
+        "results",
+        [
+            (aggregate_message(worker_id, function, stats), RESULT_PROPERTIES)
+            for function, stats in partials
+        ],
+        settler.track(intake, last_tag, True, items=len(pending)),
+    )
+
+
+def create_services(server_address: str) -> Tuple[FunctionCompiler, FunctionRegistry]:
+    budget = EvaluationBudget.from_env()
+    # catalogo en disco para no recompilar las funciones al reiniciar;
+    # FUNCTION_CATALOG_PATH vacio lo desactiva
+    catalog_path = os.getenv(
+        "FUNCTION_CATALOG_PATH", "~/.cache/montecarlo/function_catalog.bin"
+    )
+    compiler = FunctionCompiler(
+        max_size=int(os.getenv("FUNCTION_CACHE_SIZE", 128)),
+        budget=budget,
+        memo_size=int(os.getenv("RESULT_MEMO_SIZE", 4096)),
+        catalog=(
+            FunctionCatalog(os.path.expanduser(catalog_path), budget)
+            if catalog_path
+            else None
+        ),
+    )
+    registry = FunctionRegistry(
+        compiler, server_address, max_size=int(os.getenv("FUNCTION_CACHE_SIZE", 128))
+    )
+    return compiler, registry
+
 
+def create_aggregator() -> ResultAggregator | None:
+    # RESULT_AGGREGATION=1: en vez de un mensaje por resultado se publica un
+    # parcial (count, mean, m2, min, max) por funcion cada
+    # AGGREGATE_FLUSH_COUNT resultados o AGGREGATE_FLUSH_MS milisegundos
+    if os.getenv("RESULT_AGGREGATION", "0").lower() not in ("1", "true", "yes"):
+        return None
+    return ResultAggregator(
+        flush_count=int(os.getenv("AGGREGATE_FLUSH_COUNT", 1000)),
+        flush_seconds=float(os.getenv("AGGREGATE_FLUSH_MS", 1000)) / 1000,
+    )
+
+
+def fetch_initial_function(server_address: str, registry: FunctionRegistry):
     # obtenemos la funcion actual via gRPC
     try:
         with grpc.insecure_channel(server_address) as channel:
             stub = function_service_pb2_grpc.FunctionServiceStub(channel)
             response = stub.GetFuncModel(empty_pb2.Empty())
             if response and response.function:
-                with lock:
-                    function["function"] = response.function
+                if response.id:
+                    registry.register(response.id, response.function)
                 print(f"Funcion inicial obtenida: {response.function}")
+                return response.function
     except Exception as e:
         print(f"No se pudo obtener funcion via gRPC: {e}")
+    return None
+
+
+def run_consumer(instance: int = 0, heartbeat=None, shared_evaluators: int = 0):
+    # un proceso consumidor; con el supervisor hay uno por nucleo y cada uno
+    # tiene sus conexiones y su cache de funciones. Con shared_evaluators > 0
+    # este proceso solo recibe y publica, y evaluan procesos hijos que leen
+    # los escenarios de memoria compartida
+    stop_event = threading.Event()
+    # SIGTERM (del supervisor o del contenedor) drena antes de terminar
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+    if heartbeat is not None:
+        # Ctrl+C lo recibe el supervisor, que pide el drenado con SIGTERM
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+    drain_timeout = float(os.getenv("CONSUMER_DRAIN_TIMEOUT", 30))
+
+    load_dotenv()
+    server_address = f"{os.getenv('SERVER_HOST')}:{os.getenv('SERVER_PORT')}"
+    # con heartbeat el proceso lo lanzo el supervisor
+    worker_id = resolve_worker_id(instance, pooled=heartbeat is not None)
+
+    function = {"function": None}
+    status = {"scenario": None, "processed": 0}
+    lock = threading.Lock()
+    compiler, registry = create_services(server_address)
+
+    # cola acotada entre la recepcion de escenarios y su evaluacion; con
+    # SCENARIO_BATCH_SIZE > 1 se juntan hasta K escenarios (o los que lleguen
+    # en SCENARIO_BATCH_WINDOW_MS) y se evaluan y confirman como un lote
+    prefetch = int(os.getenv("SCENARIO_PREFETCH", 64))
+    max_batch = max(1, int(os.getenv("SCENARIO_BATCH_SIZE", 1)))
+    max_wait = float(os.getenv("SCENARIO_BATCH_WINDOW_MS", 50)) / 1000
+    controller = create_flow_controller(prefetch, max_batch)
+    # con ajuste adaptativo el tamaño de lote cambia: la cola admite tantos
+    # lotes como escenarios puede haber sin confirmar
+    scenario_queue = queue.Queue(
+        maxsize=controller.max_prefetch if controller else max(1, prefetch // max_batch)
+    )
+
+    function["function"] = fetch_initial_function(server_address, registry)
+    publish_sensitivities = os.getenv("PUBLISH_SENSITIVITIES", "0").lower() in (
+        "1",
+        "true",
+        "yes",
+    )
+
+    shared, submit, evaluate = None, None, evaluate_batch
+    if shared_evaluators > 0:
+        if publish_sensitivities:
+            print("Modo compartido: las sensibilidades no se publican")
+        shared = SharedEvaluation(
+            shared_evaluators,
+            slots=int(os.getenv("SHARED_RING_SLOTS") or 2 * shared_evaluators),
+            slot_values=int(os.getenv("SHARED_SLOT_VALUES", 65536)),
+        )
+        shared.start()
+
+        def submit(batch):
+            with lock:
+                current_function = function["function"]
+            return shared.submit(
+                group_batch(batch, current_function, compiler, registry), len(batch)
+            )
+
+        def evaluate(batch, *_):
+            return batch.result()
 
     # Threads para consumir funcion y escenarios
     functions_thread = threading.Thread(
-        target=consume_function, args=(function, lock, new_data_event), daemon=True
+        target=consume_function,
+        args=(worker_id, function, lock, compiler, registry),
+        daemon=True,
     )
 
     scenarios_thread = threading.Thread(
-        target=consume_scenario, args=(scenario, lock, new_data_event), daemon=True
+        target=consume_scenario,
+        args=(
+            worker_id,
+            scenario_queue,
+            prefetch,
+            max_batch,
+            max_wait,
+            stop_event,
+            drain_timeout,
+            controller,
+            submit,
+            registry,
+        ),
+        daemon=True,
     )
 
     producer_thread = threading.Thread(
         target=produce_result,
-        args=(function, scenario, lock, new_data_event),
+        args=(
+            worker_id,
+            function,
+            scenario_queue,
+            status,
+            lock,
+            compiler,
+            registry,
+            publish_sensitivities,
+            create_aggregator(),
+            binary_results_enabled(publish_sensitivities) and shared is None,
+            controller,
+            evaluate,
+        ),
         daemon=True,
     )
 
@@ -145,19 +762,87 @@ def main():
     scenarios_thread.start()
     producer_thread.start()
 
+    threads = [functions_thread, scenarios_thread, producer_thread]
     try:
-        print("Cliente consumidor iniciado")
+        print(f"Cliente consumidor {worker_id} iniciado")
+
+        last_status = monotonic()
+        while not stop_event.wait(1):
+            # latido para el supervisor; si un hilo murio el proceso termina
+            # y el supervisor lo reinicia
+            if heartbeat is not None:
+                heartbeat.value = time()
+            if not all(thread.is_alive() for thread in threads):
+                print("ERROR, un hilo del consumidor termino")
+                if shared is not None:
+                    shared.stop(timeout=1.0)
+                sys.exit(1)
+            if shared is not None and not shared.alive():
+                # lo que tenia el evaluador muerto no volveria: se termina y
+                # el broker reentrega lo no confirmado
+                print("ERROR, un proceso evaluador termino")
+                shared.stop(timeout=1.0)
+                sys.exit(1)
+            if monotonic() - last_status < 10:
+                continue
+            last_status = monotonic()
 
-        while True:
-            sleep(10)
             with lock:
                 func = function.get("function", "Esperando...")
-                scen = scenario if scenario else "Esperando..."
+                scen = status["scenario"] or "Esperando..."
+                processed = status["processed"]
             print(f"[ESTADO] Funcion: {func}")
             print(f"[ESTADO] Escenario: {scen}")
+            print(
+                f"[ESTADO] Escenarios procesados: {processed}, "
+                f"en cola: {scenario_queue.qsize()}"
+            )
+            print(f"[ESTADO] Cache de funciones: {compiler.stats()}")
+            if controller is not None:
+                print(f"[ESTADO] Flujo: {controller.metrics()}")
 
     except KeyboardInterrupt:
         print("\nCliente detenido por el usuario")
+        stop_event.set()
+
+    # esperamos a que se confirme lo que ya se habia recibido
+    scenarios_thread.join(drain_timeout)
+    if shared is not None:
+        shared.stop()
+    print(f"Cliente consumidor {worker_id} detenido")
+
+
+def main():
+    load_dotenv()
+    target = run_consumer
+    # CONSUMER_RUNTIME=asyncio: una conexion con canales multiplexados y la
+    # evaluacion en un executor (requiere aio-pika)
+    if os.getenv("CONSUMER_RUNTIME", "threads") == "asyncio":
+        from src.async_main import run_async_consumer
+
+        target = run_async_consumer
+
+    # CONSUMER_MODE=supervisor: un proceso consumidor por nucleo (o
+    # CONSUMER_WORKERS) con reinicios y drenado; si no, un solo proceso
+    mode = os.getenv("CONSUMER_MODE", "single")
+    if mode == "shared":
+        # CONSUMER_MODE=shared: una sola conexion al broker por maquina y
+        # SHARED_EVALUATORS procesos evaluadores (uno por nucleo por defecto)
+        # que leen los escenarios de un anillo en memoria compartida
+        run_consumer(
+            shared_evaluators=int(
+                os.getenv("SHARED_EVALUATORS") or os.cpu_count() or 1
+            )
+        )
+    elif mode == "supervisor":
+        WorkerSupervisor(
+            target,
+            int(os.getenv("CONSUMER_WORKERS") or os.cpu_count() or 1),
+            health_timeout=float(os.getenv("CONSUMER_HEALTH_TIMEOUT", 30)),
+            drain_timeout=float(os.getenv("CONSUMER_DRAIN_TIMEOUT", 30)),
+        ).run()
+    else:
+        target()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,182 @@
+import argparse
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+from funcs_shared.function_file import parse_function_line
+
+from src.services.evaluation_budget import EvaluationBudget
+from src.services.function_compiler import FunctionCompiler, function_id
+from src.services.function_executer import FunctionExecuter
+from src.services.running_stats import RunningStats
+
+# evaluacion por lotes sin RabbitMQ: cada funcion del archivo (formato
+# fns.txt) se evalua sobre la matriz de escenarios <function_id>.npy
+# (n_escenarios, n_vars) generada con el export del servidor
+#
+#   python -m src.offline_main fns.txt escenarios/ -o resultados/
+#
+# la matriz se abre con mmap y se reparte en bloques de filas entre todos los
+# nucleos. Se escriben:
+#   <function_id>.npy   float64 (n_escenarios,), un resultado por fila
+#   aggregates.npy      arreglo estructurado con count, mean, m2, min, max
+#                       por funcion (los resultados no finitos no cuentan)
+
+AGGREGATE_DTYPE = np.dtype(
+    [
+        ("function_id", "S16"),
+        ("count", "<i8"),
+        ("mean", "<f8"),
+        ("m2", "<f8"),
+        ("min", "<f8"),
+        ("max", "<f8"),
+    ]
+)
+
+# compilador de cada proceso del pool
+_compiler: FunctionCompiler | None = None
+
+
+def read_functions(path: str) -> List[str]:
+    # mismo formato que lee el servidor; las funciones en modo exacto no usan
+    # escenarios y se omiten
+    functions = []
+    with open(path, "r") as file:
+        for line in file:
+            parsed = parse_function_line(line)
+            if parsed is None:
+                continue
+            function, _, mode = parsed
+            if mode == "exact":
+                print(f"Funcion en modo exact omitida: {function}")
+                continue
+            functions.append(function)
+    return functions
+
+
+def evaluate_chunk(
+    function: str, scenarios_path: str, results_path: str, start: int, stop: int
+) -> dict:
+    # corre en un proceso del pool: lee su bloque del mmap de escenarios,
+    # escribe sus resultados en el mmap de salida y devuelve el parcial
+    global _compiler
+    if _compiler is None:
+        load_dotenv()
+        _compiler = FunctionCompiler(budget=EvaluationBudget.from_env())
+
+    compiled_function = _compiler.get(function)
+    scenarios = np.load(scenarios_path, mmap_mode="r")
+    results = np.load(results_path, mmap_mode="r+")
+
+    values = FunctionExecuter.execute_batch(compiled_function, scenarios[start:stop])
+    if values is None:
+        # bloque rechazado (presupuesto o error): queda como nan
+        results[start:stop] = np.nan
+        values = np.empty(0)
+    else:
+        results[start:stop] = values
+    results.flush()
+
+    stats = RunningStats()
+    stats.add(values[np.isfinite(values)])
+    return stats.to_dict()
+
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(
+        description="Evalua las funciones de un archivo sobre matrices .npy"
+    )
+    parser.add_argument("functions", help="archivo de funciones (formato fns.txt)")
+    parser.add_argument("scenarios", help="directorio con <function_id>.npy")
+    parser.add_argument("-o", "--output", default="results")
+    parser.add_argument("--chunk-size", type=int, default=262144)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    compiler = FunctionCompiler(budget=EvaluationBudget.from_env())
+    os.makedirs(args.output, exist_ok=True)
+
+    # spawn: como el supervisor, los procesos no heredan estado del padre
+    pool = ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")
+    )
+    jobs = []
+    with pool:
+        # se encolan los bloques de todas las funciones antes de esperar
+        # resultados, asi ningun nucleo queda libre entre funciones
+        for function in read_functions(args.functions):
+            func_id = function_id(function)
+            scenarios_path = os.path.join(args.scenarios, f"{func_id}.npy")
+            if not os.path.exists(scenarios_path):
+                print(f"Sin escenarios para {function} ({scenarios_path})")
+                continue
+
+            compiled_function = compiler.get(function)
+            scenarios = np.load(scenarios_path, mmap_mode="r")
+            if compiled_function is None:
+                print(f"Funcion invalida omitida: {function}")
+                continue
+            if scenarios.ndim != 2 or scenarios.shape[1] != len(compiled_function.vars):
+                print(
+                    f"La matriz {scenarios.shape} no coincide con las variables "
+                    f"de {function}"
+                )
+                continue
+
+            n_scenarios = scenarios.shape[0]
+            results_path = os.path.join(args.output, f"{func_id}.npy")
+            np.lib.format.open_memmap(
+                results_path, mode="w+", dtype=np.float64, shape=(n_scenarios,)
+            ).flush()
+            futures = [
+                pool.submit(
+                    evaluate_chunk,
+                    function,
+                    scenarios_path,
+                    results_path,
+                    start,
+                    min(start + args.chunk_size, n_scenarios),
+                )
+                for start in range(0, n_scenarios, args.chunk_size)
+            ]
+            print(f"{function}: {n_scenarios} escenarios en {len(futures)} bloques")
+            jobs.append((function, func_id, futures))
+
+        aggregates = np.zeros(len(jobs), dtype=AGGREGATE_DTYPE)
+        for i, (function, func_id, futures) in enumerate(jobs):
+            # parciales combinados en orden de bloque (resultado determinista)
+            stats = RunningStats()
+            for future in futures:
+                partial = future.result()
+                if partial["count"]:
+                    stats.merge(
+                        partial["count"],
+                        partial["mean"],
+                        partial["m2"],
+                        partial["min"],
+                        partial["max"],
+                    )
+            aggregates[i] = (
+                func_id,
+                stats.count,
+                stats.mean,
+                stats.m2,
+                stats.min,
+                stats.max,
+            )
+            variance = stats.m2 / (stats.count - 1) if stats.count > 1 else 0.0
+            print(
+                f"[RESULTADO] {function}: n={stats.count} "
+                f"media={stats.mean:.6f} varianza={variance:.6f}"
+            )
+
+    np.save(os.path.join(args.output, "aggregates.npy"), aggregates)
+    print(f"Resultados escritos en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
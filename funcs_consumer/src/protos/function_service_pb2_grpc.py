@@ -40,6 +40,11 @@ class FunctionServiceStub(object):
                 request_serializer=google_dot_protobuf_dot_empty__pb2.Empty.SerializeToString,
                 response_deserializer=function__service__pb2.GetFuncModelResponse.FromString,
                 _registered_method=True)
+        self.GetFunction = channel.unary_unary(
+                '/FunctionService/GetFunction',
+                request_serializer=function__service__pb2.GetFunctionRequest.SerializeToString,
+                response_deserializer=function__service__pb2.GetFuncModelResponse.FromString,
+                _registered_method=True)
 
 
 class FunctionServiceServicer(object):
@@ -51,6 +56,12 @@ class FunctionServiceServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def GetFunction(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_FunctionServiceServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -59,6 +70,11 @@ def add_FunctionServiceServicer_to_server(servicer, server):
                     request_deserializer=google_dot_protobuf_dot_empty__pb2.Empty.FromString,
                     response_serializer=function__service__pb2.GetFuncModelResponse.SerializeToString,
             ),
+            'GetFunction': grpc.unary_unary_rpc_method_handler(
+                    servicer.GetFunction,
+                    request_deserializer=function__service__pb2.GetFunctionRequest.FromString,
+                    response_serializer=function__service__pb2.GetFuncModelResponse.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'FunctionService', rpc_method_handlers)
@@ -96,3 +112,30 @@ class FunctionService(object):
             timeout,
             metadata,
             _registered_method=True)
+
+    @staticmethod
+    def GetFunction(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_unary(
+            request,
+            target,
+            '/FunctionService/GetFunction',
+            function__service__pb2.GetFunctionRequest.SerializeToString,
+            function__service__pb2.GetFuncModelResponse.FromString,
+            options,
+            channel_credentials,
+            insecure,
+            call_credentials,
+            compression,
+            wait_for_ready,
+            timeout,
+            metadata,
+            _registered_method=True)
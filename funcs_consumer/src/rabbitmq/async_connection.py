@@ -0,0 +1,93 @@
+import asyncio
+import os
+
+import aio_pika
+from dotenv import load_dotenv
+
+from src.rabbitmq.connection import (
+    RESULT_BATCH_CONTENT_TYPE,
+    aggregate_message,
+    exact_message,
+    result_batch_message,
+    result_message,
+)
+
+
+class AsyncConnection:
+    # una sola conexion al broker con un canal por flujo (funciones,
+    # escenarios y resultados) para el runtime asyncio
+    def __init__(self, worker_id: str, window: int = 256, max_retries: int = 3):
+        self.worker_id = worker_id
+        self._user_models_queue = f"{worker_id}.models"
+        # el canal de resultados usa publisher confirms (por defecto en
+        # aio-pika): cada publish espera su ack, asi que se publican varios a
+        # la vez con hasta `window` sin confirmar
+        self._window = asyncio.Semaphore(window)
+        self.max_retries = max_retries
+
+    async def connect(self, prefetch_count: int = 1):
+        load_dotenv()
+        self.connection = await aio_pika.connect_robust(
+            host=os.getenv("RABBIT_HOST"),
+            login=os.getenv("RABBIT_USER"),
+            password=os.getenv("RABBIT_PWD"),
+        )
+        self.function_channel = await self.connection.channel()
+        self.scenario_channel = await self.connection.channel()
+        self.result_channel = await self.connection.channel()
+
+        # prefetch_count acota los escenarios entregados y aun sin confirmar
+        await self.scenario_channel.set_qos(prefetch_count=prefetch_count)
+
+        await self.result_channel.declare_queue("results", durable=True)
+        self.scenarios = await self.scenario_channel.declare_queue(
+            "scenarios", durable=False
+        )
+
+        # Cola de modelos del usuario con tamaño maximo = 1
+        self.models = await self.function_channel.declare_queue(
+            self._user_models_queue,
+            durable=False,
+            auto_delete=True,
+            arguments={"x-max-length": 1},
+        )
+        exchange = await self.function_channel.declare_exchange(
+            "exchange.models", aio_pika.ExchangeType.FANOUT, durable=True
+        )
+        await self.models.bind(exchange, routing_key="")
+
+    async def _publish(self, body: str | bytes, content_type: str | None = None):
+        message = aio_pika.Message(
+            body=body.encode() if isinstance(body, str) else body,
+            content_type=content_type,
+            delivery_mode=aio_pika.DeliveryMode.PERSISTENT,
+        )
+        async with self._window:
+            # un nack del broker llega como DeliveryError: se reintenta
+            for attempt in range(self.max_retries + 1):
+                try:
+                    await self.result_channel.default_exchange.publish(
+                        message, routing_key="results"
+                    )
+                    return
+                except aio_pika.exceptions.DeliveryError:
+                    if attempt == self.max_retries:
+                        raise
+
+    async def publish_result(self, result: float, gradient: dict | None = None):
+        await self._publish(result_message(self.worker_id, result, gradient))
+
+    async def publish_result_batch(self, function_id: str, results):
+        await self._publish(
+            result_batch_message(self.worker_id, function_id, results),
+            RESULT_BATCH_CONTENT_TYPE,
+        )
+
+    async def publish_exact(self, function: str, expectation: dict):
+        await self._publish(exact_message(self.worker_id, function, expectation))
+
+    async def publish_aggregate(self, function: str, stats: dict):
+        await self._publish(aggregate_message(self.worker_id, function, stats))
+
+    async def close_connection(self):
+        await self.connection.close()
@@ -0,0 +1,50 @@
+import threading
+from collections import deque
+from functools import partial
+from typing import Callable
+
+
+class BatchSettler:
+    # confirma (ack/nack) los lotes de escenarios cuando el broker confirmo sus
+    # resultados. Las confirmaciones pueden llegar en desorden (p. ej. si un
+    # resultado se reintento), pero los lotes se resuelven en el orden en que
+    # llegaron: un ack multiple de un lote posterior tambien confirmaria los
+    # escenarios de uno anterior que aun podria fallar
+    def __init__(self, on_settled: Callable[[int], None]):
+        # on_settled(n) libera los n elementos de la cola de evaluacion que
+        # cubria el lote (los cuenta el drenado)
+        self.on_settled = on_settled
+        self._lock = threading.Lock()
+        self._batches = deque()
+
+    def track(self, intake, last_tag: int, multiple: bool, items: int = 1):
+        # devuelve el callback on_done(ok) para ConfirmedPublisher.publish_batch
+        entry = {
+            "intake": intake,
+            "last_tag": last_tag,
+            "multiple": multiple,
+            "items": items,
+            "ok": None,
+        }
+        with self._lock:
+            self._batches.append(entry)
+        return partial(self._done, entry)
+
+    def _done(self, entry: dict, ok: bool):
+        # bajo el lock: el callback puede llegar desde el ioloop del
+        # publicador o (lote sin resultados) desde el hilo productor
+        with self._lock:
+            entry["ok"] = ok
+            while self._batches and self._batches[0]["ok"] is not None:
+                self._settle(self._batches.popleft())
+
+    def _settle(self, batch: dict):
+        if batch["ok"]:
+            batch["intake"].ack_scenario(batch["last_tag"], multiple=batch["multiple"])
+        else:
+            print("ERROR, Resultados no confirmados por el broker")
+            # el broker lo vuelve a entregar (a este u otro consumidor)
+            batch["intake"].nack_scenario(
+                batch["last_tag"], multiple=batch["multiple"]
+            )
+        self.on_settled(batch["items"])
@@ -1,33 +1,144 @@
 import json
 import os
 import socket
+import struct
+import threading
+from functools import partial
+from time import monotonic
+from typing import Callable
 
+import numpy as np
 import pika
 from dotenv import load_dotenv
 
 
-class Connection:
-    def __init__(self):
-        load_dotenv()
-        credentials = pika.PlainCredentials(
-            os.getenv("RABBIT_USER"), os.getenv("RABBIT_PWD")
-        )
-        params = pika.ConnectionParameters(
-            host=os.getenv("RABBIT_HOST"), credentials=credentials
+# identificador del consumidor ante el monitor y nombre de su cola de modelos:
+# host + pid + instancia, para que varios consumidores compartan maquina sin
+# robarse las funciones. Se calcula una vez al iniciar; WORKER_ID lo reemplaza
+# (con el supervisor se le agrega la instancia)
+def resolve_worker_id(instance: int = 0, pooled: bool = False) -> str:
+    configured = os.getenv("WORKER_ID")
+    if configured:
+        return f"{configured}-{instance}" if pooled else configured
+    return f"{socket.gethostname()}-{os.getpid()}-{instance}"
+
+
+# cuerpos de los mensajes de la cola de resultados (los comparte el runtime
+# asyncio)
+def result_message(worker_id: str, result: float, gradient: dict | None) -> str:
+    final_result = {"user": worker_id, "result": result}
+    if gradient is not None:
+        # sensibilidades dResultado/dVariable calculadas en la misma pasada
+        final_result["gradient"] = gradient
+    return json.dumps(final_result)
+
+
+def exact_message(worker_id: str, function: str, expectation: dict) -> str:
+    return json.dumps(
+        {"user": worker_id, "type": "exact", "function": function, **expectation}
+    )
+
+
+# parcial de Welford (count, mean, m2, min, max) de una funcion; el monitor
+# combina los parciales de todos los consumidores
+def aggregate_message(worker_id: str, function: str, stats: dict) -> str:
+    return json.dumps(
+        {"user": worker_id, "type": "aggregate", "function": function, **stats}
+    )
+
+
+# lote binario de resultados (RESULT_ENCODING=binary): cabecera fija, worker_id
+# y function_id en utf-8 y los resultados como float64 little-endian crudos.
+# El content_type lo distingue de los mensajes JSON, que el monitor sigue
+# aceptando, asi consumidores viejos y nuevos conviven en la misma cola
+RESULT_BATCH_CONTENT_TYPE = "application/x-montecarlo-result-batch"
+RESULT_BATCH_VERSION = 1
+# magia, version, largo de worker_id, largo de function_id, cantidad
+RESULT_BATCH_HEADER = struct.Struct("<4sBHHI")
+
+
+def result_batch_message(worker_id: str, function_id: str, results) -> bytes:
+    worker = worker_id.encode()
+    function = function_id.encode()
+    values = np.asarray(results, dtype="<f8")
+    header = RESULT_BATCH_HEADER.pack(
+        b"MCRB", RESULT_BATCH_VERSION, len(worker), len(function), values.size
+    )
+    return b"".join((header, worker, function, values.tobytes()))
+
+
+# bloque de escenarios del servidor: cabecera fija, function_id en utf-8 y la
+# matriz (filas, columnas) como float64 little-endian
+SCENARIO_BLOCK_CONTENT_TYPE = "application/x-montecarlo-scenario-block"
+SCENARIO_BLOCK_VERSION = 1
+# magia, version, largo de function_id, filas, columnas
+SCENARIO_BLOCK_HEADER = struct.Struct("<4sBHII")
+
+
+def decode_scenario(content_type: str | None, body: bytes):
+    # los mensajes sin content_type son JSON (escenario, receta o lista)
+    if content_type != SCENARIO_BLOCK_CONTENT_TYPE:
+        return json.loads(body.decode())
+
+    if len(body) < SCENARIO_BLOCK_HEADER.size:
+        raise ValueError(f"Bloque de escenarios truncado ({len(body)} bytes)")
+    magic, version, function_len, rows, columns = SCENARIO_BLOCK_HEADER.unpack_from(
+        body
+    )
+    if magic != b"MCSB" or version != SCENARIO_BLOCK_VERSION:
+        raise ValueError(f"Bloque de escenarios no soportado (version {version})")
+    offset = SCENARIO_BLOCK_HEADER.size
+    expected = offset + function_len + 8 * rows * columns
+    if len(body) != expected:
+        raise ValueError(
+            f"Bloque de escenarios de {len(body)} bytes, se esperaban {expected}"
         )
-        self.connection = pika.BlockingConnection(parameters=params)
+    function = body[offset : offset + function_len].decode()
+    # vista sobre el cuerpo del mensaje, sin parsear cada valor
+    scenarios = np.frombuffer(
+        body, dtype="<f8", count=rows * columns, offset=offset + function_len
+    ).reshape(rows, columns)
+    return {"type": "block", "function_id": function, "scenarios": scenarios}
+
+
+# propiedades de los mensajes de resultados (persistentes)
+RESULT_PROPERTIES = pika.BasicProperties(delivery_mode=2)
+RESULT_BATCH_PROPERTIES = pika.BasicProperties(
+    content_type=RESULT_BATCH_CONTENT_TYPE, delivery_mode=2
+)
+
+
+def connection_parameters() -> pika.ConnectionParameters:
+    load_dotenv()
+    credentials = pika.PlainCredentials(
+        os.getenv("RABBIT_USER"), os.getenv("RABBIT_PWD")
+    )
+    return pika.ConnectionParameters(
+        host=os.getenv("RABBIT_HOST"), credentials=credentials
+    )
+
+
+class Connection:
+    def __init__(self, worker_id: str, prefetch_count: int = 1):
+        self.connection = pika.BlockingConnection(parameters=connection_parameters())
         self.channel = self.connection.channel()
-        self._user_models_queue = f"{self._get_ip_address()}.models"
+        self.worker_id = worker_id
+        self._user_models_queue = f"{worker_id}.models"
 
-        # fair dispatch para todos los clientes
-        self.channel.basic_qos(prefetch_count=1)
+        # fair dispatch para todos los clientes; prefetch_count acota los
+        # escenarios entregados y aun sin confirmar
+        self.channel.basic_qos(prefetch_count=prefetch_count)
 
         self.channel.queue_declare(queue="results", durable=True)
         self.channel.queue_declare(queue="scenarios", durable=False)
 
-        # Cola de modelos del usuario con tamaño maximo = 1
+        # Cola de modelos del usuario con tamaño maximo = 1; se borra al
+        # cerrarse el consumidor (cada pid tiene la suya)
         self.channel.queue_declare(
-            queue=self._user_models_queue, durable=False, arguments={"x-max-length": 1}
+            queue=self._user_models_queue,
+            durable=False,
+            auto_delete=True,
+            arguments={"x-max-length": 1},
         )
 
         # Exchange fanout para modelos
@@ -38,18 +149,6 @@ class Connection:
             exchange="exchange.models", queue=self._user_models_queue, routing_key=""
         )
 
-    # funcion para poder saber nuestra ip (ya que es necesaria para identificar
-    # nuestra participacion ante el monitor)
-    def _get_ip_address(self):
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            ip = s.getsockname()[0]
-            s.close()
-            return ip
-        except Exception:
-            return "unknown"
-
     def consume_function(self) -> dict | None:
         for method, properties, body in self.channel.consume(
             queue=self._user_models_queue, inactivity_timeout=None
@@ -58,22 +157,115 @@ class Connection:
             yield data
             self.channel.basic_ack(method.delivery_tag)
 
-    def consume_scenario(self) -> dict | None:
+    # devuelve lotes [(delivery_tag, escenario), ...] de hasta max_batch
+    # escenarios o los que lleguen en max_wait segundos desde el primero; el
+    # ack lo hace quien publica los resultados, con ack_scenario
+    # si stop_event se activa se deja de consumir: los mensajes recibidos y
+    # aun no entregados vuelven al broker
+    # max_batch puede ser una funcion (tamaño de lote ajustado en ejecucion)
+    def consume_scenario(
+        self,
+        max_batch: int | Callable[[], int] = 1,
+        max_wait: float = 0.05,
+        stop_event: threading.Event | None = None,
+    ):
+        batch_size = max_batch if callable(max_batch) else lambda: max_batch
+        batch, deadline = [], None
         for method, properties, body in self.channel.consume(
-            queue="scenarios", inactivity_timeout=None
+            queue="scenarios", inactivity_timeout=max_wait
         ):
-            data = json.loads(body.decode())
-            yield data
-            self.channel.basic_ack(method.delivery_tag)
+            if stop_event is not None and stop_event.is_set():
+                if method is not None:
+                    self.channel.basic_nack(method.delivery_tag, requeue=True)
+                for delivery_tag, _ in batch:
+                    self.channel.basic_nack(delivery_tag, requeue=True)
+                self.channel.cancel()
+                return
+            if method is not None:
+                try:
+                    scenario = decode_scenario(properties.content_type, body)
+                except (ValueError, struct.error) as e:
+                    # mensaje malformado: reentregarlo fallaria igual, se
+                    # descarta sin volver a la cola
+                    print(f"Mensaje de escenarios descartado: {e}")
+                    self.channel.basic_nack(method.delivery_tag, requeue=False)
+                else:
+                    batch.append((method.delivery_tag, scenario))
+                    if deadline is None:
+                        deadline = monotonic() + max_wait
+            # method None = no llego nada en max_wait: se entrega lo juntado
+            if batch and (
+                method is None
+                or len(batch) >= batch_size()
+                or monotonic() >= deadline
+            ):
+                yield batch
+                batch, deadline = [], None
+
+    # nuevo limite de escenarios sin confirmar; se llama desde el hilo que
+    # consume (entre lotes)
+    def set_prefetch(self, prefetch_count: int):
+        self.channel.basic_qos(prefetch_count=prefetch_count)
 
-    def publish_result(self, result: float):
-        final_result = {"user": self._get_ip_address(), "result": result}
-        result_json = json.dumps(final_result)
+    # pika no es thread-safe: las confirmaciones que vienen de otro hilo se
+    # encolan para que las envie el hilo que consume de esta conexion.
+    # multiple=True confirma todos los escenarios hasta delivery_tag
+    def ack_scenario(self, delivery_tag: int, multiple: bool = False):
+        self.connection.add_callback_threadsafe(
+            partial(self.channel.basic_ack, delivery_tag, multiple=multiple)
+        )
+
+    def nack_scenario(self, delivery_tag: int, multiple: bool = False):
+        self.connection.add_callback_threadsafe(
+            partial(
+                self.channel.basic_nack, delivery_tag, multiple=multiple, requeue=True
+            )
+        )
+
+    # atiende la conexion (envia los ack pendientes) mientras pending() sea
+    # verdadero; se usa al drenar el consumidor antes de cerrarlo
+    def drain(self, pending, timeout: float):
+        deadline = monotonic() + timeout
+        while pending() and monotonic() < deadline:
+            self.connection.process_data_events(time_limit=0.1)
+        self.connection.process_data_events(time_limit=0)
+
+    def publish_result(self, result: float, gradient: dict | None = None):
+        self.channel.basic_publish(
+            exchange="",
+            routing_key="results",
+            body=result_message(self.worker_id, result, gradient),
+            properties=pika.BasicProperties(
+                delivery_mode=2,  # Mensaje persistente
+            ),
+        )
+
+    def publish_result_batch(self, function_id: str, results):
+        self.channel.basic_publish(
+            exchange="",
+            routing_key="results",
+            body=result_batch_message(self.worker_id, function_id, results),
+            properties=pika.BasicProperties(
+                content_type=RESULT_BATCH_CONTENT_TYPE,
+                delivery_mode=2,  # Mensaje persistente
+            ),
+        )
+
+    def publish_exact(self, function: str, expectation: dict):
+        self.channel.basic_publish(
+            exchange="",
+            routing_key="results",
+            body=exact_message(self.worker_id, function, expectation),
+            properties=pika.BasicProperties(
+                delivery_mode=2,  # Mensaje persistente
+            ),
+        )
 
+    def publish_aggregate(self, function: str, stats: dict):
         self.channel.basic_publish(
             exchange="",
             routing_key="results",
-            body=result_json,
+            body=aggregate_message(self.worker_id, function, stats),
             properties=pika.BasicProperties(
                 delivery_mode=2,  # Mensaje persistente
             ),
@@ -0,0 +1,150 @@
+import numpy as np
+
+
+def _value(x):
+    return x.value if isinstance(x, Dual) else x
+
+
+def _scale(grad: np.ndarray, factor) -> np.ndarray:
+    # grad tiene forma (n_escenarios, n_vars); factor es escalar o (n_escenarios,)
+    return grad * np.asarray(factor)[..., None]
+
+
+class Dual:
+    # numero dual vectorizado para diferenciacion automatica hacia adelante:
+    # value (n_escenarios,) y grad (n_escenarios, n_vars) con la derivada de
+    # value respecto a cada variable
+    __slots__ = ("value", "grad")
+    # que numpy delegue en los operadores de Dual (ndarray * Dual)
+    __array_ufunc__ = None
+
+    def __init__(self, value: np.ndarray, grad: np.ndarray):
+        self.value = value
+        self.grad = grad
+
+    @staticmethod
+    def variables(scenarios: np.ndarray) -> list["Dual"]:
+        # una semilla por columna: d(x_i)/d(x_j) = 1 si i == j
+        n_scenarios, n_vars = scenarios.shape
+        seeds = []
+        for i in range(n_vars):
+            grad = np.zeros((n_scenarios, n_vars))
+            grad[:, i] = 1.0
+            seeds.append(Dual(scenarios[:, i], grad))
+        return seeds
+
+    def __neg__(self):
+        return Dual(-self.value, -self.grad)
+
+    def __add__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value + other.value, self.grad + other.grad)
+        return Dual(self.value + other, self.grad)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        if isinstance(other, Dual):
+            return Dual(self.value - other.value, self.grad - other.grad)
+        return Dual(self.value - other, self.grad)
+
+    def __rsub__(self, other):
+        return Dual(other - self.value, -self.grad)
+
+    def __mul__(self, other):
+        if isinstance(other, Dual):
+            return Dual(
+                self.value * other.value,
+                _scale(self.grad, other.value) + _scale(other.grad, self.value),
+            )
+        return Dual(self.value * other, _scale(self.grad, other))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Dual):
+            value = self.value / other.value
+            grad = _scale(self.grad - _scale(other.grad, value), 1.0 / other.value)
+            return Dual(value, grad)
+        return Dual(self.value / other, _scale(self.grad, 1.0 / other))
+
+    def __rtruediv__(self, other):
+        value = other / self.value
+        return Dual(value, _scale(self.grad, -value / self.value))
+
+    def __pow__(self, other):
+        if isinstance(other, Dual):
+            # d(a^b) = a^b * (b' * ln a + b * a' / a)
+            value = self.value**other.value
+            grad = _scale(other.grad, value * np.log(self.value)) + _scale(
+                self.grad, other.value * self.value ** (other.value - 1)
+            )
+            return Dual(value, grad)
+        return Dual(
+            self.value**other, _scale(self.grad, other * self.value ** (other - 1))
+        )
+
+    def __rpow__(self, other):
+        value = other**self.value
+        return Dual(value, _scale(self.grad, value * np.log(other)))
+
+    def __mod__(self, other):
+        # d(a % b) = a' - floor(a / b) * b'
+        if isinstance(other, Dual):
+            return Dual(
+                self.value % other.value,
+                self.grad
+                - _scale(other.grad, np.floor(self.value / other.value)),
+            )
+        return Dual(self.value % other, self.grad)
+
+    def __rmod__(self, other):
+        return Dual(
+            other % self.value, _scale(self.grad, -np.floor(other / self.value))
+        )
+
+
+def _unary(function, derivative):
+    def apply(x):
+        if not isinstance(x, Dual):
+            return function(x)
+        return Dual(function(x.value), _scale(x.grad, derivative(x.value)))
+
+    return apply
+
+
+def _select(pick_left):
+    # min/max: el gradiente es el del argumento elegido en cada escenario
+    def apply(*args):
+        result = args[0]
+        for other in args[1:]:
+            left, right = _value(result), _value(other)
+            mask = pick_left(left, right)
+            value = np.where(mask, left, right)
+            if not isinstance(result, Dual) and not isinstance(other, Dual):
+                result = value
+                continue
+            n_vars = (result if isinstance(result, Dual) else other).grad.shape[1]
+            left_grad = (
+                result.grad if isinstance(result, Dual) else np.zeros((1, n_vars))
+            )
+            right_grad = (
+                other.grad if isinstance(other, Dual) else np.zeros((1, n_vars))
+            )
+            result = Dual(value, np.where(mask[..., None], left_grad, right_grad))
+        return result
+
+    return apply
+
+
+dual_functions = {
+    "exp": _unary(np.exp, np.exp),
+    "log": _unary(np.log, lambda x: 1.0 / x),
+    "sqrt": _unary(np.sqrt, lambda x: 0.5 / np.sqrt(x)),
+    "sin": _unary(np.sin, np.cos),
+    "cos": _unary(np.cos, lambda x: -np.sin(x)),
+    "tan": _unary(np.tan, lambda x: 1.0 / np.cos(x) ** 2),
+    "abs": _unary(np.abs, np.sign),
+    "min": _select(np.less_equal),
+    "max": _select(np.greater_equal),
+}
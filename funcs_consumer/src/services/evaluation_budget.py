@@ -0,0 +1,182 @@
+import ast
+import copy
+import operator as op
+import os
+import threading
+from time import monotonic
+from typing import Dict
+
+import numpy as np
+
+from src.services.dual_numbers import Dual
+
+# nombres internos inyectados en la funcion compilada; las variables de
+# usuario no pueden empezar con "__" asi que no pueden ocultarlos
+GUARDED_POW = "__budget_pow"
+GUARDED_MUL = "__budget_mul"
+
+
+class EvaluationError(ValueError):
+    # error estructurado para rechazos por presupuesto, asi un consumidor
+    # puede registrarlo/reportarlo sin tumbar el hilo de evaluacion
+    def __init__(self, code: str, message: str, **details):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.details = details
+
+    def to_dict(self, **extra) -> Dict[str, any]:
+        return {"code": self.code, "message": self.message, **self.details, **extra}
+
+
+def _largest_magnitude(exponent) -> float | None:
+    # el exponente es un escalar, un vector de un lote o un dual (gradientes):
+    # en los lotes basta con que un escenario supere el limite, como en escalar
+    if isinstance(exponent, Dual):
+        exponent = exponent.value
+    if isinstance(exponent, (np.ndarray, np.generic)):
+        return float(np.max(np.abs(exponent))) if exponent.size else None
+    if isinstance(exponent, (int, float)):
+        return abs(exponent)
+    return None
+
+
+# nodos del arbol sin optimizar: alcanza para polinomios densos de grado ~100
+DEFAULT_MAX_NODES = 1024
+
+
+class EvaluationBudget:
+    def __init__(
+        self,
+        max_nodes: int = DEFAULT_MAX_NODES,
+        max_exponent: float = 1024,
+        max_int_bits: int = 4096,
+        force_float: bool = True,
+        max_seconds: float = 0.5,
+    ):
+        self.max_nodes = max_nodes
+        self.max_exponent = max_exponent
+        self.max_int_bits = max_int_bits
+        self.force_float = force_float
+        self.max_seconds = max_seconds
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls) -> "EvaluationBudget":
+        return cls(
+            max_nodes=int(os.getenv("EVAL_MAX_NODES", DEFAULT_MAX_NODES)),
+            max_exponent=float(os.getenv("EVAL_MAX_EXPONENT", 1024)),
+            max_int_bits=int(os.getenv("EVAL_MAX_INT_BITS", 4096)),
+            force_float=os.getenv("EVAL_FORCE_FLOAT", "1").lower()
+            not in ("0", "false", "no"),
+            max_seconds=float(os.getenv("EVAL_MAX_SECONDS", 0.5)),
+        )
+
+    def check_tree(self, tree: ast.AST):
+        nodes = sum(1 for _ in ast.walk(tree))
+        if nodes > self.max_nodes:
+            raise EvaluationError(
+                "max_nodes",
+                f"La expresion tiene {nodes} nodos (maximo {self.max_nodes})",
+                nodes=nodes,
+                limit=self.max_nodes,
+            )
+
+    def guard_tree(self, tree: ast.Expression) -> ast.Expression:
+        # reemplaza potencias (y multiplicaciones si hay enteros) por llamadas
+        # a funciones que revisan el presupuesto antes de operar
+        guarded = _BudgetGuard(self.force_float).visit(copy.deepcopy(tree))
+        return ast.fix_missing_locations(guarded)
+
+    def namespace(self) -> Dict[str, any]:
+        return {
+            "__builtins__": {},
+            GUARDED_POW: self.pow,
+            GUARDED_MUL: self.mul,
+        }
+
+    def start(self):
+        self._local.deadline = monotonic() + self.max_seconds
+
+    def check_time(self):
+        deadline = getattr(self._local, "deadline", None)
+        if deadline is not None and monotonic() > deadline:
+            raise EvaluationError(
+                "timeout",
+                f"La evaluacion supero {self.max_seconds}s",
+                limit=self.max_seconds,
+            )
+
+    def pow(self, base, exponent):
+        self.check_time()
+        largest = _largest_magnitude(exponent)
+        if largest is not None and largest > self.max_exponent:
+            raise EvaluationError(
+                "max_exponent",
+                f"Exponente {largest} fuera del limite {self.max_exponent}",
+                exponent=largest,
+                limit=self.max_exponent,
+            )
+        if isinstance(base, int) and isinstance(exponent, int) and exponent > 0:
+            bits = base.bit_length() * exponent
+            if bits > self.max_int_bits:
+                raise EvaluationError(
+                    "max_int_bits",
+                    f"El resultado tendria ~{bits} bits (maximo {self.max_int_bits})",
+                    bits=bits,
+                    limit=self.max_int_bits,
+                )
+        return op.pow(base, exponent)
+
+    def mul(self, left, right):
+        self.check_time()
+        if isinstance(left, int) and isinstance(right, int):
+            bits = left.bit_length() + right.bit_length()
+            if bits > self.max_int_bits:
+                raise EvaluationError(
+                    "max_int_bits",
+                    f"El resultado tendria ~{bits} bits (maximo {self.max_int_bits})",
+                    bits=bits,
+                    limit=self.max_int_bits,
+                )
+        return op.mul(left, right)
+
+
+class _BudgetGuard(ast.NodeTransformer):
+    def __init__(self, force_float: bool):
+        self.force_float = force_float
+
+    def visit_Constant(self, node: ast.Constant):
+        # con promocion a float los enteros nunca crecen como bigints
+        if (
+            self.force_float
+            and isinstance(node.value, int)
+            and not isinstance(node.value, bool)
+        ):
+            try:
+                value = float(node.value)
+            except OverflowError:
+                raise EvaluationError(
+                    "max_int_bits",
+                    "Constante entera demasiado grande para float",
+                    bits=node.value.bit_length(),
+                )
+            return ast.copy_location(ast.Constant(value=value), node)
+        return node
+
+    def visit_BinOp(self, node: ast.BinOp):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow):
+            guard = GUARDED_POW
+        elif isinstance(node.op, ast.Mult) and not self.force_float:
+            guard = GUARDED_MUL
+        else:
+            return node
+        return ast.copy_location(
+            ast.Call(
+                func=ast.Name(id=guard, ctx=ast.Load()),
+                args=[node.left, node.right],
+                keywords=[],
+            ),
+            node,
+        )
@@ -0,0 +1,171 @@
+import math
+from typing import Dict, Tuple
+
+import numpy as np
+
+from src.services.function_compiler import CompiledFunction
+from src.services.function_executer import FunctionExecuter
+
+# masa de probabilidad que se permite descartar al truncar poisson/geometrica
+TAIL_EPSILON = 1e-12
+# tamaño maximo de la malla conjunta (valores^variables) que se evalua
+MAX_GRID_SIZE = 2_000_000
+
+
+def _log_factorials(first: int, last: int) -> np.ndarray:
+    # log(k!) para k en [first, last] (lgamma, sin overflow)
+    return np.fromiter(
+        (math.lgamma(k + 1) for k in range(first, last + 1)),
+        dtype=np.float64,
+        count=last - first + 1,
+    )
+
+
+def _trim_tails(
+    values: np.ndarray, log_pmf: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
+    # descarta los extremos cuya masa es < TAIL_EPSILON (la mitad por lado)
+    pmf = np.exp(log_pmf)
+    low = np.searchsorted(np.cumsum(pmf), TAIL_EPSILON / 2, side="right")
+    high = len(pmf) - np.searchsorted(
+        np.cumsum(pmf[::-1]), TAIL_EPSILON / 2, side="right"
+    )
+    if low >= high:
+        return values, pmf
+    return values[low:high], pmf[low:high]
+
+
+class ExactExpectation:
+    @staticmethod
+    def params(distribution: str, params: Dict[str, float]) -> Dict[str, float]:
+        # parametros validados; ValueError si falta alguno o esta fuera de rango
+        def number(name: str) -> float:
+            value = (params or {}).get(name)
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"Parametro '{name}' invalido: {value!r}")
+            if not math.isfinite(value):
+                raise ValueError(f"Parametro '{name}' no finito: {value}")
+            return float(value)
+
+        if distribution == "binomial":
+            n, p = number("n"), number("p")
+            if n != int(n) or n < 0 or not 0.0 <= p <= 1.0:
+                raise ValueError(f"Binomial invalida: n={n}, p={p}")
+            return {"n": int(n), "p": p}
+        if distribution == "poisson":
+            lam = number("lam")
+            if lam < 0:
+                raise ValueError(f"Poisson invalida: lam={lam}")
+            return {"lam": lam}
+        if distribution == "geometric":
+            p = number("p")
+            if not 0.0 < p <= 1.0:
+                raise ValueError(f"Geometrica invalida: p={p}")
+            return {"p": p}
+        raise ValueError(f"Distribucion '{distribution}' sin modo exacto")
+
+    @staticmethod
+    def support(
+        distribution: str, params: Dict[str, float]
+    ) -> Tuple[np.ndarray, np.ndarray] | None:
+        # devuelve (valores, probabilidades) de la distribucion discreta,
+        # descartando las colas cuya masa es < TAIL_EPSILON. La pmf se calcula
+        # en escala logaritmica (sin overflow de comb ni underflow de exp) y
+        # el tamaño del soporte se revisa antes de construirlo
+        try:
+            params = ExactExpectation.params(distribution, params)
+        except ValueError as e:
+            print(f"Modo exacto no disponible: {e}")
+            return None
+
+        if distribution == "binomial":
+            n, p = params["n"], params["p"]
+            if p in (0.0, 1.0):
+                return np.array([n * int(p)]), np.array([1.0])
+            if n + 1 > MAX_GRID_SIZE:
+                print(f"Soporte demasiado grande para modo exacto: {n + 1}")
+                return None
+            values = np.arange(n + 1)
+            log_factorials = _log_factorials(0, n)
+            log_pmf = (
+                log_factorials[n]
+                - log_factorials
+                - log_factorials[::-1]
+                + values * math.log(p)
+                + (n - values) * math.log1p(-p)
+            )
+            return _trim_tails(values, log_pmf)
+
+        if distribution == "poisson":
+            lam = params["lam"]
+            if lam == 0.0:
+                return np.array([0]), np.array([1.0])
+            # fuera de media +- 10 desvios (+ margen para lam chico) la masa
+            # es despreciable frente a TAIL_EPSILON
+            spread = 10 * math.sqrt(lam) + 20
+            first = max(0, math.floor(lam - spread))
+            last = math.ceil(lam + spread)
+            if last - first + 1 > MAX_GRID_SIZE:
+                print(f"Soporte demasiado grande para modo exacto: {last - first + 1}")
+                return None
+            values = np.arange(first, last + 1)
+            log_pmf = values * math.log(lam) - lam - _log_factorials(first, last)
+            return _trim_tails(values, log_pmf)
+
+        # numpy.random.geometric cuenta intentos hasta el primer exito (k >= 1)
+        p = params["p"]
+        if p == 1.0:
+            return np.array([1]), np.array([1.0])
+        last = max(1, math.ceil(math.log(TAIL_EPSILON) / math.log1p(-p)))
+        if last > MAX_GRID_SIZE:
+            print(f"Soporte demasiado grande para modo exacto: {last}")
+            return None
+        values = np.arange(1, last + 1)
+        return values, p * np.exp((values - 1) * math.log1p(-p))
+
+    @staticmethod
+    def compute(
+        function: CompiledFunction, distribution: str, params: Dict[str, float]
+    ) -> Dict[str, float] | None:
+        support = ExactExpectation.support(distribution, params)
+        if support is None:
+            return None
+
+        values, pmf = support
+        n_vars = len(function.vars)
+        grid_size = len(values) ** n_vars
+        if grid_size > MAX_GRID_SIZE:
+            print(
+                f"Soporte conjunto demasiado grande para modo exacto: {grid_size} "
+                f"(maximo {MAX_GRID_SIZE})"
+            )
+            return None
+
+        # malla conjunta: las variables son iid de la misma distribucion
+        grid = np.empty((grid_size, n_vars), dtype=np.float64)
+        weights = np.ones(grid_size)
+        for i, (axis, axis_pmf) in enumerate(
+            zip(
+                np.meshgrid(*([values] * n_vars), indexing="ij"),
+                np.meshgrid(*([pmf] * n_vars), indexing="ij"),
+            )
+        ):
+            grid[:, i] = axis.ravel()
+            weights *= axis_pmf.ravel()
+
+        results = FunctionExecuter.execute_batch(function, grid)
+        if results is None:
+            return None
+
+        total = weights.sum()
+        if not total > 0.0:
+            print("Soporte sin masa de probabilidad para modo exacto")
+            return None
+        mean = float(np.dot(weights, results) / total)
+        variance = float(np.dot(weights, (results - mean) ** 2) / total)
+        return {
+            "mean": mean,
+            "variance": variance,
+            "support_size": int(grid_size),
+            "truncated_mass": float(max(0.0, 1.0 - total)),
+        }
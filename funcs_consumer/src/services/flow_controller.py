@@ -0,0 +1,86 @@
+import math
+import threading
+from typing import Dict
+
+# cambio relativo minimo del prefetch para volver a enviarlo al broker
+PREFETCH_HYSTERESIS = 0.2
+
+
+class FlowController:
+    # ajusta en tiempo de ejecucion el tamaño de lote y el prefetch a partir
+    # de lo medido (promedios moviles exponenciales):
+    #   - tiempo de evaluacion por mensaje
+    #   - ida y vuelta al broker: desde que se publica un lote hasta que sus
+    #     resultados quedan confirmados
+    # el lote se elige para que su evaluacion tarde ~target_latency, y el
+    # prefetch para cubrir dos lotes (uno evaluandose y otro esperando) mas
+    # lo que se evalua durante la ida y vuelta. Una funcion barata termina
+    # con lotes y prefetch grandes (no espera al broker); una costosa con
+    # prefetch bajo (no acapara escenarios que otros consumidores podrian
+    # evaluar)
+    def __init__(
+        self,
+        target_latency: float = 0.1,
+        max_batch: int = 1024,
+        max_prefetch: int = 4096,
+        initial_batch: int = 1,
+        initial_prefetch: int = 64,
+        smoothing: float = 0.2,
+    ):
+        self.target_latency = target_latency
+        self.max_batch = max(1, max_batch)
+        self.max_prefetch = max(1, max_prefetch)
+        self.smoothing = smoothing
+        self._lock = threading.Lock()
+        self._batch = min(max(1, initial_batch), self.max_batch)
+        self._prefetch = min(max(self._batch, initial_prefetch), self.max_prefetch)
+        self._eval_time = None
+        self._round_trip = 0.0
+        self._adjustments = 0
+
+    def _average(self, current: float | None, sample: float) -> float:
+        if current is None:
+            return sample
+        return current + self.smoothing * (sample - current)
+
+    def record_evaluation(self, messages: int, seconds: float):
+        if messages <= 0:
+            return
+        with self._lock:
+            self._eval_time = self._average(self._eval_time, seconds / messages)
+            self._update()
+
+    def record_round_trip(self, seconds: float):
+        with self._lock:
+            self._round_trip = self._average(self._round_trip, seconds)
+            self._update()
+
+    def _update(self):
+        if not self._eval_time:
+            return
+        batch = int(self.target_latency / self._eval_time)
+        self._batch = min(max(1, batch), self.max_batch)
+
+        in_flight = 2 * self._batch + math.ceil(self._round_trip / self._eval_time)
+        prefetch = min(max(self._batch, in_flight), self.max_prefetch)
+        if abs(prefetch - self._prefetch) >= PREFETCH_HYSTERESIS * self._prefetch:
+            self._prefetch = prefetch
+            self._adjustments += 1
+
+    def batch_size(self) -> int:
+        return self._batch
+
+    def prefetch(self) -> int:
+        return self._prefetch
+
+    def metrics(self) -> Dict[str, float]:
+        with self._lock:
+            eval_time = self._eval_time or 0.0
+            return {
+                "batch_size": self._batch,
+                "prefetch": self._prefetch,
+                "eval_ms": round(eval_time * 1000, 4),
+                "round_trip_ms": round(self._round_trip * 1000, 3),
+                "throughput": round(1 / eval_time) if eval_time else 0,
+                "adjustments": self._adjustments,
+            }
@@ -0,0 +1,166 @@
+import marshal
+import os
+import stat
+import sys
+import threading
+from typing import Dict, Tuple
+
+from src.services.evaluation_budget import EvaluationBudget
+from src.services.function_compiler import CompiledFunction, function_id
+
+# subir la version cuando cambie el optimizador o el formato de las entradas:
+# un catalogo de otra version se ignora y se reescribe
+CATALOG_VERSION = 1
+CATALOG_MAGIC = b"MCFC"
+
+
+class FunctionCatalog:
+    # catalogo en disco de funciones ya validadas y optimizadas, indexado por
+    # el hash del contenido (mismo id que usa el servidor). Al reiniciar, un
+    # consumidor carga el codigo compilado en vez de volver a parsear,
+    # validar y optimizar cada funcion.
+    #
+    # formato: cabecera de una linea (magic, version, interprete y limites del
+    # presupuesto) + diccionario en marshal
+    #   id -> (funcion, variables, expresion, codigo en marshal o None)
+    # None = funcion rechazada, tampoco se vuelve a intentar
+    #
+    # el archivo se carga como codigo ejecutable: se crea privado (0600 en un
+    # directorio 0700) y se ignora si es de otro usuario o si otros pueden
+    # escribirlo
+    def __init__(self, path: str, budget: EvaluationBudget):
+        self.path = path
+        # el bytecode depende del interprete y la validacion de los limites
+        self.header = b" ".join(
+            [
+                CATALOG_MAGIC,
+                str(CATALOG_VERSION).encode(),
+                sys.implementation.cache_tag.encode(),
+                repr(
+                    (
+                        budget.max_nodes,
+                        budget.max_exponent,
+                        budget.max_int_bits,
+                        budget.force_float,
+                    )
+                ).encode(),
+            ]
+        )
+        self.hits = 0
+        self.stored = 0
+        self._entries: Dict[str, Tuple] | None = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _untrusted(info: os.stat_result, private: int) -> str | None:
+        # sin uids (Windows) se confia en los permisos del sistema
+        if not hasattr(os, "getuid"):
+            return None
+        if info.st_uid != os.getuid():
+            return f"es del uid {info.st_uid}"
+        if stat.S_IMODE(info.st_mode) & private:
+            return f"tiene permisos {oct(stat.S_IMODE(info.st_mode))}"
+        return None
+
+    def _read(self) -> Dict[str, Tuple]:
+        try:
+            with open(self.path, "rb") as f:
+                # se revisa el archivo abierto, no la ruta: no puede cambiar
+                # entre la verificacion y la lectura
+                directory = os.path.dirname(os.path.abspath(self.path))
+                reason = self._untrusted(
+                    os.fstat(f.fileno()), stat.S_IRWXG | stat.S_IRWXO
+                ) or self._untrusted(os.stat(directory), stat.S_IWGRP | stat.S_IWOTH)
+                if reason:
+                    print(f"Catalogo de funciones {self.path} ignorado: {reason}")
+                    return {}
+                if f.readline().rstrip(b"\n") != self.header:
+                    print(f"Catalogo de funciones {self.path} de otra version")
+                    return {}
+                return marshal.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, EOFError, ValueError, TypeError) as e:
+            print(f"No se pudo leer el catalogo de funciones {self.path}: {e}")
+            return {}
+
+    def _ensure_loaded(self):
+        # carga perezosa: el archivo se lee con la primera funcion que se pide
+        if self._entries is None:
+            self._entries = self._read()
+            print(f"Catalogo de funciones: {len(self._entries)} entradas")
+
+    def load(
+        self, function_str: str, budget: EvaluationBudget, memo_size: int
+    ) -> Tuple[bool, CompiledFunction | None]:
+        with self._lock:
+            self._ensure_loaded()
+            entry = self._entries.get(function_id(function_str))
+        # el id es un prefijo del hash: se confirma con el texto completo
+        if entry is None or entry[0] != function_str:
+            return False, None
+
+        _, variables, expression, code = entry
+        with self._lock:
+            self.hits += 1
+        if code is None:
+            return True, None
+        try:
+            return True, CompiledFunction(
+                function_str,
+                {"vars": list(variables), "expression": expression},
+                budget,
+                memo_size,
+                code=marshal.loads(code),
+            )
+        except (EOFError, ValueError, TypeError) as e:
+            print(f"Entrada invalida en el catalogo para {function_str}: {e}")
+            return False, None
+
+    def store(self, function_str: str, compiled: CompiledFunction | None):
+        entry = (
+            (function_str, [], "", None)
+            if compiled is None
+            else (
+                function_str,
+                compiled.vars,
+                compiled.expression,
+                marshal.dumps(compiled.code),
+            )
+        )
+        with self._lock:
+            self._ensure_loaded()
+            self._entries[function_id(function_str)] = entry
+            self.stored += 1
+            try:
+                self._write()
+            except OSError as e:
+                print(f"No se pudo guardar el catalogo de funciones: {e}")
+
+    def _write(self):
+        # otros consumidores del mismo host pueden haber agregado funciones:
+        # se mezclan con las del archivo y se reemplaza de forma atomica
+        self._entries = {**self._read(), **self._entries}
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, mode=0o700, exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        # solo el dueño puede leerlo o escribirlo (chmod por si quedo un
+        # temporal de una escritura interrumpida, que open no recrea)
+        with open(
+            tmp_path,
+            "wb",
+            opener=lambda path, flags: os.open(path, flags, 0o600),
+        ) as f:
+            os.chmod(tmp_path, 0o600)
+            f.write(self.header + b"\n")
+            marshal.dump(self._entries, f)
+        os.replace(tmp_path, self.path)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries) if self._entries is not None else 0,
+                "hits": self.hits,
+                "stored": self.stored,
+            }
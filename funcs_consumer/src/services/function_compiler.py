@@ -0,0 +1,191 @@
+import ast
+import hashlib
+import keyword
+import threading
+from collections import OrderedDict
+from typing import Dict, List
+
+from src.services.evaluation_budget import EvaluationBudget, EvaluationError
+from src.services import math_functions
+from src.services.function_optimizer import FunctionOptimizer
+from src.services.result_memo import ResultMemo
+from src.services.safe_ast import parse_expression
+from src.services.str_function_parser import StrFunctionParser
+
+
+# mismo id que calcula el servidor: hash del contenido de la funcion
+def function_id(function: str) -> str:
+    return hashlib.sha256(function.encode()).hexdigest()[:16]
+
+
+class CompiledFunction:
+    def __init__(
+        self,
+        source: str,
+        parsed_function: Dict[str, any],
+        budget: EvaluationBudget | None = None,
+        memo_size: int = 4096,
+        code=None,
+    ):
+        self.source = source
+        # id para los lotes de resultados, calculado una sola vez
+        self.id = function_id(source)
+        self.budget = budget or EvaluationBudget()
+        # memo de resultados para escenarios enteros (distribuciones discretas)
+        self.memo = ResultMemo(memo_size)
+        self.parsed = parsed_function
+        self.vars: List[str] = parsed_function["vars"]
+        self.expression: str = parsed_function["expression"]
+        # los arboles solo existen si se compilo aqui (no si viene del catalogo)
+        self.tree = None
+        self.optimized_tree = None
+
+        if code is None:
+            code = self._validate_and_build()
+        # codigo ya validado y optimizado (lo guarda el catalogo en disco)
+        self.code = code
+        # mismo codigo, tres tablas de funciones: `math` para escenarios
+        # individuales, ufuncs de numpy para lotes y numeros duales para
+        # lotes con gradiente
+        self.call = eval(
+            code, {**self.budget.namespace(), **math_functions.namespace("scalar")}
+        )
+        self.vector_call = eval(
+            code, {**self.budget.namespace(), **math_functions.namespace("vector")}
+        )
+        self.dual_call = eval(
+            code, {**self.budget.namespace(), **math_functions.namespace("dual")}
+        )
+
+    def _validate_and_build(self):
+        for var in self.vars:
+            if not var.isidentifier() or keyword.iskeyword(var):
+                raise ValueError(f"Variable '{var}' no es un identificador valido")
+            if var.startswith("__"):
+                raise ValueError(f"Variable '{var}' usa un nombre reservado")
+        if len(set(self.vars)) != len(self.vars):
+            raise ValueError(f"Variables repetidas en {self.vars}")
+
+        self.tree = parse_expression(self.expression, self.vars)
+        self.budget.check_tree(self.tree)
+        # arbol optimizado que ejecutan los evaluadores (escalar y numpy)
+        self.optimized_tree = FunctionOptimizer.optimize(self.tree, self.vars)
+        return self._build_code(self.budget.guard_tree(self.optimized_tree))
+
+    def _build_code(self, tree: ast.Expression):
+        # convertimos la expresion validada en `lambda x, y, ...: <expr>` para
+        # que cada escenario se evalue con argumentos posicionales, sin
+        # volver a parsear ni recorrer el arbol
+        tree = math_functions.CallRenamer().visit(tree)
+        lambda_node = ast.Lambda(
+            args=ast.arguments(
+                posonlyargs=[],
+                args=[ast.arg(arg=var) for var in self.vars],
+                kwonlyargs=[],
+                kw_defaults=[],
+                defaults=[],
+            ),
+            body=tree.body,
+        )
+        return compile(
+            ast.fix_missing_locations(ast.Expression(body=lambda_node)),
+            f"<{self.source}>",
+            "eval",
+        )
+
+    def __call__(self, *scenario):
+        return self.call(*scenario)
+
+
+class FunctionCompiler:
+    def __init__(
+        self,
+        max_size: int = 128,
+        budget: EvaluationBudget | None = None,
+        memo_size: int = 4096,
+        catalog=None,
+    ):
+        self.max_size = max_size
+        self.budget = budget or EvaluationBudget()
+        self.memo_size = memo_size
+        # catalogo en disco (FunctionCatalog) con funciones ya validadas
+        self.catalog = catalog
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict[str, CompiledFunction | None] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, function_str: str) -> CompiledFunction | None:
+        with self._lock:
+            if function_str in self._cache:
+                self.hits += 1
+                self._cache.move_to_end(function_str)
+                return self._cache[function_str]
+            self.misses += 1
+
+        compiled = self._compile(function_str)
+
+        with self._lock:
+            # guardamos tambien las funciones invalidas para no reintentarlas
+            self._cache[function_str] = compiled
+            self._cache.move_to_end(function_str)
+            while len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+        return compiled
+
+    def _compile(self, function_str: str) -> CompiledFunction | None:
+        if self.catalog is not None:
+            found, compiled = self.catalog.load(
+                function_str, self.budget, self.memo_size
+            )
+            if found:
+                return compiled
+
+        compiled = self._compile_source(function_str)
+        if self.catalog is not None:
+            self.catalog.store(function_str, compiled)
+        return compiled
+
+    def _compile_source(self, function_str: str) -> CompiledFunction | None:
+        parsed_function = StrFunctionParser.parse_function({"function": function_str})
+        if not parsed_function:
+            return None
+
+        try:
+            return CompiledFunction(
+                function_str, parsed_function, self.budget, self.memo_size
+            )
+        except EvaluationError as e:
+            print(f"[RECHAZO] {e.to_dict(function=function_str)}")
+            return None
+        except RecursionError:
+            # arbol demasiado profundo para optimizarlo o compilarlo (sumas de
+            # cientos de terminos con EVAL_MAX_NODES alto): se rechaza igual
+            error = EvaluationError(
+                "max_depth", "La expresion esta demasiado anidada para compilarla"
+            )
+            print(f"[RECHAZO] {error.to_dict(function=function_str)}")
+            return None
+        except (SyntaxError, ValueError) as e:
+            print(f"Error compilando funcion: {e}")
+            print(f"Funcion: {function_str}")
+            return None
+
+    def stats(self) -> Dict[str, any]:
+        with self._lock:
+            memo_stats = [f.memo.stats() for f in self._cache.values() if f]
+            memo_hits = sum(m["hits"] for m in memo_stats)
+            memo_total = memo_hits + sum(m["misses"] for m in memo_stats)
+            return {
+                "size": len(self._cache),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                **({"catalog": self.catalog.stats()} if self.catalog else {}),
+                "memo": {
+                    "size": sum(m["size"] for m in memo_stats),
+                    "hits": memo_hits,
+                    "evictions": sum(m["evictions"] for m in memo_stats),
+                    "hit_rate": memo_hits / memo_total if memo_total else 0.0,
+                },
+            }
@@ -1,54 +1,24 @@
-from typing import Dict, List
-import ast
-import operator as op
-
-operators = {
-    ast.Add: op.add,
-    ast.Sub: op.sub,
-    ast.Mult: op.mul,
-    ast.Div: op.truediv,
-    ast.Pow: op.pow,
-    ast.Mod: op.mod,
-    ast.USub: lambda x: -x,
-}
-
-def safe_eval(expr, variables):
-    # reemplazamos ^ con ** para potencia antes de parsear
-    expr = expr.replace('^', '**')
-    tree = ast.parse(expr, mode="eval")
-
-    def _eval(node):
-        if isinstance(node, ast.Expression):
-            return _eval(node.body)
-        elif isinstance(node, ast.Name):
-            if node.id not in variables:
-                raise ValueError(f"Variable '{node.id}' no encontrada")
-            return variables[node.id]
-        elif isinstance(node, ast.Constant):
-            return node.value
-        elif isinstance(node, ast.BinOp):
-            op_type = type(node.op)
-            if op_type not in operators:
-                raise ValueError(f"Operador {op_type.__name__} no permitido")
-            return operators[op_type](_eval(node.left), _eval(node.right))
-        elif isinstance(node, ast.UnaryOp):
-            op_type = type(node.op)
-            if op_type not in operators:
-                raise ValueError(f"Operador unario {op_type.__name__} no permitido")
-            return operators[op_type](_eval(node.operand))
-        else:
-            raise ValueError(f"Nodo {type(node).__name__} no permitido")
-
-    return _eval(tree)
+from typing import List
+
+import numpy as np
+
+from src.services.dual_numbers import Dual
+from src.services.evaluation_budget import EvaluationError
+from src.services.function_compiler import CompiledFunction
+from src.services.result_memo import is_integer_scenario
+
+
+# filas por bloque en lote; entre bloques se revisa el limite de tiempo
+BATCH_CHUNK_SIZE = 65536
+# tamaño maximo de la tabla de filas distintas, en multiplos del bloque
+MEMO_TABLE_FACTOR = 4
+
 
 class FunctionExecuter:
     @staticmethod
-    def execute(parsed_function: Dict[str, any], scenario: List[float]):
-        variables = parsed_function.get("vars", [])
-        expression = parsed_function.get("expression")
-        
-        print("Escenario:", scenario)
-        print("Funcion parseada", parsed_function)
+    def execute(function: CompiledFunction, scenario: List[float]):
+        variables = function.vars
+
         if len(variables) != len(scenario):
             print(
                 f"Error: Tamaño de variables ({len(variables)}) "
@@ -57,13 +27,172 @@ class FunctionExecuter:
             print(f"Variables: {variables}, Scenario: {scenario}")
             return None
 
-        local_scope = dict(zip(variables, scenario))
+        # los escenarios enteros se repiten mucho: se consulta el memo primero
+        memo_key = tuple(scenario) if is_integer_scenario(scenario) else None
+        if memo_key is not None:
+            result = function.memo.get(memo_key)
+            if result is not None:
+                return result
+
+        budget = function.budget
+        if budget.force_float:
+            scenario = [float(value) for value in scenario]
 
         try:
-            result = safe_eval(expression, local_scope)
+            budget.start()
+            result = function(*scenario)
+            # (-x)^0.5 con x > 0 da un complejo en Python (en numpy, nan): no
+            # es un resultado valido y no llega ni al memo ni a quien llama
+            if isinstance(result, complex):
+                raise ValueError(f"Resultado complejo {result}")
+            if memo_key is not None:
+                function.memo.put(memo_key, result)
             return result
+        except EvaluationError as e:
+            print(f"[RECHAZO] {e.to_dict(function=function.source)}")
+            return None
         except Exception as e:
             print(f"Error evaluando expresion: {e}")
-            print(f"Expresion: {expression}")
-            print(f"Variables: {local_scope}")
+            print(f"Expresion: {function.expression}")
+            print(f"Variables: {dict(zip(variables, scenario))}")
+            return None
+
+    @staticmethod
+    def execute_batch(function: CompiledFunction, scenarios: np.ndarray):
+        # scenarios: matriz (n_escenarios, n_vars); cada columna se pasa como
+        # un vector a la funcion compilada y numpy evalua todos los escenarios
+        # en una sola pasada
+        scenarios = np.asarray(scenarios, dtype=np.float64)
+        variables = function.vars
+
+        if scenarios.ndim != 2 or scenarios.shape[1] != len(variables):
+            print(
+                f"Error: Tamaño de variables ({len(variables)}) "
+                f"no coincide con la forma del lote {scenarios.shape}."
+            )
+            return None
+
+        budget = function.budget
+        n_scenarios = scenarios.shape[0]
+        result = np.empty(n_scenarios, dtype=np.float64)
+
+        try:
+            for start in range(0, n_scenarios, BATCH_CHUNK_SIZE):
+                # el limite de tiempo es por bloque: un lote grande de una
+                # funcion valida no se rechaza solo por su tamaño
+                budget.start()
+                chunk = scenarios[start : start + BATCH_CHUNK_SIZE]
+                # division por cero u overflow producen inf/nan en vez de excepcion
+                with np.errstate(all="ignore"):
+                    # funciones constantes (f(x)=15) devuelven un escalar que
+                    # se expande al tamaño del bloque
+                    result[start : start + len(chunk)] = (
+                        FunctionExecuter._execute_chunk(function, chunk)
+                    )
+                budget.check_time()
+            return result
+        except EvaluationError as e:
+            print(f"[RECHAZO] {e.to_dict(function=function.source)}")
+            return None
+        except Exception as e:
+            print(f"Error evaluando expresion en lote: {e}")
+            print(f"Expresion: {function.expression}")
+            return None
+
+    @staticmethod
+    def _distinct_rows(chunk: np.ndarray):
+        # filas distintas de un bloque de enteros y la posicion de cada fila
+        # entre ellas, o None si el bloque no es de enteros o sus valores
+        # estan demasiado dispersos. Cada fila se codifica como un numero en
+        # base `span` y se marca en una tabla densa, sin ordenar el bloque
+        if chunk.size == 0:
+            return None
+        if not np.isfinite(chunk).all() or not (chunk == np.floor(chunk)).all():
+            return None
+        low = chunk.min()
+        span = int(chunk.max() - low) + 1
+        size = span ** chunk.shape[1]
+        if size > MEMO_TABLE_FACTOR * len(chunk):
+            return None
+        weights = span ** np.arange(chunk.shape[1] - 1, -1, -1, dtype=np.int64)
+        codes = ((chunk - low) @ weights.astype(np.float64)).astype(np.int64)
+        present = np.zeros(size, dtype=bool)
+        present[codes] = True
+        distinct = np.flatnonzero(present)
+        inverse = (np.cumsum(present) - 1)[codes]
+        rows = low + (distinct[:, None] // weights % span).astype(np.float64)
+        return rows, inverse
+
+    @staticmethod
+    def _execute_chunk(function: CompiledFunction, chunk: np.ndarray):
+        # los escenarios enteros (binomial, poisson, geometrica) se repiten
+        # mucho: se evaluan solo las filas distintas que no estan en el memo
+        # (mismas claves que en execute) y se reparten a sus posiciones
+        memo = function.memo
+        distinct = (
+            FunctionExecuter._distinct_rows(chunk) if memo.max_size > 0 else None
+        )
+        # si las filas distintas no entran en el memo no hay nada que reutilizar
+        if distinct is None or len(distinct[0]) > memo.max_size:
+            return function.vector_call(*chunk.T)
+
+        rows, inverse = distinct
+        keys = list(map(tuple, rows.tolist()))
+        cached = memo.get_many(keys)
+        values = np.empty(len(rows), dtype=np.float64)
+        missing = []
+        for i, value in enumerate(cached):
+            # execute puede guardar enteros (sin promocion a float): esas
+            # filas se recalculan sin pisar la entrada
+            if isinstance(value, float):
+                values[i] = value
+            else:
+                missing.append(i)
+        if missing:
+            values[missing] = function.vector_call(*rows[missing].T)
+            new = [i for i in missing if cached[i] is None]
+            memo.put_many([keys[i] for i in new], values[new].tolist())
+        return values[inverse]
+
+    @staticmethod
+    def execute_gradient(function: CompiledFunction, scenarios: np.ndarray):
+        # evalua el lote con numeros duales: en la misma pasada devuelve los
+        # resultados (n_escenarios,) y el gradiente (n_escenarios, n_vars)
+        # respecto a cada variable de function.vars
+        scenarios = np.asarray(scenarios, dtype=np.float64)
+        variables = function.vars
+
+        if scenarios.ndim != 2 or scenarios.shape[1] != len(variables):
+            print(
+                f"Error: Tamaño de variables ({len(variables)}) "
+                f"no coincide con la forma del lote {scenarios.shape}."
+            )
+            return None
+
+        budget = function.budget
+        n_scenarios = scenarios.shape[0]
+        values = np.empty(n_scenarios, dtype=np.float64)
+        gradients = np.zeros((n_scenarios, len(variables)), dtype=np.float64)
+
+        try:
+            for start in range(0, n_scenarios, BATCH_CHUNK_SIZE):
+                budget.start()
+                chunk = scenarios[start : start + BATCH_CHUNK_SIZE]
+                end = start + len(chunk)
+                with np.errstate(all="ignore"):
+                    result = function.dual_call(*Dual.variables(chunk))
+                budget.check_time()
+                # una funcion constante no depende de las variables: gradiente 0
+                if isinstance(result, Dual):
+                    values[start:end] = result.value
+                    gradients[start:end] = result.grad
+                else:
+                    values[start:end] = result
+            return values, gradients
+        except EvaluationError as e:
+            print(f"[RECHAZO] {e.to_dict(function=function.source)}")
+            return None
+        except Exception as e:
+            print(f"Error evaluando gradiente en lote: {e}")
+            print(f"Expresion: {function.expression}")
             return None
@@ -0,0 +1,310 @@
+import ast
+import copy
+from collections import Counter
+from typing import Dict, List, Tuple
+
+from src.services.math_functions import scalar_function
+from src.services.safe_ast import operators
+
+# exponente entero maximo que se reescribe como cadena de multiplicaciones
+MAX_POW_CHAIN = 16
+# grado maximo de un polinomio que se reconoce para reescribirlo en Horner
+MAX_HORNER_DEGREE = 1024
+# limite para no plegar potencias constantes gigantes (9^9^9) al compilar
+MAX_FOLD_POW_BITS = 4096
+
+
+def _is_number(node: ast.AST) -> bool:
+    return (
+        isinstance(node, ast.Constant)
+        and isinstance(node.value, (int, float))
+        and not isinstance(node.value, bool)
+    )
+
+
+def _is_small_int_exponent(node: ast.AST, limit: int = MAX_POW_CHAIN) -> bool:
+    return _is_number(node) and isinstance(node.value, int) and 0 <= node.value <= limit
+
+
+def _op_count(node: ast.AST) -> int:
+    # costo aproximado = operaciones distintas (las repetidas las elimina CSE)
+    return len(
+        {
+            ast.dump(n)
+            for n in ast.walk(node)
+            if isinstance(n, (ast.BinOp, ast.UnaryOp, ast.Call))
+        }
+    )
+
+
+class ConstantFolder(ast.NodeTransformer):
+    # pliega subarboles formados solo por constantes: 2*3+x -> 6+x
+    def visit_BinOp(self, node: ast.BinOp):
+        self.generic_visit(node)
+        if not (_is_number(node.left) and _is_number(node.right)):
+            return node
+
+        left, right = node.left.value, node.right.value
+        if isinstance(node.op, ast.Pow) and isinstance(right, int):
+            bits = max(abs(left), 2).bit_length() if isinstance(left, int) else 64
+            if bits * abs(right) > MAX_FOLD_POW_BITS:
+                return node
+        try:
+            value = operators[type(node.op)](left, right)
+        except (ArithmeticError, ValueError):
+            # se deja sin plegar para que el error aparezca al evaluar
+            return node
+        if not isinstance(value, (int, float)):
+            return node
+        return ast.copy_location(ast.Constant(value=value), node)
+
+    def visit_UnaryOp(self, node: ast.UnaryOp):
+        self.generic_visit(node)
+        if not _is_number(node.operand):
+            return node
+        value = operators[type(node.op)](node.operand.value)
+        return ast.copy_location(ast.Constant(value=value), node)
+
+    def visit_Call(self, node: ast.Call):
+        # exp(0) -> 1.0
+        self.generic_visit(node)
+        if not all(_is_number(arg) for arg in node.args):
+            return node
+        try:
+            value = scalar_function(node.func.id)(*[arg.value for arg in node.args])
+        except (ArithmeticError, ValueError):
+            return node
+        if not isinstance(value, (int, float)):
+            return node
+        return ast.copy_location(ast.Constant(value=value), node)
+
+
+class HornerRewriter(ast.NodeTransformer):
+    # reescribe polinomios de una variable en forma de Horner:
+    # 2*x^3 + 3*x^2 + x + 5 -> ((2*x + 3)*x + 1)*x + 5
+    def visit(self, node: ast.AST):
+        if isinstance(node, (ast.BinOp, ast.UnaryOp)):
+            polynomial = _as_polynomial(node)
+            if polynomial is not None:
+                var, coefs = polynomial
+                if var is not None and len(coefs) > 1:
+                    horner = _build_horner(var, coefs)
+                    if _op_count(PowerSpecializer().visit(copy.deepcopy(horner))) < (
+                        _op_count(PowerSpecializer().visit(copy.deepcopy(node)))
+                    ):
+                        return ast.copy_location(horner, node)
+        return self.generic_visit(node)
+
+
+def _as_polynomial(node: ast.AST) -> Tuple[str | None, Dict[int, int | float]] | None:
+    # devuelve (variable, {grado: coeficiente}) o None si no es un polinomio
+    # de una sola variable con coeficientes constantes
+    if _is_number(node):
+        return None, {0: node.value}
+    if isinstance(node, ast.Name):
+        return node.id, {1: 1}
+    if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+        inner = _as_polynomial(node.operand)
+        if inner is None:
+            return None
+        return inner[0], {k: -c for k, c in inner[1].items()}
+    if not isinstance(node, ast.BinOp):
+        return None
+
+    if isinstance(node.op, ast.Pow):
+        if not _is_small_int_exponent(node.right, MAX_HORNER_DEGREE):
+            return None
+        base = _as_polynomial(node.left)
+        if base is None:
+            return None
+        exponent = node.right.value
+        if len(base[1]) == 1:
+            # monomio: (c*x^k)^n = c^n * x^(k*n), sin expandir; c^n se calcula
+            # al compilar solo si no puede crecer sin limite
+            degree, coef = next(iter(base[1].items()))
+            if degree * exponent > MAX_HORNER_DEGREE:
+                return None
+            if exponent > MAX_POW_CHAIN and coef not in (1, -1):
+                return None
+            return base[0], {degree * exponent: coef**exponent}
+        # (x + 1)^n se expande solo para exponentes chicos: los coeficientes
+        # crecen como combinatorios
+        if exponent > MAX_POW_CHAIN:
+            return None
+        result = (base[0], {0: 1})
+        for _ in range(exponent):
+            result = _poly_mul(result, base)
+            if result is None:
+                return None
+        return result
+
+    left = _as_polynomial(node.left)
+    right = _as_polynomial(node.right)
+    if left is None or right is None:
+        return None
+    if isinstance(node.op, ast.Add):
+        return _poly_add(left, right, 1)
+    if isinstance(node.op, ast.Sub):
+        return _poly_add(left, right, -1)
+    if isinstance(node.op, ast.Mult):
+        return _poly_mul(left, right)
+    return None
+
+
+def _merge_var(a: str | None, b: str | None) -> Tuple[bool, str | None]:
+    if a is None or b is None or a == b:
+        return True, a if a is not None else b
+    return False, None
+
+
+def _poly_add(left, right, sign: int):
+    ok, var = _merge_var(left[0], right[0])
+    if not ok:
+        return None
+    coefs = dict(left[1])
+    for k, c in right[1].items():
+        coefs[k] = coefs.get(k, 0) + sign * c
+    return var, {k: c for k, c in coefs.items() if c != 0}
+
+
+def _poly_mul(left, right):
+    ok, var = _merge_var(left[0], right[0])
+    if not ok:
+        return None
+    coefs: Dict[int, int | float] = {}
+    for k1, c1 in left[1].items():
+        for k2, c2 in right[1].items():
+            coefs[k1 + k2] = coefs.get(k1 + k2, 0) + c1 * c2
+    if coefs and max(coefs) > MAX_HORNER_DEGREE:
+        return None
+    return var, {k: c for k, c in coefs.items() if c != 0}
+
+
+def _build_horner(var: str, coefs: Dict[int, int | float]) -> ast.AST:
+    degrees = sorted(coefs, reverse=True)
+
+    def x_pow(k: int) -> ast.AST:
+        name = ast.Name(id=var, ctx=ast.Load())
+        if k == 1:
+            return name
+        return ast.BinOp(left=name, op=ast.Pow(), right=ast.Constant(value=k))
+
+    def add_term(acc: ast.AST, coef) -> ast.AST:
+        if coef < 0:
+            return ast.BinOp(left=acc, op=ast.Sub(), right=ast.Constant(value=-coef))
+        return ast.BinOp(left=acc, op=ast.Add(), right=ast.Constant(value=coef))
+
+    # termino principal: c_n * x^(n - siguiente grado)
+    lead = coefs[degrees[0]]
+    acc = None
+    for i, degree in enumerate(degrees):
+        next_degree = degrees[i + 1] if i + 1 < len(degrees) else 0
+        gap = degree - next_degree
+        if acc is None:
+            if gap == 0:
+                acc = ast.Constant(value=lead)
+            elif lead == 1 and isinstance(lead, int):
+                acc = x_pow(gap)
+            elif lead == -1 and isinstance(lead, int):
+                acc = ast.UnaryOp(op=ast.USub(), operand=x_pow(gap))
+            else:
+                acc = ast.BinOp(
+                    left=ast.Constant(value=lead), op=ast.Mult(), right=x_pow(gap)
+                )
+        else:
+            acc = add_term(acc, coefs[degree])
+            if gap > 0:
+                acc = ast.BinOp(left=acc, op=ast.Mult(), right=x_pow(gap))
+    return acc
+
+
+class PowerSpecializer(ast.NodeTransformer):
+    # x^0 -> 1, x^1 -> x, x^n (n entero pequeño) -> cadena de multiplicaciones
+    # por cuadrados sucesivos; las repeticiones las comparte luego CSE
+    def visit_BinOp(self, node: ast.BinOp):
+        self.generic_visit(node)
+        if not isinstance(node.op, ast.Pow) or not _is_small_int_exponent(node.right):
+            return node
+        exponent = node.right.value
+        if exponent == 0:
+            return ast.copy_location(ast.Constant(value=1), node)
+        return ast.copy_location(_pow_chain(node.left, exponent), node)
+
+
+def _pow_chain(base: ast.AST, exponent: int) -> ast.AST:
+    if exponent == 1:
+        return copy.deepcopy(base)
+    if exponent % 2 == 0:
+        half = _pow_chain(base, exponent // 2)
+        return ast.BinOp(left=half, op=ast.Mult(), right=copy.deepcopy(half))
+    return ast.BinOp(
+        left=_pow_chain(base, exponent - 1), op=ast.Mult(), right=copy.deepcopy(base)
+    )
+
+
+class CommonSubexpressionEliminator(ast.NodeTransformer):
+    # la primera aparicion (en orden de evaluacion) de una subexpresion
+    # repetida se guarda con `:=` y las siguientes reutilizan el nombre
+    def __init__(self, variables: List[str]):
+        self.variables = set(variables)
+        self.counts: Counter = Counter()
+        self.names: Dict[str, str] = {}
+        self.emitted: set = set()
+
+    def _count(self, node: ast.AST):
+        if not isinstance(node, (ast.BinOp, ast.UnaryOp, ast.Call)):
+            return
+        key = ast.dump(node)
+        self.counts[key] += 1
+        if self.counts[key] > 1:
+            # lo que hay debajo de una repeticion se reutiliza completo
+            return
+        for child in ast.iter_child_nodes(node):
+            self._count(child)
+
+    def _new_name(self) -> str:
+        index = len(self.names)
+        while f"_t{index}" in self.variables:
+            index += 1
+        return f"_t{index}"
+
+    def run(self, tree: ast.Expression) -> ast.Expression:
+        self._count(tree.body)
+        for key, count in self.counts.items():
+            if count > 1:
+                self.names[key] = self._new_name()
+                self.variables.add(self.names[key])
+        return self.visit(tree)
+
+    def _visit_op(self, node: ast.AST):
+        key = ast.dump(node)
+        if key in self.names and key in self.emitted:
+            return ast.copy_location(ast.Name(id=self.names[key], ctx=ast.Load()), node)
+
+        self.generic_visit(node)
+        if key not in self.names:
+            return node
+        self.emitted.add(key)
+        return ast.copy_location(
+            ast.NamedExpr(
+                target=ast.Name(id=self.names[key], ctx=ast.Store()), value=node
+            ),
+            node,
+        )
+
+    visit_BinOp = _visit_op
+    visit_UnaryOp = _visit_op
+    visit_Call = _visit_op
+
+
+class FunctionOptimizer:
+    @staticmethod
+    def optimize(tree: ast.Expression, variables: List[str]) -> ast.Expression:
+        # el arbol recibido ya paso por validate_tree; se trabaja sobre copia
+        tree = copy.deepcopy(tree)
+        tree = ConstantFolder().visit(tree)
+        tree = HornerRewriter().visit(tree)
+        tree = PowerSpecializer().visit(tree)
+        tree = ConstantFolder().visit(tree)
+        tree = CommonSubexpressionEliminator(variables).run(tree)
+        return ast.fix_missing_locations(tree)
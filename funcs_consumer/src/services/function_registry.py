@@ -0,0 +1,73 @@
+import threading
+from collections import OrderedDict
+
+import grpc
+
+from src.protos import function_service_pb2, function_service_pb2_grpc
+from src.services.function_compiler import CompiledFunction, FunctionCompiler
+
+
+class FunctionRegistry:
+    # relaciona id de funcion -> texto de la funcion, para que escenarios de
+    # distintas funciones intercalados se evaluen cada uno con la suya sin
+    # volver a parsear (la compilacion queda en el cache del FunctionCompiler)
+    def __init__(
+        self, compiler: FunctionCompiler, server_address: str, max_size: int = 128
+    ):
+        self.compiler = compiler
+        self.server_address = server_address
+        self.max_size = max_size
+        self._functions: OrderedDict[str, str] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def register(self, func_id: str, function: str):
+        with self._lock:
+            self._functions[func_id] = function
+            self._functions.move_to_end(func_id)
+            while len(self._functions) > self.max_size:
+                self._functions.popitem(last=False)
+
+    def _function(self, func_id: str) -> str | None:
+        # texto de la funcion, "" si el servidor no la conoce o None si no se
+        # pudo consultar (error transitorio)
+        with self._lock:
+            function = self._functions.get(func_id)
+            if function is not None:
+                self._functions.move_to_end(func_id)
+
+        if function is None:
+            # escenario de una funcion que no recibimos (p. ej. el consumidor
+            # se reinicio): se pide al servidor por id
+            function = self._fetch(func_id)
+            if function is None:
+                return None
+            # "" = el servidor no la conoce; se recuerda para no repetir la consulta
+            self.register(func_id, function)
+        return function
+
+    def unavailable(self, func_ids) -> set:
+        # ids cuya funcion no se pudo consultar: sus escenarios vuelven a la
+        # cola en vez de descartarse. Los ids que el servidor no conoce no
+        # cuentan (reintentarlos no cambiaria nada)
+        return {func_id for func_id in func_ids if self._function(func_id) is None}
+
+    def resolve(self, func_id: str) -> CompiledFunction | None:
+        function = self._function(func_id)
+        if function is None:
+            return None
+        if not function:
+            print(f"Funcion con id {func_id} no disponible")
+            return None
+        return self.compiler.get(function)
+
+    def _fetch(self, func_id: str) -> str | None:
+        try:
+            with grpc.insecure_channel(self.server_address) as channel:
+                stub = function_service_pb2_grpc.FunctionServiceStub(channel)
+                response = stub.GetFunction(
+                    function_service_pb2.GetFunctionRequest(id=func_id)
+                )
+                return response.function
+        except Exception as e:
+            print(f"No se pudo obtener funcion {func_id} via gRPC: {e}")
+            return None
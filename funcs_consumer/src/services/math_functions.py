@@ -0,0 +1,67 @@
+import ast
+import math
+from functools import reduce
+from typing import Dict
+
+import numpy as np
+
+from src.services.dual_numbers import dual_functions
+
+# prefijo de los nombres inyectados en la funcion compilada, asi una variable
+# llamada igual que una funcion (f(exp)=exp(exp)) no la oculta
+FUNCTION_PREFIX = "__fn_"
+
+# nombre: (implementacion escalar, implementacion numpy, aridad minima, maxima)
+# aridad maxima None = variadica
+math_functions = {
+    "exp": (math.exp, np.exp, 1, 1),
+    "log": (math.log, np.log, 1, 1),
+    "sqrt": (math.sqrt, np.sqrt, 1, 1),
+    "sin": (math.sin, np.sin, 1, 1),
+    "cos": (math.cos, np.cos, 1, 1),
+    "tan": (math.tan, np.tan, 1, 1),
+    "abs": (abs, np.abs, 1, 1),
+    "min": (min, lambda *args: reduce(np.minimum, args), 2, None),
+    "max": (max, lambda *args: reduce(np.maximum, args), 2, None),
+}
+
+
+def validate_call(node: ast.Call):
+    if not isinstance(node.func, ast.Name) or node.func.id not in math_functions:
+        name = node.func.id if isinstance(node.func, ast.Name) else "?"
+        raise ValueError(f"Funcion '{name}' no permitida")
+    if node.keywords or any(isinstance(arg, ast.Starred) for arg in node.args):
+        raise ValueError(f"Argumentos no permitidos en '{node.func.id}'")
+
+    _, _, min_args, max_args = math_functions[node.func.id]
+    too_many = max_args is not None and len(node.args) > max_args
+    if len(node.args) < min_args or too_many:
+        raise ValueError(
+            f"Numero de argumentos invalido para '{node.func.id}': {len(node.args)}"
+        )
+
+
+def scalar_function(name: str):
+    return math_functions[name][0]
+
+
+def namespace(kind: str) -> Dict[str, any]:
+    # kind: "scalar" (math), "vector" (numpy) o "dual" (gradientes)
+    if kind == "dual":
+        impls = dual_functions
+    else:
+        index = 1 if kind == "vector" else 0
+        impls = {name: impl[index] for name, impl in math_functions.items()}
+    return {f"{FUNCTION_PREFIX}{name}": impl for name, impl in impls.items()}
+
+
+class CallRenamer(ast.NodeTransformer):
+    # exp(x) -> __fn_exp(x)
+    def visit_Call(self, node: ast.Call):
+        self.generic_visit(node)
+        if isinstance(node.func, ast.Name) and node.func.id in math_functions:
+            node.func = ast.copy_location(
+                ast.Name(id=f"{FUNCTION_PREFIX}{node.func.id}", ctx=ast.Load()),
+                node.func,
+            )
+        return node
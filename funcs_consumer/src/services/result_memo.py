@@ -0,0 +1,82 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+
+def is_integer_scenario(scenario) -> bool:
+    # binomial, poisson y geometrica generan escenarios enteros que se repiten
+    for value in scenario:
+        if isinstance(value, bool):
+            return False
+        if isinstance(value, int):
+            continue
+        if not isinstance(value, float) or not value.is_integer():
+            return False
+    return True
+
+
+class ResultMemo:
+    # tabla LRU acotada escenario -> resultado para una sola funcion
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._table: OrderedDict[Tuple, float] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple):
+        with self._lock:
+            result = self._table.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._table.move_to_end(key)
+            return result
+
+    def put(self, key: Tuple, result: float):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._table[key] = result
+            self._table.move_to_end(key)
+            while len(self._table) > self.max_size:
+                self._table.popitem(last=False)
+                self.evictions += 1
+
+    # consultas y altas de un bloque de escenarios con una sola toma del lock
+    def get_many(self, keys: List[Tuple]) -> List:
+        with self._lock:
+            results = []
+            for key in keys:
+                result = self._table.get(key)
+                if result is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    self._table.move_to_end(key)
+                results.append(result)
+            return results
+
+    def put_many(self, keys: List[Tuple], results: List[float]):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            for key, result in zip(keys, results):
+                self._table[key] = result
+                self._table.move_to_end(key)
+            while len(self._table) > self.max_size:
+                self._table.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._table),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / total if total else 0.0,
+            }
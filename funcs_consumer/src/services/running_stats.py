@@ -0,0 +1,90 @@
+import math
+from time import monotonic
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+
+class RunningStats:
+    # conteo, media y M2 (suma de cuadrados de las desviaciones) de Welford,
+    # con minimo y maximo. Cada lote se resume y se combina con la formula de
+    # Chan, que es la misma que usa el monitor para juntar los parciales
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if values.size == 0:
+            return
+        mean = float(values.mean())
+        self.merge(
+            values.size,
+            mean,
+            float(((values - mean) ** 2).sum()),
+            float(values.min()),
+            float(values.max()),
+        )
+
+    def merge(self, count: int, mean: float, m2: float, min_: float, max_: float):
+        total = self.count + count
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, min_)
+        self.max = max(self.max, max_)
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "m2": self.m2,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class ResultAggregator:
+    # acumula los resultados por funcion y decide cuando publicar el parcial:
+    # cada flush_count resultados o flush_seconds desde el primer lote
+    # pendiente. Los lotes se confirman al publicar el parcial que los
+    # incluye, por eso se guardan como pendientes (opacos para esta clase)
+    def __init__(self, flush_count: int = 1000, flush_seconds: float = 1.0):
+        self.flush_count = flush_count
+        self.flush_seconds = flush_seconds
+        self._stats: Dict[str, RunningStats] = {}
+        self._pending: List = []
+        self._results = 0
+        self._since = None
+
+    def add(self, function: str, values):
+        if len(values) == 0:
+            return
+        self._stats.setdefault(function, RunningStats()).add(values)
+        self._results += len(values)
+
+    def defer(self, pending):
+        if self._since is None:
+            self._since = monotonic()
+        self._pending.append(pending)
+
+    def time_left(self) -> float | None:
+        if self._since is None:
+            return None
+        return max(0.0, self._since + self.flush_seconds - monotonic())
+
+    def due(self) -> bool:
+        return self._since is not None and (
+            self._results >= self.flush_count or self.time_left() == 0.0
+        )
+
+    def flush(self) -> Tuple[List[Tuple[str, Dict[str, float]]], List]:
+        partials = [(func, stats.to_dict()) for func, stats in self._stats.items()]
+        pending = self._pending
+        self._stats, self._pending = {}, []
+        self._results, self._since = 0, None
+        return partials, pending
@@ -0,0 +1,54 @@
+import ast
+import operator as op
+
+from src.services.math_functions import validate_call
+
+operators = {
+    ast.Add: op.add,
+    ast.Sub: op.sub,
+    ast.Mult: op.mul,
+    ast.Div: op.truediv,
+    ast.Pow: op.pow,
+    ast.Mod: op.mod,
+    ast.USub: lambda x: -x,
+}
+
+
+def parse_expression(expr: str, variables) -> ast.Expression:
+    # reemplazamos ^ con ** para potencia antes de parsear
+    tree = ast.parse(expr.replace("^", "**"), mode="eval")
+    validate_tree(tree, variables)
+    return tree
+
+
+def validate_tree(tree: ast.AST, variables):
+    # recorremos el arbol una sola vez verificando la lista blanca de nodos
+    function_names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.Expression, ast.Load)):
+            continue
+        elif isinstance(node, ast.Constant):
+            # solo numeros reales: ni cadenas, ni booleanos, ni complejos (1j)
+            if not isinstance(node.value, (int, float)) or isinstance(
+                node.value, bool
+            ):
+                raise ValueError(f"Constante {node.value!r} no permitida")
+        elif isinstance(node, ast.Call):
+            validate_call(node)
+            # el nombre de la funcion no es una variable
+            function_names.add(id(node.func))
+        elif isinstance(node, ast.Name):
+            if id(node) not in function_names and node.id not in variables:
+                raise ValueError(f"Variable '{node.id}' no encontrada")
+        elif isinstance(node, ast.BinOp):
+            if type(node.op) not in operators:
+                raise ValueError(f"Operador {type(node.op).__name__} no permitido")
+        elif isinstance(node, ast.UnaryOp):
+            if type(node.op) not in operators:
+                raise ValueError(
+                    f"Operador unario {type(node.op).__name__} no permitido"
+                )
+        elif isinstance(node, ast.operator | ast.unaryop):
+            continue
+        else:
+            raise ValueError(f"Nodo {type(node).__name__} no permitido")
@@ -0,0 +1,66 @@
+import numpy as np
+
+# maximo de escenarios que puede pedir una receta (un bloque en memoria)
+MAX_RECIPE_COUNT = 1_000_000
+
+# mismas distribuciones y parametros que el ScenarioGenerator del servidor
+recipe_params = {
+    "normal": {"loc", "scale"},
+    "binomial": {"n", "p"},
+    "poisson": {"lam"},
+    "uniform": {"low", "high"},
+    "exponential": {"scale"},
+    "gamma": {"shape", "scale"},
+    "beta": {"a", "b"},
+    "geometric": {"p"},
+    "lognormal": {"mean", "sigma"},
+}
+
+
+class ScenarioRecipe:
+    # una receta reemplaza a `count` mensajes de escenario:
+    #   {"type": "recipe", "function_id", "distribution", "params",
+    #    "seed": {"entropy": int, "spawn_key": [..]}, "count": n}
+    # el bloque se genera con PCG64 sembrado por la SeedSequence de la receta,
+    # asi la misma receta produce siempre los mismos escenarios
+    @staticmethod
+    def validate(recipe: dict):
+        distribution = recipe.get("distribution")
+        if distribution not in recipe_params:
+            raise ValueError(f"Distribucion '{distribution}' no soportada")
+        params = recipe.get("params") or {}
+        unknown = set(params) - recipe_params[distribution]
+        if unknown:
+            raise ValueError(f"Parametros no validos para {distribution}: {unknown}")
+        count = recipe.get("count")
+        if not isinstance(count, int) or not 0 < count <= MAX_RECIPE_COUNT:
+            raise ValueError(f"Cantidad de escenarios invalida: {count}")
+        seed = recipe.get("seed")
+        if not isinstance(seed, dict) or not isinstance(seed.get("entropy"), int):
+            raise ValueError("La receta no trae semilla")
+
+    @staticmethod
+    def generate(recipe: dict, n_vars: int) -> np.ndarray:
+        # matriz (count, n_vars) de float64
+        ScenarioRecipe.validate(recipe)
+        seed = recipe["seed"]
+        seed_sequence = np.random.SeedSequence(
+            entropy=seed["entropy"], spawn_key=tuple(seed.get("spawn_key", ()))
+        )
+        generator = np.random.Generator(np.random.PCG64(seed_sequence))
+        sample = getattr(generator, recipe["distribution"])
+        return np.asarray(
+            sample(size=(recipe["count"], n_vars), **(recipe.get("params") or {})),
+            dtype=np.float64,
+        )
+
+
+def message_matrix(message: dict, n_vars: int) -> np.ndarray:
+    # matriz (n, n_vars) de un mensaje que trae varios escenarios: un bloque
+    # ya generado (vista sobre el cuerpo binario) o una receta a generar
+    if message.get("type") == "block":
+        block = message["scenarios"]
+        if block.ndim != 2 or block.shape[1] != n_vars:
+            raise ValueError(f"Bloque {block.shape} para {n_vars} variables")
+        return block
+    return ScenarioRecipe.generate(message, n_vars)
@@ -0,0 +1,199 @@
+import itertools
+import multiprocessing
+import os
+import threading
+from typing import Dict, List, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from src.services.evaluation_budget import EvaluationBudget
+from src.services.function_compiler import CompiledFunction, FunctionCompiler
+from src.services.function_executer import FunctionExecuter
+from src.services.scenario_recipe import message_matrix
+from src.services.shared_ring import SharedRing
+
+# secuencia que le indica a un evaluador que termine
+STOP_SEQ = -1
+
+
+class SharedBatch:
+    # lote enviado a los evaluadores; result() espera a que vuelvan todas sus
+    # partes (una por funcion y por ranura que ocupo)
+    def __init__(self, messages: int):
+        self.messages = messages
+        self.evaluated = []
+        # la parte extra se descuenta al terminar de enviarlo (done_sending),
+        # asi no se completa mientras todavia se estan escribiendo ranuras
+        self._parts = 1
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+
+    def __len__(self) -> int:
+        return self.messages
+
+    def add_part(self):
+        with self._lock:
+            self._parts += 1
+
+    def part_done(
+        self,
+        compiled_function: CompiledFunction | None = None,
+        results: np.ndarray | None = None,
+    ):
+        with self._lock:
+            # sin escenarios (None): la matriz queda en la memoria compartida
+            if results is not None and len(results):
+                self.evaluated.append((compiled_function, None, results, None))
+            self._parts -= 1
+            if self._parts == 0:
+                self._done.set()
+
+    def done_sending(self):
+        self.part_done()
+
+    def result(self) -> List[Tuple[CompiledFunction, None, np.ndarray, None]]:
+        self._done.wait()
+        return self.evaluated
+
+
+def run_evaluator(scenarios: SharedRing, results: SharedRing):
+    # proceso evaluador: toma matrices del anillo de escenarios (vistas sin
+    # copia), las evalua en una pasada y devuelve los resultados por el anillo
+    # de resultados. Cada proceso tiene su propia cache de funciones
+    load_dotenv()
+    compiler = FunctionCompiler(budget=EvaluationBudget.from_env())
+    parent = os.getppid()
+
+    while True:
+        item = scenarios.get(timeout=1.0)
+        if item is None:
+            # el proceso de recepcion murio: no queda a quien devolver nada
+            if os.getppid() != parent:
+                return
+            continue
+
+        slot, seq, text, view = item
+        if seq == STOP_SEQ:
+            del view
+            scenarios.release(slot)
+            return
+
+        compiled_function = compiler.get(text.decode())
+        values = (
+            FunctionExecuter.execute_batch(compiled_function, view)
+            if compiled_function
+            else None
+        )
+        del view
+        scenarios.release(slot)
+
+        if values is None:
+            values = np.empty(0)
+        results.put(seq, b"", values.reshape(-1, 1))
+
+
+class SharedEvaluation:
+    # modo de maquina (CONSUMER_MODE=shared): este proceso tiene la unica
+    # conexion al broker, deserializa los escenarios una vez y los escribe como
+    # matrices en un anillo de memoria compartida; n procesos evaluadores los
+    # leen sin copiarlos y devuelven los resultados por un segundo anillo que
+    # lee el hilo collector. La publicacion y los ack siguen en este proceso
+    def __init__(self, n_evaluators: int, slots: int, slot_values: int):
+        self.n_evaluators = n_evaluators
+        # spawn: como el supervisor, los hijos no heredan hilos ni conexiones
+        self._context = multiprocessing.get_context("spawn")
+        self.scenarios = SharedRing(self._context, slots, slot_values)
+        self.results = SharedRing(self._context, slots, slot_values, text_bytes=0)
+        self._seq = itertools.count()
+        # secuencia -> (lote, funcion) de las partes en evaluacion
+        self._parts: Dict[int, Tuple[SharedBatch, CompiledFunction]] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.processes = []
+
+    def start(self):
+        for instance in range(self.n_evaluators):
+            process = self._context.Process(
+                target=run_evaluator,
+                args=(self.scenarios, self.results),
+                name=f"evaluator-{instance}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+        self._collector = threading.Thread(target=self._collect, daemon=True)
+        self._collector.start()
+
+    def alive(self) -> bool:
+        return self._collector.is_alive() and all(
+            process.is_alive() for process in self.processes
+        )
+
+    def submit(
+        self, groups: List[Tuple[CompiledFunction, List]], messages: int
+    ) -> SharedBatch:
+        # groups: (funcion, escenarios) como los agrupa group_batch; cada grupo
+        # se escribe como matriz (varias ranuras si no entra en una). Bloquea
+        # si el anillo esta lleno (backpressure hacia el broker)
+        batch = SharedBatch(messages)
+        for compiled_function, scenarios in groups:
+            for matrix in self._matrices(compiled_function, scenarios):
+                rows = self.scenarios.max_rows(matrix.shape[1])
+                for start in range(0, len(matrix), rows):
+                    seq = next(self._seq)
+                    with self._lock:
+                        self._parts[seq] = (batch, compiled_function)
+                    batch.add_part()
+                    self.scenarios.put(
+                        seq,
+                        compiled_function.source.encode(),
+                        matrix[start : start + rows],
+                    )
+        batch.done_sending()
+        return batch
+
+    def _matrices(self, compiled_function: CompiledFunction, scenarios: List):
+        n_vars = len(compiled_function.vars)
+        plain = [
+            s for s in scenarios if not isinstance(s, dict) and len(s) == n_vars
+        ]
+        if plain:
+            yield np.array(plain, dtype=np.float64)
+        for message in scenarios:
+            if isinstance(message, dict):
+                try:
+                    yield message_matrix(message, n_vars)
+                except (ValueError, TypeError) as e:
+                    print(f"Mensaje de escenarios invalido: {e}")
+
+    def _collect(self):
+        while not self._stop.is_set():
+            item = self.results.get(timeout=1.0)
+            if item is None:
+                continue
+            slot, seq, _, view = item
+            values = view[:, 0]
+            # como en la evaluacion local, los no finitos se descartan (la
+            # mascara copia los valores antes de liberar la ranura)
+            results = values[np.isfinite(values)]
+            del view, values
+            self.results.release(slot)
+
+            with self._lock:
+                batch, compiled_function = self._parts.pop(seq)
+            batch.part_done(compiled_function, results)
+
+    def stop(self, timeout: float = 5.0):
+        for process in self.processes:
+            if process.is_alive():
+                self.scenarios.put(STOP_SEQ, b"", np.empty((0, 0)), timeout=timeout)
+        for process in self.processes:
+            process.join(timeout)
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self._stop.set()
+        self._collector.join(timeout)
+        self.scenarios.close()
+        self.results.close()
@@ -0,0 +1,129 @@
+import struct
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# estado de cada ranura
+FREE, READY, BUSY = 0, 1, 2
+# secuencia, filas, columnas, largo del texto
+SLOT_HEADER = struct.Struct("<qiiI")
+SLOT_HEADER_SIZE = 24
+
+
+class SharedRing:
+    # anillo de ranuras en multiprocessing.shared_memory entre procesos de la
+    # misma maquina. Cada ranura lleva una matriz float64 (filas, columnas)
+    # y un texto (la funcion a evaluar); quien lee recibe una vista de NumPy
+    # sobre la memoria compartida, sin copiar ni deserializar.
+    #
+    # Los contadores items/spaces (semaforos) bloquean al que escribe si no
+    # hay ranuras libres y al que lee si no hay ranuras listas. Con varios
+    # lectores las ranuras se liberan en cualquier orden: se escribe en la
+    # siguiente libre y se lee la lista con menor secuencia.
+    #
+    # Se crea en el proceso padre (context = contexto de multiprocessing) y se
+    # pasa como argumento a los procesos hijos, que se conectan a la misma
+    # memoria al deserializarlo
+    def __init__(self, context, slots: int, values: int, text_bytes: int = 65536):
+        self.slots = slots
+        self.values = values
+        self.text_bytes = text_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=self._size())
+        self.shm.buf[:slots] = bytes(slots)
+        self.owner = True
+        self.lock = context.Lock()
+        self.items = context.Semaphore(0)
+        self.spaces = context.Semaphore(slots)
+        self._next = 0
+
+    def _size(self) -> int:
+        return self._slot_offset(self.slots)
+
+    def _slot_offset(self, slot: int) -> int:
+        # estados al principio (alineados a 64 bytes) y luego las ranuras
+        states = -(-self.slots // 64) * 64
+        slot_size = SLOT_HEADER_SIZE + self.text_bytes + 8 * self.values
+        return states + slot * slot_size
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state["shm"] = self.shm.name
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # solo el padre la borra: el hijo no la registra en el resource tracker
+        self.shm = shared_memory.SharedMemory(name=state["shm"], track=False)
+        self.owner = False
+
+    def max_rows(self, columns: int) -> int:
+        return self.values // max(1, columns)
+
+    def put(
+        self, seq: int, text: bytes, matrix: np.ndarray, timeout: float | None = None
+    ) -> bool:
+        rows, columns = matrix.shape
+        if rows * columns > self.values or len(text) > self.text_bytes:
+            raise ValueError(f"No cabe en la ranura: {matrix.shape}, {len(text)}")
+        if not self.spaces.acquire(timeout=timeout):
+            return False
+
+        with self.lock:
+            slot = self._next
+            while self.shm.buf[slot] != FREE:
+                slot = (slot + 1) % self.slots
+            self.shm.buf[slot] = BUSY
+            self._next = (slot + 1) % self.slots
+
+        # la ranura esta reservada: se escribe fuera del lock
+        offset = self._slot_offset(slot)
+        SLOT_HEADER.pack_into(self.shm.buf, offset, seq, rows, columns, len(text))
+        offset += SLOT_HEADER_SIZE
+        self.shm.buf[offset : offset + len(text)] = text
+        offset += self.text_bytes
+        view = np.ndarray(
+            (rows, columns), dtype=np.float64, buffer=self.shm.buf, offset=offset
+        )
+        view[:] = matrix
+        del view
+
+        with self.lock:
+            self.shm.buf[slot] = READY
+        self.items.release()
+        return True
+
+    def get(self, timeout: float | None = None):
+        # devuelve (ranura, secuencia, texto, vista) o None si vence el
+        # timeout; la vista es valida hasta release(ranura)
+        if not self.items.acquire(timeout=timeout):
+            return None
+
+        with self.lock:
+            slot, first = None, None
+            for i in range(self.slots):
+                if self.shm.buf[i] != READY:
+                    continue
+                seq = SLOT_HEADER.unpack_from(self.shm.buf, self._slot_offset(i))[0]
+                if first is None or seq < first:
+                    slot, first = i, seq
+            self.shm.buf[slot] = BUSY
+
+        offset = self._slot_offset(slot)
+        seq, rows, columns, text_len = SLOT_HEADER.unpack_from(self.shm.buf, offset)
+        offset += SLOT_HEADER_SIZE
+        text = bytes(self.shm.buf[offset : offset + text_len])
+        offset += self.text_bytes
+        view = np.ndarray(
+            (rows, columns), dtype=np.float64, buffer=self.shm.buf, offset=offset
+        )
+        return slot, seq, text, view
+
+    def release(self, slot: int):
+        with self.lock:
+            self.shm.buf[slot] = FREE
+        self.spaces.release()
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
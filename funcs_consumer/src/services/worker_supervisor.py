@@ -0,0 +1,127 @@
+import multiprocessing
+import signal
+from time import monotonic, sleep, time
+from typing import Callable, Dict
+
+# tiempo minimo de vida para considerar que un proceso arranco bien; si muere
+# antes, el siguiente reinicio espera el doble (hasta MAX_RESTART_DELAY)
+STABLE_SECONDS = 60.0
+MAX_RESTART_DELAY = 30.0
+
+
+class WorkerSupervisor:
+    # levanta n procesos consumidores, cada uno con su conexion al broker y su
+    # cache de funciones. Revisa que sigan vivos y enviando latidos, reinicia
+    # los que mueren o se cuelgan, y al detenerse les pide que drenen (terminen
+    # y confirmen lo recibido) antes de cerrar.
+    #
+    # target(instance, heartbeat) es el proceso consumidor: debe actualizar
+    # heartbeat.value con time() y, al recibir SIGTERM, drenar y terminar
+    def __init__(
+        self,
+        target: Callable,
+        n_workers: int,
+        health_timeout: float = 30.0,
+        drain_timeout: float = 30.0,
+    ):
+        self.target = target
+        self.n_workers = n_workers
+        self.health_timeout = health_timeout
+        self.drain_timeout = drain_timeout
+        # spawn: los procesos no heredan hilos ni conexiones del supervisor
+        self._context = multiprocessing.get_context("spawn")
+        self._workers: Dict[int, Dict[str, any]] = {}
+        self.restarts = 0
+
+    def _spawn(self, instance: int, failures: int = 0):
+        heartbeat = self._context.Value("d", time())
+        process = self._context.Process(
+            target=self.target,
+            args=(instance, heartbeat),
+            name=f"consumer-{instance}",
+        )
+        process.start()
+        self._workers[instance] = {
+            "process": process,
+            "heartbeat": heartbeat,
+            "started": monotonic(),
+            "failures": failures,
+            "restart_at": None,
+        }
+        print(f"[SUPERVISOR] Proceso {instance} iniciado (pid {process.pid})")
+
+    def _check(self, instance: int):
+        worker = self._workers[instance]
+        process = worker["process"]
+
+        if worker["restart_at"] is not None:
+            if monotonic() >= worker["restart_at"]:
+                self.restarts += 1
+                self._spawn(instance, worker["failures"])
+            return
+
+        if process.is_alive():
+            if time() - worker["heartbeat"].value <= self.health_timeout:
+                return
+            print(f"[SUPERVISOR] Proceso {instance} sin latido, reiniciando")
+            process.kill()
+        process.join()
+
+        # si murio al poco de arrancar se espera cada vez mas para reiniciarlo
+        failures = (
+            0
+            if monotonic() - worker["started"] >= STABLE_SECONDS
+            else worker["failures"] + 1
+        )
+        delay = min(MAX_RESTART_DELAY, 2 ** failures - 1)
+        print(
+            f"[SUPERVISOR] Proceso {instance} termino (codigo {process.exitcode}), "
+            f"reinicio en {delay:.0f}s"
+        )
+        worker["failures"] = failures
+        worker["restart_at"] = monotonic() + delay
+
+    def stop(self):
+        # drenado: cada proceso deja de recibir escenarios, termina los que
+        # tiene y confirma sus resultados
+        # se avisa con SIGTERM y no con un Event compartido: un proceso muerto
+        # a la fuerza puede dejar bloqueado un Event de multiprocessing
+        print("[SUPERVISOR] Drenando procesos...")
+        for worker in self._workers.values():
+            if worker["process"].is_alive():
+                worker["process"].terminate()
+        deadline = monotonic() + self.drain_timeout
+        for instance, worker in self._workers.items():
+            process = worker["process"]
+            process.join(max(0.0, deadline - monotonic()))
+            if process.is_alive():
+                print(f"[SUPERVISOR] Proceso {instance} no termino a tiempo")
+                process.kill()
+                process.join()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "workers": self.n_workers,
+            "alive": sum(w["process"].is_alive() for w in self._workers.values()),
+            "restarts": self.restarts,
+        }
+
+    def run(self):
+        # SIGTERM (p. ej. al detener el contenedor) drena igual que Ctrl+C
+        signal.signal(signal.SIGTERM, signal.default_int_handler)
+        for instance in range(self.n_workers):
+            self._spawn(instance)
+
+        try:
+            last_status = monotonic()
+            while True:
+                sleep(1)
+                for instance in self._workers:
+                    self._check(instance)
+                if monotonic() - last_status >= 10:
+                    print(f"[SUPERVISOR] {self.stats()}")
+                    last_status = monotonic()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop()
@@ -0,0 +1,66 @@
+import json
+import struct
+
+import numpy as np
+import pytest
+
+from src.rabbitmq.connection import (
+    RESULT_BATCH_HEADER,
+    SCENARIO_BLOCK_CONTENT_TYPE,
+    SCENARIO_BLOCK_HEADER,
+    decode_scenario,
+    result_batch_message,
+)
+
+
+def test_result_batch_layout():
+    body = result_batch_message("host-1-0", "0123456789abcdef", [1.5, -2.0, np.inf])
+    magic, version, worker_len, function_len, count = RESULT_BATCH_HEADER.unpack_from(
+        body
+    )
+    assert (magic, version, count) == (b"MCRB", 1, 3)
+    offset = RESULT_BATCH_HEADER.size
+    assert body[offset : offset + worker_len] == b"host-1-0"
+    offset += worker_len
+    assert body[offset : offset + function_len] == b"0123456789abcdef"
+    offset += function_len
+    np.testing.assert_array_equal(
+        np.frombuffer(body, dtype="<f8", offset=offset), [1.5, -2.0, np.inf]
+    )
+
+
+def scenario_block(function_id: str, block: np.ndarray, magic=b"MCSB") -> bytes:
+    # mismo formato que publica el servidor
+    function = function_id.encode()
+    rows, columns = block.shape
+    header = SCENARIO_BLOCK_HEADER.pack(magic, 1, len(function), rows, columns)
+    return header + function + block.astype("<f8").tobytes()
+
+
+def test_decode_scenario_block():
+    block = np.arange(12, dtype=np.float64).reshape(4, 3)
+    message = decode_scenario(
+        SCENARIO_BLOCK_CONTENT_TYPE, scenario_block("0123456789abcdef", block)
+    )
+    assert message["type"] == "block"
+    assert message["function_id"] == "0123456789abcdef"
+    np.testing.assert_array_equal(message["scenarios"], block)
+
+
+def test_decode_json_scenario():
+    body = json.dumps({"function_id": "abc", "scenario": [1.0, 2.0]}).encode()
+    assert decode_scenario(None, body) == {"function_id": "abc", "scenario": [1.0, 2.0]}
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"MCSB",
+        scenario_block("abc", np.zeros((2, 2)))[:-1],
+        scenario_block("abc", np.zeros((2, 2))) + b"\0",
+        scenario_block("abc", np.zeros((2, 2)), magic=b"XXXX"),
+    ],
+)
+def test_malformed_blocks_raise_value_error(body):
+    with pytest.raises((ValueError, struct.error)):
+        decode_scenario(SCENARIO_BLOCK_CONTENT_TYPE, body)
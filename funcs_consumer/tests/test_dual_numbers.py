@@ -0,0 +1,85 @@
+import numpy as np
+import pytest
+
+from src.services.dual_numbers import Dual, dual_functions
+
+
+@pytest.fixture
+def xy():
+    # x e y como variables duales sobre 3 escenarios
+    scenarios = np.array([[0.5, 2.0], [1.5, 0.25], [3.0, 1.0]])
+    x, y = Dual.variables(scenarios)
+    return scenarios[:, 0], scenarios[:, 1], x, y
+
+
+def assert_dual(result, value, dx, dy):
+    np.testing.assert_allclose(result.value, value)
+    np.testing.assert_allclose(result.grad[:, 0], dx)
+    np.testing.assert_allclose(result.grad[:, 1], dy)
+
+
+def test_variables_seed_identity(xy):
+    a, b, x, y = xy
+    assert_dual(x, a, 1.0, 0.0)
+    assert_dual(y, b, 0.0, 1.0)
+
+
+def test_arithmetic(xy):
+    a, b, x, y = xy
+    assert_dual(x + y, a + b, 1.0, 1.0)
+    assert_dual(3 - x, 3 - a, -1.0, 0.0)
+    assert_dual(-y, -b, 0.0, -1.0)
+    assert_dual(x * y, a * b, b, a)
+    assert_dual(2.0 * x, 2 * a, 2.0, 0.0)
+    assert_dual(x / y, a / b, 1 / b, -a / b**2)
+    assert_dual(1 / x, 1 / a, -1 / a**2, 0.0)
+
+
+def test_powers(xy):
+    a, b, x, y = xy
+    assert_dual(x**3, a**3, 3 * a**2, 0.0)
+    assert_dual(2**y, 2**b, 0.0, 2**b * np.log(2))
+    assert_dual(x**y, a**b, b * a ** (b - 1), a**b * np.log(a))
+
+
+def test_mod(xy):
+    a, b, x, y = xy
+    assert_dual(x % y, a % b, 1.0, -np.floor(a / b))
+    assert_dual(5 % x, 5 % a, -np.floor(5 / a), 0.0)
+
+
+def test_ndarray_delegates_to_dual(xy):
+    a, b, x, y = xy
+    result = np.array([1.0, 2.0, 3.0]) * x
+    assert isinstance(result, Dual)
+    assert_dual(result, a * [1, 2, 3], [1, 2, 3], 0.0)
+
+
+def test_unary_functions(xy):
+    a, b, x, y = xy
+    assert_dual(dual_functions["exp"](x), np.exp(a), np.exp(a), 0.0)
+    assert_dual(dual_functions["log"](y), np.log(b), 0.0, 1 / b)
+    assert_dual(dual_functions["sqrt"](x), np.sqrt(a), 0.5 / np.sqrt(a), 0.0)
+    assert_dual(
+        dual_functions["sin"](x * y),
+        np.sin(a * b),
+        np.cos(a * b) * b,
+        np.cos(a * b) * a,
+    )
+    assert_dual(dual_functions["abs"](-x), a, 1.0, 0.0)
+    # sin duales se comportan como las de numpy
+    np.testing.assert_allclose(dual_functions["cos"](a), np.cos(a))
+
+
+def test_min_max_pick_gradient(xy):
+    a, b, x, y = xy
+    picked = a <= b
+    assert_dual(
+        dual_functions["min"](x, y),
+        np.minimum(a, b),
+        picked.astype(float),
+        (~picked).astype(float),
+    )
+    # con una constante el gradiente es 0 donde gana la constante
+    assert_dual(dual_functions["max"](x, 1.0), np.maximum(a, 1.0), a >= 1.0, 0.0)
+    np.testing.assert_allclose(dual_functions["max"](a, b, 1.0), [2.0, 1.5, 3.0])
@@ -0,0 +1,58 @@
+import numpy as np
+import pytest
+
+from src.services import evaluation_budget
+from src.services.evaluation_budget import EvaluationBudget
+from src.services.function_compiler import FunctionCompiler
+from src.services.function_executer import BATCH_CHUNK_SIZE, FunctionExecuter
+
+
+@pytest.mark.parametrize("function_str", ["f(x)=2^x", "f(x)=x^x^x", "f(x)=x^(x-1)"])
+@pytest.mark.parametrize("x, accepted", [(3.0, True), (3000.0, False)])
+def test_scalar_and_batch_give_same_verdict(function_str, x, accepted):
+    # el limite del exponente vale igual por escenario y por lote
+    function = FunctionCompiler().get(function_str)
+    scalar = FunctionExecuter.execute(function, [x])
+    batch = FunctionExecuter.execute_batch(function, np.array([[1.0], [x]]))
+    gradient = FunctionExecuter.execute_gradient(function, np.array([[x]]))
+
+    assert (scalar is not None) == accepted
+    assert (batch is not None) == accepted
+    assert (gradient is not None) == accepted
+    if accepted:
+        assert batch[1] == pytest.approx(scalar)
+        assert gradient[0][0] == pytest.approx(scalar)
+
+
+def test_node_limit():
+    compiler = FunctionCompiler(budget=EvaluationBudget(max_nodes=10))
+    assert compiler.get("f(x)=x+1") is not None
+    assert compiler.get("f(x)=x+x+x+x+x+x") is None
+
+
+def test_integer_results_are_bounded_without_float_promotion():
+    budget = EvaluationBudget(force_float=False, max_int_bits=64)
+    function = FunctionCompiler(budget=budget).get("f(x)=x^x")
+    assert FunctionExecuter.execute(function, [10]) == 10**10
+    assert FunctionExecuter.execute(function, [100]) is None
+
+
+def fake_clock(step: float):
+    # reloj que avanza `step` segundos en cada lectura
+    return iter(np.arange(0.0, 1000.0, step)).__next__
+
+
+def test_deadline_is_per_chunk(monkeypatch):
+    # cada bloque tarda 0.2s: el lote entero supera max_seconds pero ningun
+    # bloque lo hace
+    monkeypatch.setattr(evaluation_budget, "monotonic", fake_clock(0.2))
+    budget = EvaluationBudget(max_seconds=0.5)
+    function = FunctionCompiler(budget=budget).get("f(x)=x+1")
+    scenarios = np.zeros((5 * BATCH_CHUNK_SIZE, 1))
+
+    result = FunctionExecuter.execute_batch(function, scenarios)
+    assert result is not None and (result == 1.0).all()
+
+    # un bloque que si supera el limite se rechaza
+    monkeypatch.setattr(evaluation_budget, "monotonic", fake_clock(0.6))
+    assert FunctionExecuter.execute_batch(function, scenarios) is None
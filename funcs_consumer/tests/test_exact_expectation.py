@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from src.services.exact_expectation import MAX_GRID_SIZE, ExactExpectation
+from src.services.function_compiler import FunctionCompiler
+
+
+def expectation(function_str: str, distribution: str, params: dict):
+    function = FunctionCompiler().get(function_str)
+    return ExactExpectation.compute(function, distribution, params)
+
+
+@pytest.mark.parametrize(
+    "distribution, params, mean, variance",
+    [
+        ("binomial", {"n": 10, "p": 0.3}, 3.0, 2.1),
+        ("binomial", {"n": 100000, "p": 0.5}, 50000.0, 25000.0),
+        ("poisson", {"lam": 4.0}, 4.0, 4.0),
+        ("poisson", {"lam": 1e6}, 1e6, 1e6),
+        ("geometric", {"p": 0.25}, 4.0, 12.0),
+    ],
+)
+def test_moments_of_identity(distribution, params, mean, variance):
+    result = expectation("f(x)=x", distribution, params)
+    assert result["mean"] == pytest.approx(mean, rel=1e-9)
+    assert result["variance"] == pytest.approx(variance, rel=1e-6)
+    # lgamma de valores ~1e6 deja un error relativo ~1e-9 en la masa total
+    assert result["truncated_mass"] < 1e-8
+
+
+def test_joint_grid_of_iid_variables():
+    # E[x*y] = E[x]^2 y E[x^2] = var + media^2 para variables iid
+    result = expectation("f(x,y)=x*y + y^2", "poisson", {"lam": 3.0})
+    assert result["mean"] == pytest.approx(9.0 + 12.0, rel=1e-9)
+
+
+def test_degenerate_supports():
+    assert expectation("f(x)=x", "binomial", {"n": 7, "p": 1.0})["mean"] == 7.0
+    assert expectation("f(x)=x+1", "poisson", {"lam": 0})["mean"] == 1.0
+    assert expectation("f(x)=x", "geometric", {"p": 1.0})["mean"] == 1.0
+
+
+@pytest.mark.parametrize(
+    "distribution, params",
+    [
+        ("binomial", {"n": 10}),
+        ("binomial", {"n": 2.5, "p": 0.5}),
+        ("binomial", {"n": 10, "p": 1.5}),
+        ("poisson", {"lam": -1}),
+        ("poisson", {"lam": float("inf")}),
+        ("geometric", {"p": 0}),
+        ("geometric", {"p": True}),
+        ("normal", {"loc": 0, "scale": 1}),
+    ],
+)
+def test_invalid_params(distribution, params):
+    assert ExactExpectation.support(distribution, params) is None
+
+
+def test_grid_size_is_checked_before_building():
+    assert ExactExpectation.support("binomial", {"n": MAX_GRID_SIZE, "p": 0.5}) is None
+    # el soporte entra pero la malla conjunta de 3 variables no
+    assert expectation("f(x,y,z)=x+y+z", "binomial", {"n": 2000, "p": 0.5}) is None
+
+
+def test_support_is_a_distribution():
+    values, pmf = ExactExpectation.support("binomial", {"n": 2000, "p": 0.01})
+    assert np.all(pmf >= 0.0)
+    assert pmf.sum() == pytest.approx(1.0, abs=1e-11)
+    assert values[0] >= 0 and values[-1] <= 2000
@@ -0,0 +1,72 @@
+import os
+import stat
+
+import pytest
+
+from src.services.evaluation_budget import EvaluationBudget
+from src.services.function_catalog import FunctionCatalog
+from src.services.function_compiler import FunctionCompiler
+
+FUNCTION = "f(x,y)=x^2 + y"
+
+
+@pytest.fixture
+def path(tmp_path):
+    # directorio todavia inexistente: lo crea el catalogo
+    return str(tmp_path / "catalog" / "functions.bin")
+
+
+def warm_compiler(path: str, budget: EvaluationBudget | None = None):
+    budget = budget or EvaluationBudget()
+    return FunctionCompiler(budget=budget, catalog=FunctionCatalog(path, budget))
+
+
+def mode(path: str) -> int:
+    return stat.S_IMODE(os.stat(path).st_mode)
+
+
+def test_round_trip(path):
+    compiled = warm_compiler(path).get(FUNCTION)
+    assert warm_compiler(path).get("f(x)=y") is None
+
+    compiler = warm_compiler(path)
+    loaded = compiler.get(FUNCTION)
+    assert loaded(3.0, 1.0) == compiled(3.0, 1.0) == 10.0
+    assert compiler.catalog.stats()["hits"] == 1
+    # las rechazadas tambien quedan registradas
+    assert compiler.catalog.load("f(x)=y", compiler.budget, 16) == (True, None)
+
+
+def test_files_are_private(path):
+    warm_compiler(path).get(FUNCTION)
+    assert mode(path) == 0o600
+    assert mode(os.path.dirname(path)) == 0o700
+
+
+def test_other_budget_ignores_catalog(path):
+    warm_compiler(path).get(FUNCTION)
+    compiler = warm_compiler(path, EvaluationBudget(max_nodes=64))
+    assert compiler.get(FUNCTION) is not None
+    assert compiler.catalog.stats()["hits"] == 0
+
+
+@pytest.mark.parametrize(
+    "target, permissions", [("file", 0o644), ("file", 0o620), ("dir", 0o777)]
+)
+def test_refuses_shared_catalog(path, target, permissions):
+    warm_compiler(path).get(FUNCTION)
+    os.chmod(path if target == "file" else os.path.dirname(path), permissions)
+
+    catalog = FunctionCatalog(path, EvaluationBudget())
+    assert catalog.load(FUNCTION, EvaluationBudget(), 16) == (False, None)
+
+
+@pytest.mark.skipif(
+    not hasattr(os, "geteuid") or os.geteuid() != 0, reason="requiere chown"
+)
+def test_refuses_catalog_of_other_user(path):
+    warm_compiler(path).get(FUNCTION)
+    os.chown(path, 65534, 65534)
+
+    catalog = FunctionCatalog(path, EvaluationBudget())
+    assert catalog.load(FUNCTION, EvaluationBudget(), 16) == (False, None)
@@ -0,0 +1,48 @@
+import pytest
+
+from src.services.function_compiler import FunctionCompiler
+from src.services.function_executer import FunctionExecuter
+
+
+def test_compiles_once_and_caches():
+    compiler = FunctionCompiler(max_size=2)
+    function = compiler.get("f(x,y)=x*y + 1")
+    assert function(2.0, 3.0) == 7.0
+    assert compiler.get("f(x,y)=x*y + 1") is function
+    assert (compiler.hits, compiler.misses) == (1, 1)
+
+
+def test_invalid_functions_are_cached_as_none():
+    compiler = FunctionCompiler()
+    assert compiler.get("f(x)=y") is None
+    assert compiler.get("f(x)=y") is None
+    assert (compiler.hits, compiler.misses) == (1, 1)
+
+
+@pytest.mark.parametrize(
+    "function_str",
+    [
+        "f(x)='a'",
+        "f(x)=True",
+        "f(x)=None",
+        "f(x)=1j*x",
+        "f(x)=x.real",
+        "f(x)=__import__('os')",
+        "f(x,x)=x",
+        "f(lambda)=1",
+    ],
+)
+def test_rejects_outside_whitelist(function_str):
+    assert FunctionCompiler().get(function_str) is None
+
+
+def test_execute_rejects_complex_results():
+    # en Python (-4)^0.5 es complejo: no es un resultado
+    function = FunctionCompiler().get("f(x)=(-x)^0.5")
+    assert FunctionExecuter.execute(function, [4.0]) is None
+    assert FunctionExecuter.execute(function, [-4.0]) == 2.0
+
+
+def test_execute_checks_scenario_size():
+    function = FunctionCompiler().get("f(x,y)=x+y")
+    assert FunctionExecuter.execute(function, [1.0]) is None
@@ -0,0 +1,127 @@
+import ast
+
+import numpy as np
+import pytest
+
+from src.services import math_functions
+from src.services.function_compiler import CompiledFunction
+from src.services.function_executer import FunctionExecuter
+from src.services.safe_ast import parse_expression
+from src.services.str_function_parser import StrFunctionParser
+
+# polinomio denso de grado 20: se reescribe con Horner
+DENSE_POLYNOMIAL = "f(x)=" + " + ".join(f"{k}*x^{k}" for k in range(1, 21))
+
+
+def _constant_binop(tree) -> bool:
+    return any(
+        isinstance(node, ast.BinOp)
+        and isinstance(node.left, ast.Constant)
+        and isinstance(node.right, ast.Constant)
+        for node in ast.walk(tree)
+    )
+
+
+def _has(node_type):
+    return lambda tree: any(isinstance(node, node_type) for node in ast.walk(tree))
+
+
+def _has_pow(tree) -> bool:
+    return any(
+        isinstance(node, ast.BinOp) and isinstance(node.op, ast.Pow)
+        for node in ast.walk(tree)
+    )
+
+
+# (funcion, reescritura esperada en el arbol optimizado)
+CASES = [
+    # plegado de constantes
+    ("f(x)=2*3+x*(4-1)", lambda tree: not _constant_binop(tree)),
+    ("f(x,y)=x + 2^10 - sqrt(16)*y", lambda tree: not _constant_binop(tree)),
+    # Horner
+    ("f(x)=3*x^3 - 2*x^2 + x - 7", lambda tree: not _has_pow(tree)),
+    (DENSE_POLYNOMIAL, lambda tree: not _has_pow(tree)),
+    # cadenas de productos para potencias enteras chicas
+    ("f(x,y)=x^5*y^3", lambda tree: not _has_pow(tree)),
+    ("f(x)=(x+1)^3 - x", lambda tree: not _has_pow(tree)),
+    # subexpresiones comunes con walrus
+    ("f(x,y)=sin(x*y) + cos(x*y)*(x*y)", _has(ast.NamedExpr)),
+    ("f(x,y)=exp(x+y)/(1+exp(x+y))", _has(ast.NamedExpr)),
+    # sin reescritura: solo tiene que dar lo mismo
+    ("f(x,y)=max(x,y) - min(x,2) + abs(y)%3", lambda tree: True),
+]
+
+
+def compile_function(function_str: str) -> CompiledFunction:
+    parsed = StrFunctionParser.parse_function({"function": function_str})
+    return CompiledFunction(function_str, parsed)
+
+
+def reference(compiled: CompiledFunction, kind: str, *values):
+    # la expresion original, sin optimizar ni presupuesto, evaluada por Python
+    tree = parse_expression(compiled.expression, compiled.vars)
+    index = 0 if kind == "scalar" else 1
+    functions = {
+        name: implementations[index]
+        for name, implementations in math_functions.math_functions.items()
+    }
+    return eval(
+        compile(tree, "<referencia>", "eval"),
+        {"__builtins__": {}, **functions},
+        dict(zip(compiled.vars, values)),
+    )
+
+
+def scenarios(compiled: CompiledFunction, n: int = 64) -> np.ndarray:
+    # valores positivos y lejos de 0: log, sqrt y las divisiones estan definidas
+    rng = np.random.default_rng(7)
+    return rng.uniform(0.5, 1.5, size=(n, len(compiled.vars)))
+
+
+@pytest.mark.parametrize("function_str, rewritten", CASES)
+def test_optimizer_rewrites(function_str, rewritten):
+    compiled = compile_function(function_str)
+    assert rewritten(compiled.optimized_tree)
+
+
+@pytest.mark.parametrize("function_str", [case[0] for case in CASES])
+def test_scalar_matches_reference(function_str):
+    compiled = compile_function(function_str)
+    for row in scenarios(compiled, 16).tolist():
+        assert compiled.call(*row) == pytest.approx(
+            reference(compiled, "scalar", *row), rel=1e-9
+        )
+
+
+@pytest.mark.parametrize("function_str", [case[0] for case in CASES])
+def test_vector_matches_reference(function_str):
+    compiled = compile_function(function_str)
+    matrix = scenarios(compiled)
+    expected = np.broadcast_to(
+        reference(compiled, "vector", *matrix.T), matrix.shape[0]
+    )
+    np.testing.assert_allclose(
+        FunctionExecuter.execute_batch(compiled, matrix), expected, rtol=1e-9
+    )
+
+
+@pytest.mark.parametrize("function_str", [case[0] for case in CASES])
+def test_dual_matches_finite_differences(function_str):
+    compiled = compile_function(function_str)
+    matrix = scenarios(compiled)
+    values, gradients = FunctionExecuter.execute_gradient(compiled, matrix)
+
+    np.testing.assert_allclose(
+        values, reference(compiled, "vector", *matrix.T), rtol=1e-9
+    )
+    # diferencias centrales sobre la expresion original
+    h = 1e-6
+    for j in range(matrix.shape[1]):
+        step = np.zeros(matrix.shape[1])
+        step[j] = h
+        expected = (
+            reference(compiled, "vector", *(matrix + step).T)
+            - reference(compiled, "vector", *(matrix - step).T)
+        ) / (2 * h)
+        np.testing.assert_allclose(gradients[:, j], expected, rtol=1e-5, atol=1e-6)
+
@@ -0,0 +1,69 @@
+import numpy as np
+
+from src.services.function_compiler import FunctionCompiler
+from src.services.function_executer import FunctionExecuter
+from src.services.result_memo import ResultMemo, is_integer_scenario
+
+
+def test_is_integer_scenario():
+    assert is_integer_scenario([1, 2.0, -3])
+    assert not is_integer_scenario([1, 2.5])
+    assert not is_integer_scenario([True])
+    assert not is_integer_scenario([float("inf")])
+
+
+def test_lru_eviction():
+    memo = ResultMemo(max_size=2)
+    memo.put((1.0,), 1.0)
+    memo.put((2.0,), 2.0)
+    assert memo.get((1.0,)) == 1.0
+    memo.put((3.0,), 3.0)
+    # (2,) era el menos usado
+    assert memo.get((2.0,)) is None
+    assert memo.stats()["evictions"] == 1
+
+
+def test_scalar_execute_uses_memo():
+    function = FunctionCompiler().get("f(x,y)=x^2 + y")
+    assert FunctionExecuter.execute(function, [3, 1]) == 10.0
+    assert FunctionExecuter.execute(function, [3.0, 1.0]) == 10.0
+    assert function.memo.stats()["hits"] == 1
+    # los escenarios no enteros no pasan por el memo
+    FunctionExecuter.execute(function, [0.5, 1.0])
+    assert function.memo.stats()["size"] == 1
+
+
+def test_integer_batch_uses_memo():
+    function = FunctionCompiler().get("f(x,y)=x^3 - 2*x*y + y")
+    rng = np.random.default_rng(3)
+    matrix = rng.binomial(6, 0.4, size=(5000, 2)).astype(np.float64)
+
+    first = FunctionExecuter.execute_batch(function, matrix)
+    second = FunctionExecuter.execute_batch(function, matrix)
+
+    np.testing.assert_array_equal(first, function.vector_call(*matrix.T))
+    np.testing.assert_array_equal(second, first)
+    stats = function.memo.stats()
+    assert stats["size"] == len(np.unique(matrix, axis=0))
+    assert stats["hits"] == stats["size"]
+    # el escalar encuentra lo que guardo el lote
+    x, y = matrix[0]
+    assert FunctionExecuter.execute(function, [int(x), int(y)]) == first[0]
+
+
+def test_non_integer_batch_skips_memo():
+    function = FunctionCompiler().get("f(x)=x+1")
+    matrix = np.array([[0.5], [1.0], [0.5]])
+    np.testing.assert_array_equal(
+        FunctionExecuter.execute_batch(function, matrix), [1.5, 2.0, 1.5]
+    )
+    assert function.memo.stats()["size"] == 0
+
+
+def test_batch_memo_disabled():
+    function = FunctionCompiler(memo_size=0).get("f(x)=x+1")
+    matrix = np.array([[1.0], [1.0]])
+    np.testing.assert_array_equal(
+        FunctionExecuter.execute_batch(function, matrix), [2.0, 2.0]
+    )
+    assert function.memo.stats()["size"] == 0
@@ -0,0 +1,66 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.services.running_stats import RunningStats
+
+
+def assert_matches(stats: RunningStats, values: np.ndarray):
+    # mismos resultados que una sola pasada sobre todos los valores
+    assert stats.count == values.size
+    assert stats.mean == pytest.approx(values.mean(), rel=1e-12)
+    assert stats.m2 == pytest.approx(values.var() * values.size, rel=1e-9)
+    assert stats.min == values.min()
+    assert stats.max == values.max()
+
+
+@pytest.fixture
+def values():
+    rng = np.random.default_rng(11)
+    # lotes de tamaños y escalas distintas: la combinacion no pierde precision
+    return [
+        rng.normal(0.0, 1.0, 1000),
+        rng.normal(1e6, 3.0, 17),
+        np.array([]),
+        rng.exponential(5.0, 1),
+        rng.uniform(-50.0, 50.0, 4096),
+    ]
+
+
+def test_empty_stats():
+    stats = RunningStats()
+    assert stats.to_dict() == {
+        "count": 0,
+        "mean": 0.0,
+        "m2": 0.0,
+        "min": math.inf,
+        "max": -math.inf,
+    }
+
+
+def test_chunked_add_matches_single_pass(values):
+    stats = RunningStats()
+    for chunk in values:
+        stats.add(chunk)
+    assert_matches(stats, np.concatenate(values))
+
+
+def test_merged_partials_match_single_pass(values):
+    # dos consumidores con parciales propios, combinados como en el monitor
+    left, right = RunningStats(), RunningStats()
+    for chunk in values[:2]:
+        left.add(chunk)
+    for chunk in values[2:]:
+        right.add(chunk)
+
+    left.merge(*right.to_dict().values())
+    assert_matches(left, np.concatenate(values))
+
+
+def test_merge_into_empty(values):
+    partial = RunningStats()
+    partial.add(values[0])
+    merged = RunningStats()
+    merged.merge(*partial.to_dict().values())
+    assert merged.to_dict() == partial.to_dict()
@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from src.services.scenario_recipe import ScenarioRecipe, message_matrix
+
+
+def recipe(**overrides) -> dict:
+    return {
+        "type": "recipe",
+        "function_id": "0123456789abcdef",
+        "distribution": "normal",
+        "params": {"loc": 1.0, "scale": 2.0},
+        "seed": {"entropy": 12345, "spawn_key": [3]},
+        "count": 1000,
+        **overrides,
+    }
+
+
+def test_same_recipe_same_scenarios():
+    first = ScenarioRecipe.generate(recipe(), 2)
+    second = ScenarioRecipe.generate(recipe(), 2)
+    assert first.shape == (1000, 2) and first.dtype == np.float64
+    np.testing.assert_array_equal(first, second)
+
+
+def test_matches_generator_of_the_seed():
+    # el servidor puede reproducir el bloque con la misma SeedSequence
+    seed = np.random.SeedSequence(entropy=12345, spawn_key=(3,))
+    expected = np.random.Generator(np.random.PCG64(seed)).normal(
+        size=(1000, 2), loc=1.0, scale=2.0
+    )
+    np.testing.assert_array_equal(ScenarioRecipe.generate(recipe(), 2), expected)
+
+
+def test_spawn_keys_give_independent_blocks():
+    first = ScenarioRecipe.generate(recipe(), 1)
+    other = ScenarioRecipe.generate(
+        recipe(seed={"entropy": 12345, "spawn_key": [4]}), 1
+    )
+    assert not np.array_equal(first, other)
+
+
+def test_discrete_recipe():
+    matrix = ScenarioRecipe.generate(
+        recipe(distribution="binomial", params={"n": 10, "p": 0.5}), 3
+    )
+    assert matrix.dtype == np.float64
+    assert np.all((matrix >= 0) & (matrix <= 10) & (matrix == np.floor(matrix)))
+
+
+@pytest.mark.parametrize(
+    "overrides",
+    [
+        {"distribution": "cauchy"},
+        {"params": {"loc": 0.0, "sigma": 1.0}},
+        {"count": 0},
+        {"count": 10**9},
+        {"count": 10.0},
+        {"seed": None},
+        {"seed": {"entropy": "abc"}},
+    ],
+)
+def test_invalid_recipes(overrides):
+    with pytest.raises(ValueError):
+        ScenarioRecipe.generate(recipe(**overrides), 1)
+
+
+def test_message_matrix_checks_block_shape():
+    block = np.zeros((4, 2))
+    assert message_matrix({"type": "block", "scenarios": block}, 2) is block
+    with pytest.raises(ValueError):
+        message_matrix({"type": "block", "scenarios": block}, 3)
@@ -11,7 +11,12 @@ from dotenv import load_dotenv
 from src.protos import function_service_pb2_grpc
 from src.rabbitmq.connection import Connection
 from src.services.function_servicer import FunctionServicer
-from src.services.functions_in_file import FileFunctionReader
+from src.services.functions_in_file import (
+    FileFunctionReader,
+    function_id,
+    function_variables,
+)
+from src.services.qmc_sampler import QMC_ENGINES
 from src.services.scenario_generator import ScenarioGenerator
 
 # Paleta de colores
@@ -54,8 +59,18 @@ class Dashboard(ctk.CTk):
         self.scenario_interval = 1
         self.current_function = ". . ."
         self.current_distribution = ". . ."
+        self.current_mode = ""
         self.current_scenario = []
         self.current_sample_size = 1
+        # escenarios por receta; con 0 se publica un escenario por mensaje
+        self.recipe_size = int(os.getenv("RECIPE_SIZE", 0))
+        self.current_recipe = None
+        # escenarios por bloque binario (n_escenarios, n_vars); con 0 se
+        # publica un escenario por mensaje
+        self.block_size = int(os.getenv("BLOCK_SIZE", 0))
+        # puntos por aleatorizacion de las lineas sobol/halton
+        self.qmc_replicate_size = int(os.getenv("QMC_REPLICATE_SIZE", 1024))
+        self.current_block = None
         self.publishing_thread = None
 
         self.grid_columnconfigure(0, weight=1)
@@ -369,7 +384,16 @@ class Dashboard(ctk.CTk):
                 self.preview_textbox.configure(state="disabled")
 
                 distributions = list(set(self.function_reader.stored_func_scenarios))
-                self.scenario_generator = ScenarioGenerator(distributions)
+                seed = os.getenv("SCENARIO_SEED")
+                self.scenario_generator = ScenarioGenerator(
+                    distributions,
+                    int(seed) if seed else None,
+                    replicate_size=self.qmc_replicate_size,
+                )
+                print(
+                    "Semilla de escenarios: "
+                    f"{self.scenario_generator.seed_sequence.entropy}"
+                )
 
             except Exception:
                 self.show_error_dialog(
@@ -378,14 +402,7 @@ class Dashboard(ctk.CTk):
                 )
 
     def parse_function_variables(self, function_str: str) -> int:
-        import re
-
-        match = re.search(r"f\((.*?)\)", function_str)
-        if match:
-            vars_str = match.group(1)
-            variables = [v.strip() for v in vars_str.split(",") if v.strip()]
-            return len(variables)
-        return 1
+        return function_variables(function_str)
 
     def start_grpc_server(self):
         # si ya hay un server corriendo, no hacemos nada
@@ -496,10 +513,23 @@ class Dashboard(ctk.CTk):
                 try:
                     function = self.function_reader.read_function()
                     distribution = self.function_reader.read_scenario()
+                    mode = self.function_reader.read_mode()
 
                     if function:
+                        message = {
+                            "id": function_id(function),
+                            "function": function,
+                            "distribution": distribution,
+                        }
+                        if mode == "exact":
+                            # los consumidores calculan el valor esperado exacto
+                            # a partir de la distribucion; no se envian escenarios
+                            message["params"] = ScenarioGenerator.defaults.get(
+                                distribution, {}
+                            )
+                            message["mode"] = mode
                         try:
-                            self.rabbitmq_connection.public_function(function)
+                            self.rabbitmq_connection.public_function(message)
                         except Exception:
                             self.is_running = False
                             self.after(
@@ -526,6 +556,7 @@ class Dashboard(ctk.CTk):
                         # actualizamos variables de UI
                         self.current_function = function
                         self.current_distribution = distribution
+                        self.current_mode = mode
                         self.current_sample_size = num_variables
                         self.after(0, self.update_function_display)
 
@@ -550,19 +581,58 @@ class Dashboard(ctk.CTk):
             if (
                 self.scenario_interval > 0
                 and self.current_distribution != ". . ."
+                and self.current_mode != "exact"
                 and current_time - last_scenario_time >= self.scenario_interval
             ):
                 try:
-                    scenario = self.scenario_generator.get_scenario(
-                        self.current_sample_size, self.current_distribution
-                    )
-
-                    if scenario and function:
-                        self.current_scenario = scenario
+                    # las recetas se generan con PCG64 en el consumidor: las
+                    # lineas sobol/halton se publican como bloques del mismo
+                    # tamano
+                    qmc_line = self.current_mode in QMC_ENGINES
+                    use_recipe = self.recipe_size > 0 and not qmc_line
+                    block_size = self.block_size
+                    if qmc_line and not block_size:
+                        block_size = self.recipe_size
+                    if use_recipe:
+                        scenario = self.scenario_generator.get_recipe(
+                            self.recipe_size, self.current_distribution
+                        )
+                    elif block_size > 0:
+                        scenario = self.scenario_generator.get_block(
+                            block_size,
+                            self.current_sample_size,
+                            self.current_distribution,
+                            self.current_mode,
+                        )
+                    else:
+                        scenario = self.scenario_generator.get_scenario(
+                            self.current_sample_size,
+                            self.current_distribution,
+                            self.current_mode,
+                        )
+                    # un bloque es un arreglo de numpy: no se evalua como bool
+                    generated = scenario is not None and len(scenario) > 0
 
+                    if generated and function:
                         try:
-                            self.rabbitmq_connection.public_scenario(scenario)
-                            self.after(0, self.update_scenario_display)
+                            if use_recipe:
+                                self.current_recipe = scenario
+                                self.rabbitmq_connection.public_recipe(
+                                    scenario, function_id(function)
+                                )
+                                self.after(0, self.update_recipe_display)
+                            elif block_size > 0:
+                                self.current_block = scenario
+                                self.rabbitmq_connection.public_block(
+                                    scenario, function_id(function)
+                                )
+                                self.after(0, self.update_block_display)
+                            else:
+                                self.current_scenario = scenario
+                                self.rabbitmq_connection.public_scenario(
+                                    scenario, function_id(function)
+                                )
+                                self.after(0, self.update_scenario_display)
                         except Exception:
                             self.is_running = False
                             self.after(
@@ -582,7 +652,7 @@ class Dashboard(ctk.CTk):
                                 ),
                             )
                             return
-                    elif not scenario:
+                    elif not generated:
                         error_msg = f"No se pudo generar escenario.\n\nDistribucion '{
                             self.current_distribution
                         }' no reconocida."
@@ -614,7 +684,24 @@ class Dashboard(ctk.CTk):
 
     def update_function_display(self):
         self.function_label.configure(text=self.current_function)
-        self.distribution_label.configure(text=self.current_distribution)
+        if self.current_mode == "exact":
+            self.distribution_label.configure(
+                text=f"{self.current_distribution} (exacto)"
+            )
+            self.scenario_textbox.configure(
+                state="normal", text_color=COLORS["text_muted"]
+            )
+            self.scenario_textbox.delete("0.0", "end")
+            self.scenario_textbox.insert(
+                "0.0", "Modo exacto: los consumidores enumeran el soporte"
+            )
+            self.scenario_textbox.configure(state="disabled")
+        elif self.current_mode in QMC_ENGINES:
+            self.distribution_label.configure(
+                text=f"{self.current_distribution} ({self.current_mode})"
+            )
+        else:
+            self.distribution_label.configure(text=self.current_distribution)
 
     def update_scenario_display(self):
         if self.current_scenario:
@@ -630,6 +717,43 @@ class Dashboard(ctk.CTk):
             self.scenario_textbox.insert("0.0", scenario_text)
             self.scenario_textbox.configure(state="disabled")
 
+    def update_recipe_display(self):
+        if self.current_recipe:
+            recipe = self.current_recipe
+            recipe_text = (
+                f"Receta: {recipe['count']} escenarios {recipe['distribution']}"
+                f"\n\nParametros: {recipe['params']}"
+                f"\nSemilla: {recipe['seed']['entropy']}"
+                f"\nspawn_key: {recipe['seed']['spawn_key']}"
+            )
+
+            self.scenario_textbox.configure(
+                state="normal", text_color=COLORS["text_muted"]
+            )
+            self.scenario_textbox.delete("0.0", "end")
+            self.scenario_textbox.insert("0.0", recipe_text)
+            self.scenario_textbox.configure(state="disabled")
+
+    def update_block_display(self):
+        if self.current_block is not None:
+            block = self.current_block
+            rows = "\n".join(
+                str([round(x, 2) for x in row]) for row in block[:5].tolist()
+            )
+            block_text = (
+                f"Bloque: {block.shape[0]} escenarios x {block.shape[1]} variables"
+                f"\n\n{rows}"
+            )
+            if block.shape[0] > 5:
+                block_text += "\n..."
+
+            self.scenario_textbox.configure(
+                state="normal", text_color=COLORS["text_muted"]
+            )
+            self.scenario_textbox.delete("0.0", "end")
+            self.scenario_textbox.insert("0.0", block_text)
+            self.scenario_textbox.configure(state="disabled")
+
     def update_scenario_error_display(self, error_message):
         self.scenario_textbox.configure(state="normal", text_color=COLORS["accent_red"])
         self.scenario_textbox.delete("0.0", "end")
@@ -0,0 +1,57 @@
+import argparse
+import os
+
+from src.services.functions_in_file import (
+    FileFunctionReader,
+    function_id,
+    function_variables,
+)
+from src.services.scenario_generator import ScenarioGenerator
+
+# exporta los escenarios de cada funcion del archivo a
+# <directorio>/<function_id>.npy, la entrada del modo offline del consumidor
+#
+#   python -m src.export_scenarios fns.txt escenarios/ --count 100000000
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Exporta matrices de escenarios .npy por funcion"
+    )
+    parser.add_argument("functions", help="archivo de funciones (formato fns.txt)")
+    parser.add_argument("output", help="directorio de salida")
+    parser.add_argument("--count", type=int, required=True, help="escenarios")
+    parser.add_argument("--chunk-size", type=int, default=1_000_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    reader = FileFunctionReader()
+    reader.load_functions(args.functions)
+    generator = ScenarioGenerator(list(set(reader.stored_func_scenarios)), args.seed)
+    print(f"Semilla de escenarios: {generator.seed_sequence.entropy}")
+    os.makedirs(args.output, exist_ok=True)
+
+    for function, distribution, mode in zip(
+        reader.stored_functions, reader.stored_func_scenarios, reader.stored_func_modes
+    ):
+        if mode == "exact":
+            continue
+        path = os.path.join(args.output, f"{function_id(function)}.npy")
+        n_vars = function_variables(function)
+        if generator.export_matrix(
+            path,
+            distribution,
+            args.count,
+            n_vars,
+            args.chunk_size,
+            args.workers,
+            sampling=mode,
+        ):
+            print(f"{function} ({distribution}): {args.count}x{n_vars} -> {path}")
+        else:
+            print(f"Distribucion '{distribution}' no reconocida: {function}")
+
+
+if __name__ == "__main__":
+    main()
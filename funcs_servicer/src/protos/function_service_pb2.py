@@ -25,7 +25,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import empty_pb2 as google_dot_protobuf_dot_empty__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16\x66unction_service.proto\x1a\x1bgoogle/protobuf/empty.proto\"(\n\x14GetFuncModelResponse\x12\x10\n\x08\x66unction\x18\x01 \x01(\t2R\n\x0f\x46unctionService\x12?\n\x0cGetFuncModel\x12\x16.google.protobuf.Empty\x1a\x15.GetFuncModelResponse\"\x00\x62\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x16\x66unction_service.proto\x1a\x1bgoogle/protobuf/empty.proto\"4\n\x14GetFuncModelResponse\x12\x10\n\x08\x66unction\x18\x01 \x01(\t\x12\n\n\x02id\x18\x02 \x01(\t\" \n\x12GetFunctionRequest\x12\n\n\x02id\x18\x01 \x01(\t2\x8f\x01\n\x0f\x46unctionService\x12?\n\x0cGetFuncModel\x12\x16.google.protobuf.Empty\x1a\x15.GetFuncModelResponse\"\x00\x12;\n\x0bGetFunction\x12\x13.GetFunctionRequest\x1a\x15.GetFuncModelResponse\"\x00\x62\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -33,7 +33,9 @@ _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'function_service_pb2', _glo
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_GETFUNCMODELRESPONSE']._serialized_start=55
-  _globals['_GETFUNCMODELRESPONSE']._serialized_end=95
-  _globals['_FUNCTIONSERVICE']._serialized_start=97
-  _globals['_FUNCTIONSERVICE']._serialized_end=179
+  _globals['_GETFUNCMODELRESPONSE']._serialized_end=107
+  _globals['_GETFUNCTIONREQUEST']._serialized_start=109
+  _globals['_GETFUNCTIONREQUEST']._serialized_end=141
+  _globals['_FUNCTIONSERVICE']._serialized_start=144
+  _globals['_FUNCTIONSERVICE']._serialized_end=287
 # @@protoc_insertion_point(module_scope)
@@ -2,6 +2,30 @@ from dotenv import load_dotenv
 import os
 import pika
 import json
+import struct
+
+import numpy as np
+from funcs_shared.confirmed_publisher import ConfirmedPublisher
+
+
+# bloque de escenarios en binario: cabecera fija, function_id en utf-8 y la
+# matriz (filas, columnas) como float64 little-endian. El content_type le
+# indica al consumidor que no es JSON
+SCENARIO_BLOCK_CONTENT_TYPE = "application/x-montecarlo-scenario-block"
+SCENARIO_BLOCK_VERSION = 1
+# magia, version, largo de function_id, filas, columnas
+SCENARIO_BLOCK_HEADER = struct.Struct("<4sBHII")
+
+
+def scenario_block_message(block: np.ndarray, function_id: str) -> bytes:
+    function = function_id.encode()
+    rows, columns = block.shape
+    header = SCENARIO_BLOCK_HEADER.pack(
+        b"MCSB", SCENARIO_BLOCK_VERSION, len(function), rows, columns
+    )
+    return b"".join(
+        (header, function, np.ascontiguousarray(block, dtype="<f8").tobytes())
+    )
 
 
 class Connection:
@@ -15,6 +39,15 @@ class Connection:
         )
         self.connection = pika.BlockingConnection(parameters=params)
         self.channel = self.connection.channel()
+        # escenarios y recetas con confirmaciones del broker sin esperar cada
+        # una (PUBLISH_CONFIRMS=0 vuelve a publicar sin confirmar)
+        self.publisher = None
+        if os.getenv("PUBLISH_CONFIRMS", "1").lower() in ("1", "true", "yes"):
+            self.publisher = ConfirmedPublisher(
+                params,
+                window=int(os.getenv("PUBLISH_CONFIRM_WINDOW", 256)),
+                max_retries=int(os.getenv("PUBLISH_MAX_RETRIES", 3)),
+            ).start()
         # cola de escenarios
         self.channel.queue_declare(queue="scenarios", durable=False)
         # exchange para publicar funciones (fanout)
@@ -22,7 +55,8 @@ class Connection:
             exchange="exchange.models", exchange_type="fanout", durable=True
         )
 
-    def public_function(self, function: str):
+    # function es el mensaje con id, texto de la funcion y distribucion
+    def public_function(self, function: dict):
         function_json = json.dumps(function)
         self.channel.basic_publish(  # todos los clientes con colas enlazadas recibiran el mensaje
             exchange="exchange.models",
@@ -30,17 +64,40 @@ class Connection:
             body=function_json,
         )
 
-        # eliminamos todos los escenarios al publicar una nueva func
-        self.channel.queue_purge(queue="scenarios")
+        # los escenarios ya no se purgan al cambiar de funcion: cada uno lleva
+        # el id de su funcion y se evalua con ella aunque llegue despues
 
-    def public_scenario(self, scenario: list[float]):
-        scenario_json = json.dumps(scenario)
+    def _public_scenario_message(
+        self, body: str | bytes, content_type: str | None = None
+    ):
+        properties = pika.BasicProperties(content_type=content_type, delivery_mode=1)
+        if self.publisher is not None:
+            # solo bloquea si la ventana de mensajes sin confirmar esta llena
+            self.publisher.publish("scenarios", body, properties)
+            return
         self.channel.basic_publish(
             exchange="",
             routing_key="scenarios",
-            body=scenario_json,
-            properties=pika.BasicProperties(delivery_mode=1),
+            body=body,
+            properties=properties,
         )
 
+    def public_scenario(self, scenario: list[float], function_id: str):
+        scenario_json = json.dumps({"function_id": function_id, "scenario": scenario})
+        self._public_scenario_message(scenario_json)
+
+    # un bloque (n_escenarios, n_vars) en un solo mensaje
+    def public_block(self, block: np.ndarray, function_id: str):
+        self._public_scenario_message(
+            scenario_block_message(block, function_id), SCENARIO_BLOCK_CONTENT_TYPE
+        )
+
+    def public_recipe(self, recipe: dict, function_id: str):
+        recipe_json = json.dumps({**recipe, "function_id": function_id})
+        self._public_scenario_message(recipe_json)
+
     def close_connection(self):
+        if self.publisher is not None:
+            self.publisher.close()
+            print(f"Publicacion de escenarios: {self.publisher.stats()}")
         self.connection.close()
@@ -1,5 +1,5 @@
 from src.protos import function_service_pb2, function_service_pb2_grpc
-from src.services.functions_in_file import FileFunctionReader
+from src.services.functions_in_file import FileFunctionReader, function_id
 
 class FunctionServicer(function_service_pb2_grpc.FunctionServiceServicer):
 	def __init__(self, function_reader: FileFunctionReader):
@@ -7,5 +7,15 @@ class FunctionServicer(function_service_pb2_grpc.FunctionServiceServicer):
 
 	def GetFuncModel(self, request, context):
 		curr_func = self.function_reader.get_current_func()
-		return function_service_pb2.GetFuncModelResponse(function=curr_func)
+		return function_service_pb2.GetFuncModelResponse(
+			function=curr_func, id=function_id(curr_func) if curr_func else ""
+		)
+
+	def GetFunction(self, request, context):
+		# los consumidores piden funciones por id cuando reciben escenarios de
+		# una funcion que no conocen (p. ej. tras reiniciarse)
+		func = self.function_reader.get_function_by_id(request.id)
+		return function_service_pb2.GetFuncModelResponse(
+			function=func, id=request.id if func else ""
+		)
 		
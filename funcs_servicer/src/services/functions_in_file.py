@@ -1,13 +1,32 @@
 from src.services.interfaces.Function_Reader import FunctionReader
+import hashlib
 import os
+import re
 from threading import Lock
 
+from funcs_shared.function_file import parse_function_line
+
+
+# id estable de una funcion: hash de su contenido, asi funciones y escenarios
+# se pueden asociar sin importar el orden en que lleguen al consumidor
+def function_id(function: str) -> str:
+    return hashlib.sha256(function.encode()).hexdigest()[:16]
+
+
+# cantidad de variables de f(x,y,...) (1 si no se reconoce el formato)
+def function_variables(function: str) -> int:
+    match = re.search(r"f\((.*?)\)", function)
+    if match:
+        return len([v for v in match.group(1).split(",") if v.strip()])
+    return 1
+
 
 class FileFunctionReader(FunctionReader):
     def __init__(self):
         self.index = -1
         self.stored_functions = []
         self.stored_func_scenarios = []
+        self.stored_func_modes = []
         self.lock = Lock()
 
     def load_functions(self, source_path: str):
@@ -18,16 +37,17 @@ class FileFunctionReader(FunctionReader):
             self.index = -1
             self.stored_functions = []
             self.stored_func_scenarios = []
+            self.stored_func_modes = []
 
             with open(source_path, "r") as file:
-                for line in file:                    
-                    if not line.strip():
+                for line in file:
+                    parsed = parse_function_line(line)
+                    if parsed is None:
                         continue
-
-                    parts = line.rsplit(",", maxsplit=1)
-                    if len(parts) == 2:
-                        self.stored_functions.append(parts[0].strip())
-                        self.stored_func_scenarios.append(parts[1].strip())
+                    function, distribution, mode = parsed
+                    self.stored_functions.append(function)
+                    self.stored_func_scenarios.append(distribution)
+                    self.stored_func_modes.append(mode)
 
     def _advance_index(self) -> int:
         size = len(self.stored_functions)
@@ -42,6 +62,19 @@ class FileFunctionReader(FunctionReader):
             self._advance_index()
             return self.stored_functions[self.index]
 
+    def get_current_func_id(self) -> str:
+        with self.lock:
+            if not self.stored_functions:
+                return ""
+            return function_id(self.stored_functions[self.index])
+
+    def get_function_by_id(self, func_id: str) -> str:
+        with self.lock:
+            for function in self.stored_functions:
+                if function_id(function) == func_id:
+                    return function
+            return ""
+
     def get_current_func(self) -> str:
         with self.lock:
             if not self.stored_functions:
@@ -53,3 +86,9 @@ class FileFunctionReader(FunctionReader):
             if not self.stored_func_scenarios:
                 return ""
             return self.stored_func_scenarios[self.index]
+
+    def read_mode(self) -> str:
+        with self.lock:
+            if not self.stored_func_modes:
+                return ""
+            return self.stored_func_modes[self.index]
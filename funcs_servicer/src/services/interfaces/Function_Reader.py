@@ -10,3 +10,6 @@ class FunctionReader(ABC):
 
     @abstractclassmethod
     def read_scenario(): ...
+
+    @abstractclassmethod
+    def read_mode(): ...
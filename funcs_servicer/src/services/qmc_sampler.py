@@ -0,0 +1,96 @@
+import warnings
+from typing import Callable
+
+import numpy as np
+from scipy import stats
+from scipy.stats import qmc
+
+# modos de linea con cuasi-Monte Carlo: f(x,y)=x+y,normal,sobol
+QMC_ENGINES = {"sobol": qmc.Sobol, "halton": qmc.Halton}
+
+# inversa de la CDF de cada distribucion, con los parametros de
+# ScenarioGenerator.defaults (mismos nombres que en np.random.Generator)
+INVERSE_CDFS = {
+    "normal": lambda u, loc, scale: stats.norm.ppf(u, loc=loc, scale=scale),
+    "binomial": lambda u, n, p: stats.binom.ppf(u, n, p),
+    "poisson": lambda u, lam: stats.poisson.ppf(u, lam),
+    "uniform": lambda u, low, high: low + (high - low) * u,
+    "exponential": lambda u, scale: stats.expon.ppf(u, scale=scale),
+    "gamma": lambda u, shape, scale: stats.gamma.ppf(u, shape, scale=scale),
+    "beta": lambda u, a, b: stats.beta.ppf(u, a, b),
+    "geometric": lambda u, p: stats.geom.ppf(u, p),
+    "lognormal": lambda u, mean, sigma: stats.lognorm.ppf(
+        u, sigma, scale=np.exp(mean)
+    ),
+}
+
+# u en (0, 1) abierto: la inversa de la normal en 0 o 1 es infinita
+EPSILON = 2.0**-53
+
+
+class QMCSampler:
+    # puntos de baja discrepancia (Sobol o Halton) en [0, 1)^n_vars, una
+    # coordenada por variable de la funcion, llevados a la distribucion con la
+    # inversa de la CDF. Las secuencias estan aleatorizadas (scramble) con un
+    # hijo de la semilla de la corrida, y cada `replicate_size` puntos se
+    # cambia de aleatorizacion: las medias de replicas distintas son
+    # estimaciones independientes e insesgadas, y su dispersion estima el error
+    # (un solo recorrido de la secuencia no lo permite).
+    #
+    # Con Sobol las replicas de tamano potencia de 2 conservan el balance; con
+    # bloques de ese mismo tamano cada bloque es una replica completa.
+    # No es seguro entre hilos: cada hilo publicador usa el suyo
+    def __init__(
+        self,
+        mode: str,
+        n_vars: int,
+        spawn: Callable[[], np.random.SeedSequence],
+        replicate_size: int = 1024,
+    ):
+        self.mode = mode
+        self.n_vars = n_vars
+        self.spawn = spawn
+        self.replicate_size = max(1, replicate_size)
+        self.replicate = -1
+        self._engine = None
+        self._drawn = self.replicate_size
+
+    @staticmethod
+    def engine(mode: str, n_vars: int, seed: np.random.SeedSequence):
+        # scipy hace spawn sobre la semilla del Generator: con una copia, la
+        # misma semilla siempre da la misma aleatorizacion
+        seed = np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key)
+        generator = np.random.Generator(np.random.PCG64(seed))
+        return QMC_ENGINES[mode](d=n_vars, scramble=True, rng=generator)
+
+    @staticmethod
+    def draw(engine, n: int) -> np.ndarray:
+        # Sobol avisa si el primer pedido no es potencia de 2: el tamano de la
+        # replica ya lo decide quien la configura
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", UserWarning)
+            return engine.random(n)
+
+    @staticmethod
+    def transform(u: np.ndarray, fn: str, params: dict) -> np.ndarray:
+        u = np.clip(u, EPSILON, 1.0 - EPSILON)
+        return np.asarray(INVERSE_CDFS[fn](u, **params), dtype=np.float64)
+
+    def random(self, n: int) -> np.ndarray:
+        # n puntos uniformes (n, n_vars), cruzando replicas si hace falta
+        parts = []
+        while n > 0:
+            if self._drawn >= self.replicate_size:
+                self._engine = self.engine(self.mode, self.n_vars, self.spawn())
+                self._drawn = 0
+                self.replicate += 1
+            take = min(n, self.replicate_size - self._drawn)
+            parts.append(self.draw(self._engine, take))
+            self._drawn += take
+            n -= take
+        if not parts:
+            return np.empty((0, self.n_vars))
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def sample(self, n: int, fn: str, params: dict) -> np.ndarray:
+        return self.transform(self.random(n), fn, params)
@@ -1,18 +1,25 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 
+from src.services.qmc_sampler import QMC_ENGINES, QMCSampler
+
 
 class ScenarioGenerator:
-    functions = {
-        "normal": np.random.normal,
-        "binomial": np.random.binomial,
-        "poisson": np.random.poisson,
-        "uniform": np.random.uniform,
-        "exponential": np.random.exponential,
-        "gamma": np.random.gamma,
-        "beta": np.random.beta,
-        "geometric": np.random.geometric,
-        "lognormal": np.random.lognormal,
-    }
+    # distribuciones soportadas: metodos de np.random.Generator con el mismo
+    # nombre (y los mismos parametros) que las funciones de np.random
+    distributions = (
+        "normal",
+        "binomial",
+        "poisson",
+        "uniform",
+        "exponential",
+        "gamma",
+        "beta",
+        "geometric",
+        "lognormal",
+    )
 
     defaults = {
         "normal": {"loc": 0, "scale": 1},
@@ -26,10 +33,131 @@ class ScenarioGenerator:
         "lognormal": {"mean": 0.0, "sigma": 1.0},
     }
 
-    def __init__(self, fns: list[str]):
-        self.funcs = {fn: self.functions[fn] for fn in fns if fn in self.functions}
+    def __init__(
+        self, fns: list[str], seed: int | None = None, replicate_size: int = 1024
+    ):
+        self.funcs = {fn for fn in fns if fn in self.distributions}
+        # semilla raiz de la corrida: cada hilo, receta y export usa un hijo
+        # independiente (spawn), asi con la misma semilla se repite todo
+        self.seed_sequence = np.random.SeedSequence(seed)
+        self._spawn_lock = threading.Lock()
+        # un Generator (PCG64) por hilo: no son seguros entre hilos
+        self._local = threading.local()
+        # puntos por aleatorizacion en los modos cuasi-Monte Carlo
+        self.replicate_size = replicate_size
+
+    def spawn(self) -> np.random.SeedSequence:
+        with self._spawn_lock:
+            return self.seed_sequence.spawn(1)[0]
 
-    def get_scenario(self, amount: int, fn: str) -> list[int]:
+    def _generator(self) -> np.random.Generator:
+        generator = getattr(self._local, "generator", None)
+        if generator is None:
+            generator = np.random.Generator(np.random.PCG64(self.spawn()))
+            self._local.generator = generator
+        return generator
+
+    def _qmc_sampler(self, sampling: str, n_vars: int) -> QMCSampler:
+        # una secuencia por hilo, modo y cantidad de variables: al volver a
+        # una funcion se sigue desde donde quedo
+        samplers = getattr(self._local, "samplers", None)
+        if samplers is None:
+            samplers = self._local.samplers = {}
+        sampler = samplers.get((sampling, n_vars))
+        if sampler is None:
+            sampler = QMCSampler(sampling, n_vars, self.spawn, self.replicate_size)
+            samplers[(sampling, n_vars)] = sampler
+        return sampler
+
+    def get_scenario(self, amount: int, fn: str, sampling: str = "") -> list[int]:
         if fn not in self.funcs or amount == 0:
             return None
-        return self.funcs[fn](size=amount, **self.defaults[fn]).tolist()
+        if sampling in QMC_ENGINES:
+            # un punto de la secuencia con una coordenada por variable
+            return (
+                self._qmc_sampler(sampling, amount)
+                .sample(1, fn, self.defaults[fn])[0]
+                .tolist()
+            )
+        sample = getattr(self._generator(), fn)
+        return sample(size=amount, **self.defaults[fn]).tolist()
+
+    def get_block(
+        self, n_scenarios: int, n_vars: int, fn: str, sampling: str = ""
+    ) -> np.ndarray | None:
+        # bloque (n_scenarios, n_vars) de float64 en una sola llamada, sin
+        # pasar por listas de Python; se publica como un mensaje binario
+        if fn not in self.funcs or n_scenarios <= 0 or n_vars <= 0:
+            return None
+        if sampling in QMC_ENGINES:
+            return self._qmc_sampler(sampling, n_vars).sample(
+                n_scenarios, fn, self.defaults[fn]
+            )
+        sample = getattr(self._generator(), fn)
+        return np.asarray(
+            sample(size=(n_scenarios, n_vars), **self.defaults[fn]), dtype=np.float64
+        )
+
+    def get_recipe(self, count: int, fn: str) -> dict | None:
+        # receta de `count` escenarios: los consumidores generan el bloque
+        # localmente con PCG64 a partir de la semilla, en vez de recibir
+        # un mensaje por escenario
+        if fn not in self.funcs or count == 0:
+            return None
+        seed = self.spawn()
+        return {
+            "type": "recipe",
+            "distribution": fn,
+            "params": self.defaults[fn],
+            "seed": {"entropy": seed.entropy, "spawn_key": list(seed.spawn_key)},
+            "count": count,
+        }
+
+    def export_matrix(
+        self,
+        path: str,
+        fn: str,
+        n_scenarios: int,
+        n_vars: int,
+        chunk_size: int = 1_000_000,
+        workers: int = 1,
+        sampling: str = "",
+    ) -> bool:
+        # escribe una matriz .npy (n_scenarios, n_vars) de float64 por bloques
+        # sobre un mmap, sin tenerla entera en memoria; la evalua el modo
+        # offline del consumidor. Cada bloque tiene su propio hijo de la
+        # semilla del export, asi se generan en paralelo (los Generator
+        # sueltan el GIL) y el resultado no depende de la cantidad de hilos.
+        # En modo cuasi-Monte Carlo la matriz es una sola secuencia aleatorizada
+        # y cada bloque salta (fast_forward) a su primer punto
+        if fn not in self.funcs or n_scenarios <= 0:
+            return False
+        matrix = np.lib.format.open_memmap(
+            path, mode="w+", dtype=np.float64, shape=(n_scenarios, n_vars)
+        )
+        starts = range(0, n_scenarios, chunk_size)
+        seed = self.spawn()
+        if sampling in QMC_ENGINES:
+            seeds = [seed] * len(starts)
+        else:
+            seeds = seed.spawn(len(starts))
+
+        def fill(start: int, seed: np.random.SeedSequence):
+            stop = min(start + chunk_size, n_scenarios)
+            if sampling in QMC_ENGINES:
+                engine = QMCSampler.engine(sampling, n_vars, seed)
+                if start:
+                    engine.fast_forward(start)
+                matrix[start:stop] = QMCSampler.transform(
+                    QMCSampler.draw(engine, stop - start), fn, self.defaults[fn]
+                )
+                return
+            sample = getattr(np.random.Generator(np.random.PCG64(seed)), fn)
+            matrix[start:stop] = sample(
+                size=(stop - start, n_vars), **self.defaults[fn]
+            )
+
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            list(executor.map(fill, starts, seeds))
+        matrix.flush()
+        return True
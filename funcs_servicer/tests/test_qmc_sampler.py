@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from scipy import stats
+
+from src.services.qmc_sampler import QMCSampler
+from src.services.scenario_generator import ScenarioGenerator
+
+
+def spawner(entropy: int = 42):
+    root = np.random.SeedSequence(entropy)
+    return lambda: root.spawn(1)[0]
+
+
+@pytest.mark.parametrize(
+    "fn, params, expected",
+    [
+        ("uniform", {"low": 2.0, "high": 4.0}, lambda u: 2.0 + 2.0 * u),
+        ("normal", {"loc": 1.0, "scale": 2.0}, lambda u: stats.norm.ppf(u, 1.0, 2.0)),
+        ("exponential", {"scale": 3.0}, lambda u: stats.expon.ppf(u, scale=3.0)),
+        ("binomial", {"n": 10, "p": 0.5}, lambda u: stats.binom.ppf(u, 10, 0.5)),
+        ("poisson", {"lam": 5}, lambda u: stats.poisson.ppf(u, 5)),
+    ],
+)
+def test_inverse_cdf_mapping(fn, params, expected):
+    u = np.array([[0.1, 0.5], [0.25, 0.9]])
+    np.testing.assert_allclose(QMCSampler.transform(u, fn, params), expected(u))
+
+
+def test_extremes_stay_finite():
+    # u = 0 o 1 daria +-inf en la normal
+    u = np.array([[0.0, 1.0]])
+    values = QMCSampler.transform(u, "normal", {"loc": 0, "scale": 1})
+    assert np.all(np.isfinite(values))
+
+
+def test_sobol_replicates_are_balanced():
+    # 2^m puntos de Sobol: un punto por cada intervalo de ancho 2^-m en cada
+    # coordenada, tambien con scramble
+    sampler = QMCSampler("sobol", 3, spawner(), replicate_size=256)
+    for _ in range(2):
+        u = sampler.random(256)
+        for column in u.T:
+            assert np.array_equal(np.sort(np.floor(column * 256)), np.arange(256))
+    assert sampler.replicate == 1
+
+
+def test_replicates_are_reproducible_and_distinct():
+    first = QMCSampler("halton", 2, spawner(), replicate_size=100).random(300)
+    again = QMCSampler("halton", 2, spawner(), replicate_size=100).random(300)
+    np.testing.assert_array_equal(first, again)
+    # cada replica tiene su propia aleatorizacion
+    assert not np.array_equal(first[:100], first[100:200])
+
+
+def test_qmc_mean_error_is_small():
+    sampler = QMCSampler("sobol", 1, spawner(), replicate_size=4096)
+    sample = sampler.sample(4096, "normal", {"loc": 0, "scale": 1})
+    # Monte Carlo con 4096 puntos tendria un error tipico de ~0.016
+    assert abs(sample.mean()) < 2e-3
+
+
+def test_export_does_not_depend_on_chunks(tmp_path):
+    paths = []
+    for chunk_size, workers in [(1000, 1), (4096, 3)]:
+        generator = ScenarioGenerator(["normal"], seed=7)
+        path = tmp_path / f"{chunk_size}.npy"
+        assert generator.export_matrix(
+            str(path), "normal", 10000, 2, chunk_size, workers, sampling="sobol"
+        )
+        paths.append(path)
+    np.testing.assert_array_equal(np.load(paths[0]), np.load(paths[1]))
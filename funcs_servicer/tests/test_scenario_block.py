@@ -0,0 +1,46 @@
+import numpy as np
+
+from src.rabbitmq.connection import (
+    SCENARIO_BLOCK_HEADER,
+    SCENARIO_BLOCK_VERSION,
+    scenario_block_message,
+)
+from src.services.scenario_generator import ScenarioGenerator
+
+
+def decode(body: bytes):
+    # lectura del formato como la hace el consumidor
+    magic, version, function_len, rows, columns = SCENARIO_BLOCK_HEADER.unpack_from(
+        body
+    )
+    offset = SCENARIO_BLOCK_HEADER.size
+    function = body[offset : offset + function_len].decode()
+    assert len(body) == offset + function_len + 8 * rows * columns
+    block = np.frombuffer(body, dtype="<f8", offset=offset + function_len)
+    return magic, version, function, block.reshape(rows, columns)
+
+
+def test_block_layout():
+    block = np.arange(6, dtype=np.float64).reshape(3, 2)
+    magic, version, function, decoded = decode(
+        scenario_block_message(block, "0123456789abcdef")
+    )
+    assert (magic, version) == (b"MCSB", SCENARIO_BLOCK_VERSION)
+    assert function == "0123456789abcdef"
+    np.testing.assert_array_equal(decoded, block)
+
+
+def test_non_contiguous_and_integer_blocks():
+    # una vista transpuesta o enteros de binomial se envian como float64 por filas
+    block = np.arange(12).reshape(3, 4).T
+    _, _, _, decoded = decode(scenario_block_message(block, "abc"))
+    np.testing.assert_array_equal(decoded, block)
+
+
+def test_generator_blocks():
+    generator = ScenarioGenerator(["normal", "binomial"], seed=1)
+    block = generator.get_block(1000, 3, "binomial")
+    assert block.shape == (1000, 3) and block.dtype == np.float64
+    assert np.all((block >= 0) & (block <= 10))
+    assert generator.get_block(10, 3, "gamma") is None
+    assert generator.get_block(0, 3, "normal") is None
@@ -0,0 +1,226 @@
+import threading
+from collections import OrderedDict, deque
+from time import sleep
+from typing import Callable, Dict, List, Tuple
+
+import pika
+from pika.spec import Basic
+
+
+class ConfirmedPublisher:
+    # publica en modo confirm sin esperar cada confirmacion: los mensajes
+    # quedan pendientes por delivery_tag (a lo sumo `window` a la vez) y el
+    # broker los confirma de a varios (multiple=True). Los rechazados (nack) o
+    # perdidos al caerse la conexion se reintentan hasta max_retries veces.
+    #
+    # Corre sobre una SelectConnection propia con su ioloop en un hilo; con
+    # BlockingConnection cada confirmacion seria una espera por mensaje.
+    # publish() se puede llamar desde cualquier hilo y solo bloquea si la
+    # ventana esta llena
+    def __init__(
+        self,
+        parameters: pika.ConnectionParameters,
+        window: int = 256,
+        max_retries: int = 3,
+        reconnect_delay: float = 1.0,
+    ):
+        self.parameters = parameters
+        self.window = window
+        self.max_retries = max_retries
+        self.reconnect_delay = reconnect_delay
+        # un lugar por mensaje sin resolver (confirmado o descartado)
+        self._slots = threading.BoundedSemaphore(window)
+        self._idle = threading.Condition()
+        self._unresolved = 0
+        # mensajes esperando canal abierto (los agrega cualquier hilo)
+        self._queued = deque()
+        # delivery_tag -> mensaje publicado y sin confirmar (solo el ioloop)
+        self._outstanding: OrderedDict[int, List] = OrderedDict()
+        self._next_tag = 1
+        self._connection = None
+        self._channel = None
+        self._closing = False
+        self._ready = threading.Event()
+        self._stats = {"confirmed": 0, "retried": 0, "failed": 0}
+
+    def start(self, timeout: float = 10.0) -> "ConfirmedPublisher":
+        self._thread = threading.Thread(
+            target=self._run, name="confirmed-publisher", daemon=True
+        )
+        self._thread.start()
+        if not self._ready.wait(timeout):
+            self.close(0)
+            raise ConnectionError("No se pudo abrir el canal de publicacion")
+        return self
+
+    def publish(
+        self,
+        routing_key: str,
+        body: str | bytes,
+        properties: pika.BasicProperties | None = None,
+        group: Dict | None = None,
+    ):
+        self._slots.acquire()
+        with self._idle:
+            self._unresolved += 1
+        # [routing_key, body, properties, grupo, intentos]
+        self._queued.append([routing_key, body, properties, group, 0])
+        self._schedule(self._send_queued)
+
+    def publish_batch(
+        self,
+        routing_key: str,
+        messages: List[Tuple[str | bytes, pika.BasicProperties]],
+        on_done: Callable[[bool], None],
+    ):
+        # on_done(ok) se llama (desde el hilo del ioloop) cuando el broker
+        # confirmo todos los mensajes del lote; ok=False si alguno se descarto
+        if not messages:
+            on_done(True)
+            return
+        group = {"remaining": len(messages), "ok": True, "on_done": on_done}
+        for body, properties in messages:
+            self.publish(routing_key, body, properties, group)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        # espera a que todo lo publicado este confirmado o descartado
+        with self._idle:
+            return self._idle.wait_for(lambda: self._unresolved == 0, timeout)
+
+    def close(self, timeout: float | None = 10.0):
+        self.flush(timeout)
+        self._closing = True
+        self._schedule(self._close_connection)
+        self._thread.join(timeout)
+
+    def stats(self) -> Dict[str, int]:
+        return {**self._stats, "outstanding": self._unresolved}
+
+    # --- hilo del ioloop ---
+
+    def _run(self):
+        while not self._closing:
+            self._connection = pika.SelectConnection(
+                self.parameters,
+                on_open_callback=self._on_connection_open,
+                on_open_error_callback=self._on_connection_error,
+                on_close_callback=self._on_connection_closed,
+            )
+            self._connection.ioloop.start()
+            if not self._closing:
+                sleep(self.reconnect_delay)
+
+    def _schedule(self, callback: Callable):
+        # entre reconexiones no hay ioloop; lo encolado se envia al abrir
+        # el siguiente canal
+        try:
+            self._connection.ioloop.add_callback_threadsafe(callback)
+        except Exception:
+            pass
+
+    def _close_connection(self):
+        if self._connection.is_open:
+            self._connection.close()
+        else:
+            self._connection.ioloop.stop()
+
+    def _on_connection_open(self, connection):
+        connection.channel(on_open_callback=self._on_channel_open)
+
+    def _on_connection_error(self, connection, error):
+        print(f"ERROR, No se pudo conectar el publicador: {error}")
+        connection.ioloop.stop()
+
+    def _on_connection_closed(self, connection, reason):
+        self._channel = None
+        self._ready.clear()
+        # no se sabe si el broker recibio lo pendiente: se reintenta
+        lost = list(self._outstanding.values())
+        self._outstanding.clear()
+        for message in reversed(lost):
+            self._retry(message, front=True)
+        connection.ioloop.stop()
+
+    def _on_channel_open(self, channel):
+        channel.add_on_close_callback(self._on_channel_closed)
+        channel.confirm_delivery(
+            ack_nack_callback=self._on_confirmation,
+            callback=lambda _: self._on_confirm_mode(channel),
+        )
+
+    def _on_channel_closed(self, channel, reason):
+        # sin canal se cierra la conexion y se reconecta desde _run
+        print(f"Canal de publicacion cerrado: {reason}")
+        self._channel = None
+        if self._connection.is_open:
+            self._connection.close()
+
+    def _on_confirm_mode(self, channel):
+        self._channel = channel
+        self._next_tag = 1
+        self._ready.set()
+        self._send_queued()
+
+    def _send_queued(self):
+        while self._channel is not None and self._queued:
+            message = self._queued.popleft()
+            routing_key, body, properties, _, _ = message
+            tag = self._next_tag
+            try:
+                self._channel.basic_publish(
+                    exchange="",
+                    routing_key=routing_key,
+                    body=body,
+                    properties=properties,
+                )
+            except Exception as e:
+                print(f"ERROR, No se pudo publicar: {e}")
+                self._queued.appendleft(message)
+                return
+            self._next_tag += 1
+            self._outstanding[tag] = message
+
+    def _on_confirmation(self, frame):
+        method = frame.method
+        if method.multiple:
+            tags = [tag for tag in self._outstanding if tag <= method.delivery_tag]
+        else:
+            tags = [method.delivery_tag]
+
+        acked = isinstance(method, Basic.Ack)
+        for tag in tags:
+            message = self._outstanding.pop(tag, None)
+            if message is None:
+                continue
+            if acked:
+                self._stats["confirmed"] += 1
+                self._resolve(message, True)
+            else:
+                self._retry(message)
+        if not acked:
+            self._send_queued()
+
+    def _retry(self, message: List, front: bool = False):
+        if message[4] >= self.max_retries:
+            print("ERROR, Mensaje descartado tras agotar los reintentos")
+            self._stats["failed"] += 1
+            self._resolve(message, False)
+            return
+        message[4] += 1
+        self._stats["retried"] += 1
+        if front:
+            self._queued.appendleft(message)
+        else:
+            self._queued.append(message)
+
+    def _resolve(self, message: List, ok: bool):
+        group = message[3]
+        if group is not None:
+            group["remaining"] -= 1
+            group["ok"] = group["ok"] and ok
+            if group["remaining"] == 0:
+                group["on_done"](group["ok"])
+        self._slots.release()
+        with self._idle:
+            self._unresolved -= 1
+            self._idle.notify_all()
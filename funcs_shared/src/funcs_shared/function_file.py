@@ -0,0 +1,24 @@
+from typing import Tuple
+
+# modos opcionales al final de la linea: f(x)=x^2,binomial,exact
+# (exact: sin escenarios; sobol/halton: escenarios cuasi-Monte Carlo)
+FUNCTION_MODES = {"exact", "sobol", "halton"}
+
+
+# una linea del archivo de funciones (fns.txt): f(x)=...,distribucion[,modo]
+# -> (funcion, distribucion, modo), modo "" si no tiene. None si la linea
+# esta vacia o no tiene distribucion. La usan el servidor y el modo offline
+# del consumidor, asi los dos leen el archivo igual
+def parse_function_line(line: str) -> Tuple[str, str, str] | None:
+    if not line.strip():
+        return None
+
+    mode = ""
+    parts = line.rsplit(",", maxsplit=1)
+    if len(parts) == 2 and parts[1].strip() in FUNCTION_MODES:
+        mode = parts[1].strip()
+        parts = parts[0].rsplit(",", maxsplit=1)
+
+    if len(parts) != 2:
+        return None
+    return parts[0].strip(), parts[1].strip(), mode
@@ -29,6 +29,8 @@ class NetworkMonitorApp(ctk.CTk):
         self.monitor_thread = None
         self.user_results_data = {}
         self.published_functions = set()
+        self.exact_results = {}
+        self.aggregate_results = {}
         self.total_scenarios = 0
         self.connection_error = False
 
@@ -194,6 +196,7 @@ class NetworkMonitorApp(ctk.CTk):
 
         # Diccionario para rastrear widgets de funciones
         self.function_widgets = {}
+        self.function_labels = {}
 
         # Panel derecho: Total de escenarios
         scenarios_panel = ctk.CTkFrame(
@@ -477,14 +480,31 @@ class NetworkMonitorApp(ctk.CTk):
                     )
                     func_frame.pack(fill="x", pady=5)
 
-                    ctk.CTkLabel(
+                    func_label = ctk.CTkLabel(
                         func_frame,
                         text=func,
                         font=ctk.CTkFont(size=13),
                         text_color="#CCCCCC",
-                    ).pack(padx=15, pady=12)
+                    )
+                    func_label.pack(padx=15, pady=12)
 
                     self.function_widgets[func] = func_frame
+                    self.function_labels[func] = func_label
+
+                # Funciones en modo exacto: mostramos esperanza y varianza
+                if func in self.exact_results:
+                    mean, variance = self.exact_results[func]
+                    self.function_labels[func].configure(
+                        text=f"{func}   E = {mean:.4f}   Var = {variance:.4f}"
+                    )
+                # Parciales agregados por los consumidores: media y varianza
+                # estimadas con todos los resultados recibidos
+                elif func in self.aggregate_results:
+                    count, mean, variance = self.aggregate_results[func]
+                    self.function_labels[func].configure(
+                        text=f"{func}   n = {count}   Media = {mean:.4f}   "
+                        f"Var = {variance:.4f}"
+                    )
 
     def toggle_monitoring(self):
         if not self.monitoring:
@@ -527,6 +547,16 @@ class NetworkMonitorApp(ctk.CTk):
                     for func in response.published_functions:
                         self.published_functions.add(func)
 
+                    # Esperanza/varianza exactas por funcion
+                    self.exact_results = {
+                        func: (exact.mean, exact.variance)
+                        for func, exact in response.exact_results.items()
+                    }
+                    self.aggregate_results = {
+                        func: (agg.count, agg.mean, agg.variance)
+                        for func, agg in response.aggregate_results.items()
+                    }
+
                     # CRÍTICO: Actualizar total de escenarios
                     self.total_scenarios = response.total_scenarios
 
@@ -535,14 +565,20 @@ class NetworkMonitorApp(ctk.CTk):
                     self.time_labels.append(current_time)
                     self.scenarios_history.append(self.total_scenarios)
 
-                    # Calcular promedio global
-                    if self.user_results_data:
-                        all_values = []
+                    # Calcular promedio global (resultados individuales y
+                    # parciales agregados, ponderados por su cantidad)
+                    if self.user_results_data or self.aggregate_results:
+                        total = 0.0
+                        count = 0
                         for data in self.user_results_data.values():
-                            all_values.extend(data["values"])
-
-                        if all_values:
-                            current_avg = sum(all_values) / len(all_values)
+                            total += sum(data["values"])
+                            count += len(data["values"])
+                        for agg_count, agg_mean, _ in self.aggregate_results.values():
+                            total += agg_mean * agg_count
+                            count += agg_count
+
+                        if count:
+                            current_avg = total / count
                             self.global_average_history.append(current_avg)
 
                     self.connection_error = False
@@ -556,6 +592,8 @@ class NetworkMonitorApp(ctk.CTk):
 
                 self.time_labels.clear()
                 self.published_functions.clear()
+                self.exact_results = {}
+                self.aggregate_results = {}
                 self.global_average_history.clear()
                 self.scenarios_history.clear()
                 self.user_results_data = {}
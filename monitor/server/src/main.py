@@ -9,32 +9,55 @@ from dotenv import load_dotenv
 from shared_lib.protos import information_service_pb2_grpc
 
 from src.rabbitmq.connection import Connection
+from src.services.aggregate_stats import merge_partial
 from src.services.db_operations.operations import DBOperations
 from src.services.information_servicer import InformationServicer
 
 
-def consume_results(ip_results: dict):
+def store_result(
+    msg: dict, ip_results: dict, exact_results: dict, aggregate_results: dict
+):
+    # resultados del modo exacto: esperanza/varianza por funcion
+    if msg.get("type") == "exact":
+        exact_results[msg.get("function")] = msg
+        return
+
+    # parciales de Welford de los consumidores: se combinan por funcion
+    if msg.get("type") == "aggregate":
+        func = msg.get("function")
+        aggregate_results[func] = merge_partial(aggregate_results.get(func), msg)
+        return
+
+    user_ip = msg.get("user")
+    results = ip_results.setdefault(user_ip, {"user": user_ip, "results": []})[
+        "results"
+    ]
+    # lote binario: muchos resultados de una funcion en un solo mensaje
+    if msg.get("type") == "batch":
+        results.extend(msg.get("results"))
+        return
+    results.append(msg.get("result"))
+
+
+def consume_results(ip_results: dict, exact_results: dict, aggregate_results: dict):
     connection = Connection()
 
     initial_results = connection.get_initial_messages("results")
     for msg in initial_results:
-        user_ip = msg.get("user")
-        result = msg.get("result")
-        ip_results.setdefault(user_ip, {"user": user_ip, "results": []})[
-            "results"
-        ].append(result)
+        store_result(msg, ip_results, exact_results, aggregate_results)
 
     for msg in connection.message_stream("results"):
         if not msg:
             continue
 
-        print(f"Resultado consumido: {msg}")
-        user_ip = msg.get("user")
-        result = msg.get("result")
-
-        ip_results.setdefault(user_ip, {"user": user_ip, "results": []})[
-            "results"
-        ].append(result)
+        if isinstance(msg, dict) and msg.get("type") == "batch":
+            print(
+                f"Lote consumido: {len(msg['results'])} resultados de "
+                f"{msg['user']} ({msg['function_id']})"
+            )
+        else:
+            print(f"Resultado consumido: {msg}")
+        store_result(msg, ip_results, exact_results, aggregate_results)
 
 
 def consume_functions(functions: set):
@@ -43,6 +66,10 @@ def consume_functions(functions: set):
         if not func:
             continue
 
+        # las funciones en modo exacto llegan como mensaje con su distribucion
+        if isinstance(func, dict):
+            func = func.get("function")
+
         if func in functions:
             continue
 
@@ -63,6 +90,8 @@ def update_scenarios_count(scenarios: dict, stop_event: threading.Event):
 
 def main():
     amount_scenarios = {"value": 0}
+    exact_results = {}
+    aggregate_results = {}
     connection = Connection()
     load_dotenv()
 
@@ -78,7 +107,9 @@ def main():
 
     # threads separados para consumir cada cola
     results_thread = threading.Thread(
-        target=consume_results, args=(buffer_results,), daemon=True
+        target=consume_results,
+        args=(buffer_results, exact_results, aggregate_results),
+        daemon=True,
     )
 
     functions_thread = threading.Thread(
@@ -93,7 +124,11 @@ def main():
     server = grpc.server(futures.ThreadPoolExecutor(max_workers=10))
     information_service_pb2_grpc.add_InformationServiceServicer_to_server(
         InformationServicer(
-            buffer=buffer_results, functions=functions, scenarios=amount_scenarios
+            buffer=buffer_results,
+            functions=functions,
+            scenarios=amount_scenarios,
+            exact_results=exact_results,
+            aggregate_results=aggregate_results,
         ),
         server,
     )
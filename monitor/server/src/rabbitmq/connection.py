@@ -1,10 +1,67 @@
 import json
 import os
+import struct
+import sys
+from array import array
 
 import pika
 from dotenv import load_dotenv
 
 
+# lote binario de resultados de los consumidores: cabecera fija, worker_id y
+# function_id en utf-8 y los resultados como float64 little-endian. Los
+# mensajes sin este content_type son JSON (consumidores anteriores)
+RESULT_BATCH_CONTENT_TYPE = "application/x-montecarlo-result-batch"
+RESULT_BATCH_VERSION = 1
+# magia, version, largo de worker_id, largo de function_id, cantidad
+RESULT_BATCH_HEADER = struct.Struct("<4sBHHI")
+
+
+def decode_result_batch(body: bytes) -> dict | None:
+    # los lotes malformados se descartan: reintentarlos fallaria igual
+    if len(body) < RESULT_BATCH_HEADER.size:
+        print(f"Lote de resultados truncado ({len(body)} bytes)")
+        return None
+    magic, version, worker_len, function_len, count = (
+        RESULT_BATCH_HEADER.unpack_from(body)
+    )
+    if magic != b"MCRB" or version != RESULT_BATCH_VERSION:
+        print(f"Lote de resultados no soportado (version {version})")
+        return None
+    expected = RESULT_BATCH_HEADER.size + worker_len + function_len + 8 * count
+    if len(body) != expected:
+        print(f"Lote de resultados de {len(body)} bytes, se esperaban {expected}")
+        return None
+
+    offset = RESULT_BATCH_HEADER.size
+    try:
+        worker = body[offset : offset + worker_len].decode()
+        offset += worker_len
+        function = body[offset : offset + function_len].decode()
+        offset += function_len
+    except UnicodeDecodeError as e:
+        print(f"Lote de resultados invalido: {e}")
+        return None
+
+    # copia directa del buffer, sin parsear cada resultado
+    results = array("d")
+    results.frombytes(body[offset : offset + 8 * count])
+    if sys.byteorder == "big":
+        results.byteswap()
+    return {
+        "user": worker,
+        "type": "batch",
+        "function_id": function,
+        "results": results.tolist(),
+    }
+
+
+def decode_message(properties, body: bytes) -> dict | list | None:
+    if properties.content_type == RESULT_BATCH_CONTENT_TYPE:
+        return decode_result_batch(body)
+    return json.loads(body.decode())
+
+
 class Connection:
     def __init__(self):
         load_dotenv()
@@ -38,8 +95,9 @@ class Connection:
                 break
 
             # Procesar y confirmar inmediatamente
-            data = json.loads(body.decode())
-            messages.append(data)
+            data = decode_message(header_frame, body)
+            if data is not None:
+                messages.append(data)
             self.channel.basic_ack(method_frame.delivery_tag)
 
         return messages
@@ -55,7 +113,7 @@ class Connection:
         for method, properties, body in self.channel.consume(
             queue=consume_queue, inactivity_timeout=None
         ):
-            data = json.loads(body.decode())
+            data = decode_message(properties, body)
             yield data
             self.channel.basic_ack(method.delivery_tag)
 
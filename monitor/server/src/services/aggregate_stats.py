@@ -0,0 +1,30 @@
+from typing import Dict
+
+
+# combina un parcial (count, mean, m2, min, max) de un consumidor con el total
+# acumulado de la funcion; la formula de Chan es exacta, igual que si se
+# hubieran recibido todos los resultados uno por uno
+def merge_partial(total: Dict[str, float] | None, partial: Dict[str, float]):
+    count = int(partial.get("count", 0))
+    if count <= 0:
+        return total
+    if total is None:
+        return {
+            "count": count,
+            "mean": float(partial["mean"]),
+            "m2": float(partial["m2"]),
+            "min": float(partial["min"]),
+            "max": float(partial["max"]),
+        }
+
+    merged_count = total["count"] + count
+    delta = float(partial["mean"]) - total["mean"]
+    return {
+        "count": merged_count,
+        "mean": total["mean"] + delta * count / merged_count,
+        "m2": total["m2"]
+        + float(partial["m2"])
+        + delta**2 * total["count"] * count / merged_count,
+        "min": min(total["min"], float(partial["min"])),
+        "max": max(total["max"], float(partial["max"])),
+    }
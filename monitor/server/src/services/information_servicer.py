@@ -2,10 +2,19 @@ from shared_lib.protos import information_service_pb2, information_service_pb2_g
 
 
 class InformationServicer(information_service_pb2_grpc.InformationServiceServicer):
-    def __init__(self, buffer: dict, functions: set, scenarios: dict):
+    def __init__(
+        self,
+        buffer: dict,
+        functions: set,
+        scenarios: dict,
+        exact_results: dict,
+        aggregate_results: dict,
+    ):
         self.buffer = buffer
         self.functions = functions
         self.scenarios = scenarios
+        self.exact_results = exact_results
+        self.aggregate_results = aggregate_results
 
     def GetInformation(self, request, context):
         response = information_service_pb2.GetInformationResponse()
@@ -18,6 +27,26 @@ class InformationServicer(information_service_pb2_grpc.InformationServiceService
         # agregamos funciones publicadas
         response.published_functions.extend(list(self.functions))
 
+        # agregamos esperanza/varianza de las funciones en modo exacto
+        for func, exact in list(self.exact_results.items()):
+            exact_result = response.exact_results[func]
+            exact_result.mean = exact.get("mean", 0.0)
+            exact_result.variance = exact.get("variance", 0.0)
+            exact_result.support_size = exact.get("support_size", 0)
+            exact_result.truncated_mass = exact.get("truncated_mass", 0.0)
+
+        # agregamos los estadisticos combinados de los parciales por funcion
+        for func, stats in list(self.aggregate_results.items()):
+            aggregate_result = response.aggregate_results[func]
+            aggregate_result.count = stats["count"]
+            aggregate_result.mean = stats["mean"]
+            # varianza muestral a partir de M2
+            aggregate_result.variance = (
+                stats["m2"] / (stats["count"] - 1) if stats["count"] > 1 else 0.0
+            )
+            aggregate_result.min = stats["min"]
+            aggregate_result.max = stats["max"]
+
         # agregamos total de escenarios
         response.total_scenarios = self.scenarios["value"]
 
@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from src.services.aggregate_stats import merge_partial
+
+
+def partial(values: np.ndarray) -> dict:
+    return {
+        "count": values.size,
+        "mean": float(values.mean()),
+        "m2": float(((values - values.mean()) ** 2).sum()),
+        "min": float(values.min()),
+        "max": float(values.max()),
+    }
+
+
+def test_merged_partials_match_single_pass():
+    rng = np.random.default_rng(5)
+    chunks = [
+        rng.normal(1e6, 2.0, 10),
+        rng.normal(0.0, 1.0, 5000),
+        rng.uniform(size=1),
+    ]
+
+    total = None
+    for chunk in chunks:
+        total = merge_partial(total, partial(chunk))
+
+    values = np.concatenate(chunks)
+    assert total["count"] == values.size
+    assert total["mean"] == pytest.approx(values.mean(), rel=1e-12)
+    assert total["m2"] == pytest.approx(values.var() * values.size, rel=1e-9)
+    assert (total["min"], total["max"]) == (values.min(), values.max())
+
+
+def test_empty_partial_is_ignored():
+    total = merge_partial(None, partial(np.array([1.0, 3.0])))
+    assert merge_partial(total, {"count": 0}) is total
+    assert merge_partial(None, {"count": 0}) is None
@@ -0,0 +1,57 @@
+import struct
+from types import SimpleNamespace
+
+import pytest
+
+from src.rabbitmq.connection import (
+    RESULT_BATCH_CONTENT_TYPE,
+    RESULT_BATCH_HEADER,
+    decode_message,
+    decode_result_batch,
+)
+
+
+def result_batch(worker: bytes, function: bytes, results, magic=b"MCRB") -> bytes:
+    # mismo formato que publica el consumidor
+    header = RESULT_BATCH_HEADER.pack(
+        magic, 1, len(worker), len(function), len(results)
+    )
+    return header + worker + function + struct.pack(f"<{len(results)}d", *results)
+
+
+def test_decode_result_batch():
+    body = result_batch(b"host-1-0", b"0123456789abcdef", [1.5, -2.0, 3.25])
+    assert decode_result_batch(body) == {
+        "user": "host-1-0",
+        "type": "batch",
+        "function_id": "0123456789abcdef",
+        "results": [1.5, -2.0, 3.25],
+    }
+
+
+def test_empty_batch():
+    assert decode_result_batch(result_batch(b"w", b"f", []))["results"] == []
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b"MCRB",
+        result_batch(b"w", b"f", [1.0, 2.0])[:-1],
+        result_batch(b"w", b"f", [1.0, 2.0]) + b"\0",
+        result_batch(b"w", b"f", [1.0], magic=b"XXXX"),
+        result_batch(b"\xff\xfe", b"f", [1.0]),
+    ],
+)
+def test_malformed_batches_are_dropped(body):
+    assert decode_result_batch(body) is None
+
+
+def test_dispatch_by_content_type():
+    batch = SimpleNamespace(content_type=RESULT_BATCH_CONTENT_TYPE)
+    json_message = SimpleNamespace(content_type=None)
+    assert decode_message(batch, result_batch(b"w", b"f", [1.0]))["results"] == [1.0]
+    assert decode_message(json_message, b'{"user": "w", "result": 2.0}') == {
+        "user": "w",
+        "result": 2.0,
+    }
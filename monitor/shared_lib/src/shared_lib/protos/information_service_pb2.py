@@ -25,7 +25,7 @@ _sym_db = _symbol_database.Default()
 from google.protobuf import empty_pb2 as google_dot_protobuf_dot_empty__pb2
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x19information_service.proto\x1a\x1bgoogle/protobuf/empty.proto\"\xcf\x01\n\x16GetInformationResponse\x12>\n\x0cuser_results\x18\x01 \x03(\x0b\x32(.GetInformationResponse.UserResultsEntry\x12\x1b\n\x13published_functions\x18\x02 \x03(\t\x12\x17\n\x0ftotal_scenarios\x18\x03 \x01(\x05\x1a?\n\x10UserResultsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1a\n\x05value\x18\x02 \x01(\x0b\x32\x0b.ResultList:\x02\x38\x01\"\x1c\n\nResultList\x12\x0e\n\x06values\x18\x01 \x03(\x01\x32W\n\x12InformationService\x12\x41\n\x0eGetInformation\x12\x16.google.protobuf.Empty\x1a\x17.GetInformationResponseb\x06proto3')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x19information_service.proto\x1a\x1bgoogle/protobuf/empty.proto\"\xe9\x03\n\x16GetInformationResponse\x12>\n\x0cuser_results\x18\x01 \x03(\x0b\x32(.GetInformationResponse.UserResultsEntry\x12\x1b\n\x13published_functions\x18\x02 \x03(\t\x12\x17\n\x0ftotal_scenarios\x18\x03 \x01(\x05\x12@\n\rexact_results\x18\x04 \x03(\x0b\x32).GetInformationResponse.ExactResultsEntry\x12H\n\x11\x61ggregate_results\x18\x05 \x03(\x0b\x32-.GetInformationResponse.AggregateResultsEntry\x1a?\n\x10UserResultsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1a\n\x05value\x18\x02 \x01(\x0b\x32\x0b.ResultList:\x02\x38\x01\x1a\x41\n\x11\x45xactResultsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1b\n\x05value\x18\x02 \x01(\x0b\x32\x0c.ExactResult:\x02\x38\x01\x1aI\n\x15\x41ggregateResultsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x1f\n\x05value\x18\x02 \x01(\x0b\x32\x10.AggregateResult:\x02\x38\x01\"\x1c\n\nResultList\x12\x0e\n\x06values\x18\x01 \x03(\x01\"[\n\x0b\x45xactResult\x12\x0c\n\x04mean\x18\x01 \x01(\x01\x12\x10\n\x08variance\x18\x02 \x01(\x01\x12\x14\n\x0csupport_size\x18\x03 \x01(\x03\x12\x16\n\x0etruncated_mass\x18\x04 \x01(\x01\"Z\n\x0f\x41ggregateResult\x12\r\n\x05\x63ount\x18\x01 \x01(\x03\x12\x0c\n\x04mean\x18\x02 \x01(\x01\x12\x10\n\x08variance\x18\x03 \x01(\x01\x12\x0b\n\x03min\x18\x04 \x01(\x01\x12\x0b\n\x03max\x18\x05 \x01(\x01\x32W\n\x12InformationService\x12\x41\n\x0eGetInformation\x12\x16.google.protobuf.Empty\x1a\x17.GetInformationResponseb\x06proto3')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
@@ -34,12 +34,24 @@ if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
   _globals['_GETINFORMATIONRESPONSE_USERRESULTSENTRY']._loaded_options = None
   _globals['_GETINFORMATIONRESPONSE_USERRESULTSENTRY']._serialized_options = b'8\001'
+  _globals['_GETINFORMATIONRESPONSE_EXACTRESULTSENTRY']._loaded_options = None
+  _globals['_GETINFORMATIONRESPONSE_EXACTRESULTSENTRY']._serialized_options = b'8\001'
+  _globals['_GETINFORMATIONRESPONSE_AGGREGATERESULTSENTRY']._loaded_options = None
+  _globals['_GETINFORMATIONRESPONSE_AGGREGATERESULTSENTRY']._serialized_options = b'8\001'
   _globals['_GETINFORMATIONRESPONSE']._serialized_start=59
-  _globals['_GETINFORMATIONRESPONSE']._serialized_end=266
-  _globals['_GETINFORMATIONRESPONSE_USERRESULTSENTRY']._serialized_start=203
-  _globals['_GETINFORMATIONRESPONSE_USERRESULTSENTRY']._serialized_end=266
-  _globals['_RESULTLIST']._serialized_start=268
-  _globals['_RESULTLIST']._serialized_end=296
-  _globals['_INFORMATIONSERVICE']._serialized_start=298
-  _globals['_INFORMATIONSERVICE']._serialized_end=385
+  _globals['_GETINFORMATIONRESPONSE']._serialized_end=548
+  _globals['_GETINFORMATIONRESPONSE_USERRESULTSENTRY']._serialized_start=343
+  _globals['_GETINFORMATIONRESPONSE_USERRESULTSENTRY']._serialized_end=406
+  _globals['_GETINFORMATIONRESPONSE_EXACTRESULTSENTRY']._serialized_start=408
+  _globals['_GETINFORMATIONRESPONSE_EXACTRESULTSENTRY']._serialized_end=473
+  _globals['_GETINFORMATIONRESPONSE_AGGREGATERESULTSENTRY']._serialized_start=475
+  _globals['_GETINFORMATIONRESPONSE_AGGREGATERESULTSENTRY']._serialized_end=548
+  _globals['_RESULTLIST']._serialized_start=550
+  _globals['_RESULTLIST']._serialized_end=578
+  _globals['_EXACTRESULT']._serialized_start=580
+  _globals['_EXACTRESULT']._serialized_end=671
+  _globals['_AGGREGATERESULT']._serialized_start=673
+  _globals['_AGGREGATERESULT']._serialized_end=763
+  _globals['_INFORMATIONSERVICE']._serialized_start=765
+  _globals['_INFORMATIONSERVICE']._serialized_end=852
 # @@protoc_insertion_point(module_scope)